@@ -25,6 +25,14 @@
 #define AXIS_MAX(a, b)    ((a) > (b) ? (a) : (b))
 #define AXIS_MIN(a, b)    ((a) < (b) ? (a) : (b))
 
+/* ── Name comparison ──────────────────────────────────────
+ * The lexer interns identifiers, so names taken from tokens are
+ * usually the same pointer; strcmp is only the fallback. */
+static inline bool axis_name_eq(const char *a, const char *b)
+{
+    return a == b || strcmp(a, b) == 0;
+}
+
 /* ── Fatal error ──────────────────────────────────────────── */
 static inline _Noreturn void axis_fatal(const char *msg)
 {
@@ -59,6 +67,28 @@ typedef struct AxisType {
     };
 } AxisType;
 
+/* Tag for a builtin type name.  Names are told apart by their first
+ * characters instead of a chain of strcmp calls; anything that is not
+ * a builtin (field / enum names, "array") maps to TYPE_COUNT_. */
+static inline AxisTypeKind axis_type_kind(const char *t)
+{
+    if (!t) return TYPE_COUNT_;
+    switch (t[0]) {
+    case 'i': case 'u': {
+        AxisTypeKind base = (t[0] == 'i') ? TYPE_I8 : TYPE_U8;
+        if (t[1] == '8' && !t[2])                return base;
+        if (t[1] == '1' && t[2] == '6' && !t[3]) return (AxisTypeKind)(base + 1);
+        if (t[1] == '3' && t[2] == '2' && !t[3]) return (AxisTypeKind)(base + 2);
+        if (t[1] == '6' && t[2] == '4' && !t[3]) return (AxisTypeKind)(base + 3);
+        break;
+    }
+    case 'b': if (strcmp(t, "bool") == 0) return TYPE_BOOL; break;
+    case 's': if (strcmp(t, "str")  == 0) return TYPE_STR;  break;
+    case 'v': if (strcmp(t, "void") == 0) return TYPE_VOID; break;
+    }
+    return TYPE_COUNT_;
+}
+
 static inline bool axis_type_is_integer(AxisTypeKind k)
 {
     return k >= TYPE_I8 && k <= TYPE_U64;
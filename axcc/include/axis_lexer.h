@@ -36,6 +36,11 @@ typedef struct {
     /* Arena for string values */
     Arena *arena;
 
+    /* Interned identifier spellings (open addressing, power-of-2 cap) */
+    const char **idents;
+    int          ident_cap;
+    int          ident_count;
+
     /* Check mode: collect errors instead of aborting */
     bool check_mode;
     int  error_count;
@@ -35,14 +35,49 @@ typedef enum {
     RELOC_RIP_REL32,    /* RIP-relative 32-bit (lea, mov from .rdata)  */
 } RelocKind;
 
+/* Runtime helpers provided by the PE/ELF stubs.  Calls to them carry
+ * the id in the relocation, so the writers resolve them with one
+ * switch instead of comparing target_sym against every helper name. */
+typedef enum {
+    RTSYM_NONE,         /* not a runtime helper (user function / data) */
+    RTSYM_WRITE_I64,
+    RTSYM_WRITE_STR,
+    RTSYM_WRITE_BOOL,
+    RTSYM_WRITE_CHAR,
+    RTSYM_WRITE_NL,
+    RTSYM_READ_I64,
+    RTSYM_READ_LINE,
+    RTSYM_READ_CHAR,
+    RTSYM_READ_FAILED,
+    RTSYM_MEMCPY,
+    RTSYM_DIV_ZERO,
+    RTSYM_COUNT
+} RuntimeSym;
+
 typedef struct {
     RelocKind   kind;
     int         offset;         /* byte offset in .text where patch goes */
     const char *target_sym;     /* function name or NULL for label       */
     int         target_label;   /* label id (if target_sym == NULL)      */
     int         addend;         /* extra offset to add                   */
+    RuntimeSym  rt;             /* runtime helper, or RTSYM_NONE         */
 } Reloc;
 
+/* ═════════════════════════════════════════════════════════════
+ * Jump site – a jmp/jcc to a label, emitted in rel32 form and
+ * shortened to rel8 by branch relaxation when the target is in range
+ * ═════════════════════════════════════════════════════════════ */
+
+typedef struct {
+    int  pos;           /* code offset of the first opcode byte      */
+    int  label;         /* target label id                           */
+    int  target;        /* label offset, resolved before relaxation  */
+    int  tsite;         /* index of the first jump at/after target   */
+    int  cc;            /* condition code, or -1 for unconditional   */
+    int  near_len;      /* rel32 encoding length (5 jmp, 6 jcc)      */
+    bool is_short;      /* relaxed to the 2-byte rel8 form           */
+} JumpSite;
+
 /* ═════════════════════════════════════════════════════════════
  * Function code info – output per compiled function
  * ═════════════════════════════════════════════════════════════ */
@@ -83,6 +118,7 @@ typedef struct {
     Reloc   *relocs;
     int      reloc_count;
     int      reloc_cap;
+    bool     rt_used[RTSYM_COUNT]; /* runtime helpers the code calls */
 
     /* Per-function info */
     X64Func *funcs;
@@ -96,6 +132,15 @@ typedef struct {
     /* Label → code offset mapping (resolved during codegen) */
     int    *label_offsets;   /* indexed by label_id */
     int     label_cap;
+    int    *fn_labels;       /* ids set in the current function */
+    int     fn_label_count;
+    int     fn_label_cap;
+
+    /* Label jumps of the current function (for branch relaxation) */
+    JumpSite *jumps;
+    int       jump_count;
+    int       jump_cap;
+    int      *jump_saved;    /* Fenwick tree: bytes saved by short sites */
 
     /* Temp → location mapping */
     int     var_area_size;   /* fn->stack_size: variables occupy [rbp-1] .. [rbp-var_area_size] */
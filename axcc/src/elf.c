@@ -8,7 +8,8 @@
  * Runtime stubs (__axis_write_i64, etc.) use Linux syscalls directly
  * (no libc dependency).  The code generator passes arguments using the
  * Windows x64 ABI internally (RCX, RDX, R8, R9); stubs remap to
- * System V as needed for syscalls.
+ * System V as needed for syscalls, saving RSI and RDI around them
+ * since those are callee-saved under the Windows convention.
  *
  * Syscalls used:
  *   SYS_read  (0)  – stdin input
@@ -84,10 +85,20 @@ typedef struct {
  * Stub buffer – growable byte array for emitting runtime stubs
  * ═════════════════════════════════════════════════════════════ */
 
+/* A RIP-relative disp32 into .data, filled in once the layout is known */
 typedef struct {
-    uint8_t *data;
-    int      len;
-    int      cap;
+    int pos;            /* offset of the disp32 within the stub buffer  */
+    int next;           /* offset of the following instruction (= RIP) */
+    int data_off;       /* target offset within .data                  */
+} RipFixup;
+
+typedef struct {
+    uint8_t  *data;
+    int       len;
+    int       cap;
+    RipFixup *fix;
+    int       fix_count;
+    int       fix_cap;
 } StubBuf;
 
 static void sb_init(StubBuf *sb)
@@ -95,27 +106,51 @@ static void sb_init(StubBuf *sb)
     sb->cap = 2048;
     sb->len = 0;
     sb->data = (uint8_t *)calloc(1, (size_t)sb->cap);
+    sb->fix = NULL;
+    sb->fix_count = sb->fix_cap = 0;
 }
 
-static void sb_emit8(StubBuf *sb, uint8_t v)
+static void sb_grow(StubBuf *sb, int need)
 {
-    if (sb->len >= sb->cap) {
+    while (sb->len + need > sb->cap) {
         sb->cap *= 2;
         sb->data = (uint8_t *)realloc(sb->data, (size_t)sb->cap);
     }
+}
+
+/* One capacity check and one memcpy per instruction, not per byte */
+static void sb_emit_bytes(StubBuf *sb, const uint8_t *b, int n)
+{
+    sb_grow(sb, n);
+    memcpy(sb->data + sb->len, b, (size_t)n);
+    sb->len += n;
+}
+
+#define SB_BYTES(sb, ...) \
+    sb_emit_bytes((sb), (const uint8_t[]){ __VA_ARGS__ }, \
+                  (int)sizeof((const uint8_t[]){ __VA_ARGS__ }))
+
+static void sb_emit8(StubBuf *sb, uint8_t v)
+{
+    sb_grow(sb, 1);
     sb->data[sb->len++] = v;
 }
 
 static void sb_emit32(StubBuf *sb, uint32_t v)
 {
-    for (int i = 0; i < 4; i++) sb_emit8(sb, (uint8_t)(v >> (i * 8)));
+    uint8_t b[4] = { (uint8_t)v, (uint8_t)(v >> 8),
+                     (uint8_t)(v >> 16), (uint8_t)(v >> 24) };
+    sb_emit_bytes(sb, b, 4);
 }
 
 static void sb_free(StubBuf *sb)
 {
     free(sb->data);
+    free(sb->fix);
     sb->data = NULL;
+    sb->fix = NULL;
     sb->len = sb->cap = 0;
+    sb->fix_count = sb->fix_cap = 0;
 }
 
 /* ═════════════════════════════════════════════════════════════
@@ -148,70 +183,63 @@ static void init_rt_data(RtData *rt, int rdata_len)
  * ═════════════════════════════════════════════════════════════ */
 
 typedef struct {
-    int write_i64_off;
-    int write_str_off;
-    int write_bool_off;
-    int write_char_off;
-    int write_nl_off;
-    int read_i64_off;
-    int read_line_off;
-    int read_char_off;
-    int read_failed_off;
-    int memcpy_off;
-    int div_zero_off;
+    int off[RTSYM_COUNT];   /* indexed by RuntimeSym; -1 if not emitted */
 } StubOffsets;
 
 /* ═════════════════════════════════════════════════════════════
  * RIP-relative emit helpers
  *
- * All helpers take (text_va, stub_text_off) where:
- *   stub_text_off = user_code_len (stubs start after user code)
- *   actual VA = text_va + stub_text_off + sb->len
+ * Stubs are generated once, before the section layout exists, so
+ * each helper emits a zero disp32 and records a fixup.  sb_patch_rip
+ * fills them in after elf_write has placed .text and .data.
  * ═════════════════════════════════════════════════════════════ */
 
+static void sb_add_fixup(StubBuf *sb, int pos, int next, int data_off)
+{
+    if (sb->fix_count >= sb->fix_cap) {
+        sb->fix_cap = sb->fix_cap ? sb->fix_cap * 2 : 32;
+        sb->fix = (RipFixup *)realloc(sb->fix,
+                                      (size_t)sb->fix_cap * sizeof(RipFixup));
+    }
+    sb->fix[sb->fix_count++] = (RipFixup){ pos, next, data_off };
+}
+
+/* stub_va = VA of the first stub byte (text_va + user_code_len) */
+static void sb_patch_rip(StubBuf *sb, uint64_t stub_va, uint64_t data_va)
+{
+    for (int i = 0; i < sb->fix_count; i++) {
+        const RipFixup *f = &sb->fix[i];
+        int32_t disp = (int32_t)((int64_t)(data_va + (uint64_t)f->data_off)
+                               - (int64_t)(stub_va + (uint64_t)f->next));
+        memcpy(&sb->data[f->pos], &disp, 4);
+    }
+}
+
 /* LEA reg, [rip + disp32]  →  7 bytes */
-static void sb_emit_lea_rip(StubBuf *sb, int reg,
-                            uint64_t data_va, int data_off,
-                            uint64_t text_va, int stub_text_off)
+static void sb_emit_lea_rip(StubBuf *sb, int reg, int data_off)
 {
-    uint64_t rip = text_va + (uint64_t)stub_text_off
-                 + (uint64_t)sb->len + 7;
-    int32_t disp = (int32_t)((int64_t)(data_va + (uint64_t)data_off)
-                           - (int64_t)rip);
-    sb_emit8(sb, (uint8_t)(0x48 | ((reg >= 8) ? 0x04 : 0)));  /* REX.W [+R] */
-    sb_emit8(sb, 0x8D);
-    sb_emit8(sb, (uint8_t)(0x05 | ((reg & 7) << 3)));
-    sb_emit32(sb, (uint32_t)disp);
+    SB_BYTES(sb, (uint8_t)(0x48 | ((reg >= 8) ? 0x04 : 0)),  /* REX.W [+R] */
+                 0x8D,
+                 (uint8_t)(0x05 | ((reg & 7) << 3)));
+    sb_add_fixup(sb, sb->len, sb->len + 4, data_off);
+    sb_emit32(sb, 0);
 }
 
 /* MOV byte [rip + disp32], imm8  →  7 bytes */
-static void sb_emit_mov_rip_byte(StubBuf *sb, uint8_t val,
-                                 uint64_t data_va, int data_off,
-                                 uint64_t text_va, int stub_text_off)
-{
-    uint64_t rip = text_va + (uint64_t)stub_text_off
-                 + (uint64_t)sb->len + 7;
-    int32_t disp = (int32_t)((int64_t)(data_va + (uint64_t)data_off)
-                           - (int64_t)rip);
-    sb_emit8(sb, 0xC6);          /* MOV r/m8, imm8 */
-    sb_emit8(sb, 0x05);          /* modrm: [rip+disp32] */
-    sb_emit32(sb, (uint32_t)disp);
+static void sb_emit_mov_rip_byte(StubBuf *sb, uint8_t val, int data_off)
+{
+    SB_BYTES(sb, 0xC6, 0x05);    /* MOV r/m8, imm8; modrm: [rip+disp32] */
+    sb_add_fixup(sb, sb->len, sb->len + 5, data_off);  /* imm8 follows */
+    sb_emit32(sb, 0);
     sb_emit8(sb, val);
 }
 
 /* MOVZX eax, byte [rip + disp32]  →  7 bytes */
-static void sb_emit_movzx_eax_rip(StubBuf *sb,
-                                  uint64_t data_va, int data_off,
-                                  uint64_t text_va, int stub_text_off)
+static void sb_emit_movzx_eax_rip(StubBuf *sb, int data_off)
 {
-    uint64_t rip = text_va + (uint64_t)stub_text_off
-                 + (uint64_t)sb->len + 7;
-    int32_t disp = (int32_t)((int64_t)(data_va + (uint64_t)data_off)
-                           - (int64_t)rip);
-    sb_emit8(sb, 0x0F);
-    sb_emit8(sb, 0xB6);
-    sb_emit8(sb, 0x05);          /* modrm: eax, [rip+disp32] */
-    sb_emit32(sb, (uint32_t)disp);
+    SB_BYTES(sb, 0x0F, 0xB6, 0x05);  /* modrm: eax, [rip+disp32] */
+    sb_add_fixup(sb, sb->len, sb->len + 4, data_off);
+    sb_emit32(sb, 0);
 }
 
 /* ═════════════════════════════════════════════════════════════
@@ -219,138 +247,142 @@ static void sb_emit_movzx_eax_rip(StubBuf *sb,
  * ═════════════════════════════════════════════════════════════ */
 
 static void sb_emit_push_rbp(StubBuf *sb)   { sb_emit8(sb, 0x55); }
-static void sb_emit_mov_rbp_rsp(StubBuf *sb) {
-    sb_emit8(sb, 0x48); sb_emit8(sb, 0x89); sb_emit8(sb, 0xE5);
-}
+static void sb_emit_mov_rbp_rsp(StubBuf *sb) { SB_BYTES(sb, 0x48, 0x89, 0xE5); }
 static void sb_emit_leave(StubBuf *sb)       { sb_emit8(sb, 0xC9); }
 static void sb_emit_ret(StubBuf *sb)         { sb_emit8(sb, 0xC3); }
-static void sb_emit_syscall(StubBuf *sb)     { sb_emit8(sb, 0x0F); sb_emit8(sb, 0x05); }
+static void sb_emit_syscall(StubBuf *sb)     { SB_BYTES(sb, 0x0F, 0x05); }
 
-/* sub rsp, imm8 */
-static void sb_emit_sub_rsp(StubBuf *sb, uint8_t imm)
+/* The register allocator keeps values in RSI/RDI across runtime
+ * calls (callee-saved in the Windows x64 ABI), but the syscall
+ * stubs need them for arguments: save them on entry and restore
+ * them on every return path. */
+static void sb_emit_save_rsi_rdi(StubBuf *sb)
 {
-    sb_emit8(sb, 0x48); sb_emit8(sb, 0x83);
-    sb_emit8(sb, 0xEC); sb_emit8(sb, imm);
+    SB_BYTES(sb, 0x56, 0x57);                                   /* push rsi; push rdi */
 }
 
-/* ═════════════════════════════════════════════════════════════
- * Generate all runtime stubs using Linux syscalls
- * ═════════════════════════════════════════════════════════════ */
-
-static StubOffsets gen_stubs(StubBuf *sb,
-                             const RtData *rt,
-                             uint64_t text_va,
-                             uint64_t data_va,
-                             int user_code_len)
+static void sb_emit_restore_ret(StubBuf *sb)
 {
-    StubOffsets so;
-    sb_init(sb);
-
-    int base = user_code_len;
+    SB_BYTES(sb, 0x5F, 0x5E);                                   /* pop rdi; pop rsi */
+    sb_emit_ret(sb);
+}
 
-    /* ────────────────────────────────────────────────────────
-     * __axis_write_i64(value in RCX)
-     * Convert int64 to decimal string on stack, write to stdout.
-     * ──────────────────────────────────────────────────────── */
-    so.write_i64_off = base + sb->len;
+/* sub rsp, imm8 */
+static void sb_emit_sub_rsp(StubBuf *sb, uint8_t imm)
+{
+    SB_BYTES(sb, 0x48, 0x83, 0xEC, imm);
+}
 
+/* ────────────────────────────────────────────────────────
+ * __axis_write_i64(value in RCX)
+ * Convert int64 to decimal string on stack, write to stdout.
+ * ──────────────────────────────────────────────────────── */
+static void stub_write_i64(StubBuf *sb, const RtData *rt)
+{
+    (void)rt;
+    sb_emit_save_rsi_rdi(sb);
     sb_emit_push_rbp(sb);                                     /* push rbp          */
     sb_emit_mov_rbp_rsp(sb);                                  /* mov rbp, rsp      */
     sb_emit_sub_rsp(sb, 48);                                  /* sub rsp, 48       */
 
-    sb_emit8(sb, 0x48); sb_emit8(sb, 0x89); sb_emit8(sb, 0xC8); /* mov rax, rcx   */
-    sb_emit8(sb, 0x45); sb_emit8(sb, 0x31); sb_emit8(sb, 0xC0); /* xor r8d, r8d   */
-    sb_emit8(sb, 0x48); sb_emit8(sb, 0x85); sb_emit8(sb, 0xC0); /* test rax, rax  */
-    sb_emit8(sb, 0x79); sb_emit8(sb, 0x09);                     /* jns .pos (+9)  */
-    sb_emit8(sb, 0x48); sb_emit8(sb, 0xF7); sb_emit8(sb, 0xD8); /* neg rax        */
-    sb_emit8(sb, 0x41); sb_emit8(sb, 0xB8);                     /* mov r8d, 1     */
+    SB_BYTES(sb, 0x48, 0x89, 0xC8);                             /* mov rax, rcx   */
+    SB_BYTES(sb, 0x45, 0x31, 0xC0);                             /* xor r8d, r8d   */
+    SB_BYTES(sb, 0x48, 0x85, 0xC0);                             /* test rax, rax  */
+    SB_BYTES(sb, 0x79, 0x09);                                   /* jns .pos (+9)  */
+    SB_BYTES(sb, 0x48, 0xF7, 0xD8);                             /* neg rax        */
+    SB_BYTES(sb, 0x41, 0xB8);                                   /* mov r8d, 1     */
     sb_emit32(sb, 1);
     /* .pos: */
-    sb_emit8(sb, 0x4C); sb_emit8(sb, 0x8D); sb_emit8(sb, 0x5D); /* lea r11,[rbp+0]*/
+    SB_BYTES(sb, 0x4C, 0x8D, 0x5D);                             /* lea r11,[rbp+0]*/
     sb_emit8(sb, 0x00);
-    sb_emit8(sb, 0x49); sb_emit8(sb, 0xC7); sb_emit8(sb, 0xC1); /* mov r9, 10     */
+    SB_BYTES(sb, 0x49, 0xC7, 0xC1);                             /* mov r9, 10     */
     sb_emit32(sb, 10);
 
     /* .loop: */
     int loop_pos = sb->len;
-    sb_emit8(sb, 0x31); sb_emit8(sb, 0xD2);                     /* xor edx, edx   */
-    sb_emit8(sb, 0x49); sb_emit8(sb, 0xF7); sb_emit8(sb, 0xF1); /* div r9         */
-    sb_emit8(sb, 0x80); sb_emit8(sb, 0xC2); sb_emit8(sb, 0x30); /* add dl, '0'    */
-    sb_emit8(sb, 0x49); sb_emit8(sb, 0xFF); sb_emit8(sb, 0xCB); /* dec r11        */
-    sb_emit8(sb, 0x41); sb_emit8(sb, 0x88); sb_emit8(sb, 0x13); /* mov [r11], dl  */
-    sb_emit8(sb, 0x48); sb_emit8(sb, 0x85); sb_emit8(sb, 0xC0); /* test rax, rax  */
+    SB_BYTES(sb, 0x31, 0xD2);                                   /* xor edx, edx   */
+    SB_BYTES(sb, 0x49, 0xF7, 0xF1);                             /* div r9         */
+    SB_BYTES(sb, 0x80, 0xC2, 0x30);                             /* add dl, '0'    */
+    SB_BYTES(sb, 0x49, 0xFF, 0xCB);                             /* dec r11        */
+    SB_BYTES(sb, 0x41, 0x88, 0x13);                             /* mov [r11], dl  */
+    SB_BYTES(sb, 0x48, 0x85, 0xC0);                             /* test rax, rax  */
     /* jnz .loop */
     sb_emit8(sb, 0x75);
     sb_emit8(sb, (uint8_t)(loop_pos - (sb->len + 1)));
 
-    sb_emit8(sb, 0x45); sb_emit8(sb, 0x85); sb_emit8(sb, 0xC0); /* test r8d, r8d  */
-    sb_emit8(sb, 0x74); sb_emit8(sb, 0x07);                     /* jz .write (+7) */
-    sb_emit8(sb, 0x49); sb_emit8(sb, 0xFF); sb_emit8(sb, 0xCB); /* dec r11        */
-    sb_emit8(sb, 0x41); sb_emit8(sb, 0xC6); sb_emit8(sb, 0x03); /* mov byte[r11], */
+    SB_BYTES(sb, 0x45, 0x85, 0xC0);                             /* test r8d, r8d  */
+    SB_BYTES(sb, 0x74, 0x07);                                   /* jz .write (+7) */
+    SB_BYTES(sb, 0x49, 0xFF, 0xCB);                             /* dec r11        */
+    SB_BYTES(sb, 0x41, 0xC6, 0x03);                             /* mov byte[r11], */
     sb_emit8(sb, 0x2D);                                          /*   '-'          */
 
     /* .write: write(1, r11, len) */
     sb_emit8(sb, 0xB8); sb_emit32(sb, SYS_WRITE);               /* mov eax, 1     */
     sb_emit8(sb, 0xBF); sb_emit32(sb, 1);                       /* mov edi, 1     */
-    sb_emit8(sb, 0x4C); sb_emit8(sb, 0x89); sb_emit8(sb, 0xDE); /* mov rsi, r11   */
-    sb_emit8(sb, 0x48); sb_emit8(sb, 0x8D); sb_emit8(sb, 0x55); /* lea rdx,[rbp+0]*/
+    SB_BYTES(sb, 0x4C, 0x89, 0xDE);                             /* mov rsi, r11   */
+    SB_BYTES(sb, 0x48, 0x8D, 0x55);                             /* lea rdx,[rbp+0]*/
     sb_emit8(sb, 0x00);
-    sb_emit8(sb, 0x48); sb_emit8(sb, 0x29); sb_emit8(sb, 0xF2); /* sub rdx, rsi   */
+    SB_BYTES(sb, 0x48, 0x29, 0xF2);                             /* sub rdx, rsi   */
     sb_emit_syscall(sb);
     sb_emit_leave(sb);
-    sb_emit_ret(sb);
-
-    /* ────────────────────────────────────────────────────────
-     * __axis_write_str(pointer in RCX)
-     * strlen + write to stdout.
-     * ──────────────────────────────────────────────────────── */
-    so.write_str_off = base + sb->len;
+    sb_emit_restore_ret(sb);
+}
 
+/* ────────────────────────────────────────────────────────
+ * __axis_write_str(pointer in RCX)
+ * strlen + write to stdout.
+ * ──────────────────────────────────────────────────────── */
+static void stub_write_str(StubBuf *sb, const RtData *rt)
+{
+    (void)rt;
+    sb_emit_save_rsi_rdi(sb);
     sb_emit_push_rbp(sb);
     sb_emit_mov_rbp_rsp(sb);
-    sb_emit8(sb, 0x48); sb_emit8(sb, 0x89); sb_emit8(sb, 0xCF); /* mov rdi, rcx   */
-    sb_emit8(sb, 0x48); sb_emit8(sb, 0x89); sb_emit8(sb, 0xCE); /* mov rsi, rcx   */
+    SB_BYTES(sb, 0x48, 0x89, 0xCF);                             /* mov rdi, rcx   */
+    SB_BYTES(sb, 0x48, 0x89, 0xCE);                             /* mov rsi, rcx   */
 
     /* .strlen_loop: */
     int str_loop = sb->len;
-    sb_emit8(sb, 0x80); sb_emit8(sb, 0x3F); sb_emit8(sb, 0x00); /* cmp byte[rdi],0*/
-    sb_emit8(sb, 0x74); sb_emit8(sb, 0x05);                     /* je .done (+5)  */
-    sb_emit8(sb, 0x48); sb_emit8(sb, 0xFF); sb_emit8(sb, 0xC7); /* inc rdi        */
+    SB_BYTES(sb, 0x80, 0x3F, 0x00);                             /* cmp byte[rdi],0*/
+    SB_BYTES(sb, 0x74, 0x05);                                   /* je .done (+5)  */
+    SB_BYTES(sb, 0x48, 0xFF, 0xC7);                             /* inc rdi        */
     /* jmp .strlen_loop */
     sb_emit8(sb, 0xEB);
     sb_emit8(sb, (uint8_t)(str_loop - (sb->len + 1)));
 
     /* .done: rdi = past end, rsi = start */
-    sb_emit8(sb, 0x48); sb_emit8(sb, 0x89); sb_emit8(sb, 0xFA); /* mov rdx, rdi   */
-    sb_emit8(sb, 0x48); sb_emit8(sb, 0x29); sb_emit8(sb, 0xF2); /* sub rdx, rsi   */
+    SB_BYTES(sb, 0x48, 0x89, 0xFA);                             /* mov rdx, rdi   */
+    SB_BYTES(sb, 0x48, 0x29, 0xF2);                             /* sub rdx, rsi   */
     sb_emit8(sb, 0xB8); sb_emit32(sb, SYS_WRITE);               /* mov eax, 1     */
     sb_emit8(sb, 0xBF); sb_emit32(sb, 1);                       /* mov edi, 1     */
     sb_emit_syscall(sb);
     sb_emit_leave(sb);
-    sb_emit_ret(sb);
-
-    /* ────────────────────────────────────────────────────────
-     * __axis_write_bool(value in RCX)
-     * Write "true" or "false" to stdout.
-     * ──────────────────────────────────────────────────────── */
-    so.write_bool_off = base + sb->len;
+    sb_emit_restore_ret(sb);
+}
 
+/* ────────────────────────────────────────────────────────
+ * __axis_write_bool(value in RCX)
+ * Write "true" or "false" to stdout.
+ * ──────────────────────────────────────────────────────── */
+static void stub_write_bool(StubBuf *sb, const RtData *rt)
+{
+    sb_emit_save_rsi_rdi(sb);
     sb_emit_push_rbp(sb);
     sb_emit_mov_rbp_rsp(sb);
-    sb_emit8(sb, 0x85); sb_emit8(sb, 0xC9);                     /* test ecx, ecx  */
+    SB_BYTES(sb, 0x85, 0xC9);                                   /* test ecx, ecx  */
 
     int jz_patch = sb->len;
-    sb_emit8(sb, 0x74); sb_emit8(sb, 0x00);                     /* jz .false (patch) */
+    SB_BYTES(sb, 0x74, 0x00);                                   /* jz .false (patch) */
 
     /* "true" path */
-    sb_emit_lea_rip(sb, RSI, data_va, rt->true_off, text_va, base);
+    sb_emit_lea_rip(sb, RSI, rt->true_off);
     sb_emit8(sb, 0xBA); sb_emit32(sb, 4);                       /* mov edx, 4     */
     int jmp_patch = sb->len;
-    sb_emit8(sb, 0xEB); sb_emit8(sb, 0x00);                     /* jmp .write (patch) */
+    SB_BYTES(sb, 0xEB, 0x00);                                   /* jmp .write (patch) */
 
     /* .false: */
     sb->data[jz_patch + 1] = (uint8_t)(sb->len - (jz_patch + 2));
-    sb_emit_lea_rip(sb, RSI, data_va, rt->false_off, text_va, base);
+    sb_emit_lea_rip(sb, RSI, rt->false_off);
     sb_emit8(sb, 0xBA); sb_emit32(sb, 5);                       /* mov edx, 5     */
 
     /* .write: */
@@ -359,242 +391,242 @@ static StubOffsets gen_stubs(StubBuf *sb,
     sb_emit8(sb, 0xBF); sb_emit32(sb, 1);                       /* mov edi, 1     */
     sb_emit_syscall(sb);
     sb_emit_leave(sb);
-    sb_emit_ret(sb);
-
-    /* ────────────────────────────────────────────────────────
-     * __axis_write_char(char in CL)
-     * Push char, write 1 byte to stdout.
-     * ──────────────────────────────────────────────────────── */
-    so.write_char_off = base + sb->len;
+    sb_emit_restore_ret(sb);
+}
 
+/* ────────────────────────────────────────────────────────
+ * __axis_write_char(char in CL)
+ * Push char, write 1 byte to stdout.
+ * ──────────────────────────────────────────────────────── */
+static void stub_write_char(StubBuf *sb, const RtData *rt)
+{
+    (void)rt;
+    sb_emit_save_rsi_rdi(sb);
     sb_emit_push_rbp(sb);
     sb_emit_mov_rbp_rsp(sb);
     sb_emit8(sb, 0x51);                                          /* push rcx       */
-    sb_emit8(sb, 0x48); sb_emit8(sb, 0x89); sb_emit8(sb, 0xE6); /* mov rsi, rsp   */
+    SB_BYTES(sb, 0x48, 0x89, 0xE6);                             /* mov rsi, rsp   */
     sb_emit8(sb, 0xBA); sb_emit32(sb, 1);                       /* mov edx, 1     */
     sb_emit8(sb, 0xB8); sb_emit32(sb, SYS_WRITE);               /* mov eax, 1     */
     sb_emit8(sb, 0xBF); sb_emit32(sb, 1);                       /* mov edi, 1     */
     sb_emit_syscall(sb);
     sb_emit_leave(sb);
-    sb_emit_ret(sb);
-
-    /* ────────────────────────────────────────────────────────
-     * __axis_write_nl()
-     * Write newline character.
-     * ──────────────────────────────────────────────────────── */
-    so.write_nl_off = base + sb->len;
+    sb_emit_restore_ret(sb);
+}
 
+/* ────────────────────────────────────────────────────────
+ * __axis_write_nl()
+ * Write newline character.
+ * ──────────────────────────────────────────────────────── */
+static void stub_write_nl(StubBuf *sb, const RtData *rt)
+{
+    (void)rt;
+    sb_emit_save_rsi_rdi(sb);
     sb_emit_push_rbp(sb);
     sb_emit_mov_rbp_rsp(sb);
-    sb_emit8(sb, 0x6A); sb_emit8(sb, 0x0A);                     /* push 0x0A      */
-    sb_emit8(sb, 0x48); sb_emit8(sb, 0x89); sb_emit8(sb, 0xE6); /* mov rsi, rsp   */
+    SB_BYTES(sb, 0x6A, 0x0A);                                   /* push 0x0A      */
+    SB_BYTES(sb, 0x48, 0x89, 0xE6);                             /* mov rsi, rsp   */
     sb_emit8(sb, 0xBA); sb_emit32(sb, 1);                       /* mov edx, 1     */
     sb_emit8(sb, 0xB8); sb_emit32(sb, SYS_WRITE);               /* mov eax, 1     */
     sb_emit8(sb, 0xBF); sb_emit32(sb, 1);                       /* mov edi, 1     */
     sb_emit_syscall(sb);
     sb_emit_leave(sb);
-    sb_emit_ret(sb);
-
-    /* ────────────────────────────────────────────────────────
-     * __axis_read_i64()
-     * Read line from stdin, parse decimal integer, return in RAX.
-     * Sets read_failed flag on error.
-     * ──────────────────────────────────────────────────────── */
-    so.read_i64_off = base + sb->len;
-
-    sb_emit_push_rbp(sb);
-    sb_emit_mov_rbp_rsp(sb);
-    sb_emit_sub_rsp(sb, 48);
+    sb_emit_restore_ret(sb);
+}
 
-    /* read(0, rbp-32, 31) */
-    sb_emit8(sb, 0x31); sb_emit8(sb, 0xC0);                     /* xor eax, eax   */
-    sb_emit8(sb, 0x31); sb_emit8(sb, 0xFF);                     /* xor edi, edi   */
-    sb_emit8(sb, 0x48); sb_emit8(sb, 0x8D); sb_emit8(sb, 0x75); /* lea rsi,[rbp-32]*/
+/* ────────────────────────────────────────────────────────
+ * __axis_read_i64()
+ * Read line from stdin, parse decimal integer, return in RAX.
+ * Sets read_failed flag on error.
+ * ──────────────────────────────────────────────────────── */
+static void stub_read_i64(StubBuf *sb, const RtData *rt)
+{
+    /* Leaf stub: the digits go in the red zone below rsp, so there
+     * is no frame to set up or tear down on each call. */
+    sb_emit_save_rsi_rdi(sb);
+
+    /* read(0, rsp-32, 31) */
+    SB_BYTES(sb, 0x31, 0xC0);                                   /* xor eax, eax   */
+    SB_BYTES(sb, 0x31, 0xFF);                                   /* xor edi, edi   */
+    SB_BYTES(sb, 0x48, 0x8D, 0x74, 0x24);                       /* lea rsi,[rsp-32]*/
     sb_emit8(sb, 0xE0);
     sb_emit8(sb, 0xBA); sb_emit32(sb, 31);                      /* mov edx, 31    */
     sb_emit_syscall(sb);
 
     /* test eax, eax; jle .error */
-    sb_emit8(sb, 0x85); sb_emit8(sb, 0xC0);                     /* test eax, eax  */
+    SB_BYTES(sb, 0x85, 0xC0);                                   /* test eax, eax  */
     int jle_patch_ri = sb->len;
-    sb_emit8(sb, 0x7E); sb_emit8(sb, 0x00);                     /* jle .error (patch) */
+    SB_BYTES(sb, 0x7E, 0x00);                                   /* jle .error (patch) */
 
     /* Parse decimal: r10 = pointer, rax = result, r8d = neg flag */
-    sb_emit8(sb, 0x4C); sb_emit8(sb, 0x8D); sb_emit8(sb, 0x55); /* lea r10,[rbp-32]*/
+    SB_BYTES(sb, 0x4C, 0x8D, 0x54, 0x24);                       /* lea r10,[rsp-32]*/
     sb_emit8(sb, 0xE0);
-    sb_emit8(sb, 0x31); sb_emit8(sb, 0xC0);                     /* xor eax, eax   */
-    sb_emit8(sb, 0x45); sb_emit8(sb, 0x31); sb_emit8(sb, 0xC0); /* xor r8d, r8d   */
+    SB_BYTES(sb, 0x31, 0xC0);                                   /* xor eax, eax   */
+    SB_BYTES(sb, 0x45, 0x31, 0xC0);                             /* xor r8d, r8d   */
 
     /* Check for '-' */
-    sb_emit8(sb, 0x41); sb_emit8(sb, 0x0F); sb_emit8(sb, 0xB6); /* movzx ecx,[r10]*/
+    SB_BYTES(sb, 0x41, 0x0F, 0xB6);                             /* movzx ecx,[r10]*/
     sb_emit8(sb, 0x0A);
-    sb_emit8(sb, 0x80); sb_emit8(sb, 0xF9); sb_emit8(sb, 0x2D); /* cmp cl, '-'    */
-    sb_emit8(sb, 0x75); sb_emit8(sb, 0x09);                     /* jne .digit (+9)*/
+    SB_BYTES(sb, 0x80, 0xF9, 0x2D);                             /* cmp cl, '-'    */
+    SB_BYTES(sb, 0x75, 0x09);                                   /* jne .digit (+9)*/
     sb_emit8(sb, 0x41); sb_emit8(sb, 0xB8); sb_emit32(sb, 1);   /* mov r8d, 1     */
-    sb_emit8(sb, 0x49); sb_emit8(sb, 0xFF); sb_emit8(sb, 0xC2); /* inc r10        */
+    SB_BYTES(sb, 0x49, 0xFF, 0xC2);                             /* inc r10        */
 
     /* .digit: */
     int digit_loop = sb->len;
-    sb_emit8(sb, 0x41); sb_emit8(sb, 0x0F); sb_emit8(sb, 0xB6); /* movzx ecx,[r10]*/
+    SB_BYTES(sb, 0x41, 0x0F, 0xB6);                             /* movzx ecx,[r10]*/
     sb_emit8(sb, 0x0A);
-    sb_emit8(sb, 0x80); sb_emit8(sb, 0xE9); sb_emit8(sb, 0x30); /* sub cl, '0'    */
-    sb_emit8(sb, 0x80); sb_emit8(sb, 0xF9); sb_emit8(sb, 0x09); /* cmp cl, 9      */
+    SB_BYTES(sb, 0x80, 0xE9, 0x30);                             /* sub cl, '0'    */
+    SB_BYTES(sb, 0x80, 0xF9, 0x09);                             /* cmp cl, 9      */
     /* ja .parse_done (skip imul+movzx+add+inc+jmp = 4+3+3+3+2 = 15) */
-    sb_emit8(sb, 0x77); sb_emit8(sb, 0x0F);
-    sb_emit8(sb, 0x48); sb_emit8(sb, 0x6B); sb_emit8(sb, 0xC0); /* imul rax,rax,10*/
+    SB_BYTES(sb, 0x77, 0x0F);
+    SB_BYTES(sb, 0x48, 0x6B, 0xC0);                             /* imul rax,rax,10*/
     sb_emit8(sb, 0x0A);
-    sb_emit8(sb, 0x0F); sb_emit8(sb, 0xB6); sb_emit8(sb, 0xC9); /* movzx ecx, cl  */
-    sb_emit8(sb, 0x48); sb_emit8(sb, 0x01); sb_emit8(sb, 0xC8); /* add rax, rcx   */
-    sb_emit8(sb, 0x49); sb_emit8(sb, 0xFF); sb_emit8(sb, 0xC2); /* inc r10        */
+    SB_BYTES(sb, 0x0F, 0xB6, 0xC9);                             /* movzx ecx, cl  */
+    SB_BYTES(sb, 0x48, 0x01, 0xC8);                             /* add rax, rcx   */
+    SB_BYTES(sb, 0x49, 0xFF, 0xC2);                             /* inc r10        */
     /* jmp .digit */
     sb_emit8(sb, 0xEB);
     sb_emit8(sb, (uint8_t)(digit_loop - (sb->len + 1)));
 
     /* .parse_done: negate if needed */
-    sb_emit8(sb, 0x45); sb_emit8(sb, 0x85); sb_emit8(sb, 0xC0); /* test r8d, r8d  */
-    sb_emit8(sb, 0x74); sb_emit8(sb, 0x03);                     /* jz .ok (+3)    */
-    sb_emit8(sb, 0x48); sb_emit8(sb, 0xF7); sb_emit8(sb, 0xD8); /* neg rax        */
+    SB_BYTES(sb, 0x45, 0x85, 0xC0);                             /* test r8d, r8d  */
+    SB_BYTES(sb, 0x74, 0x03);                                   /* jz .ok (+3)    */
+    SB_BYTES(sb, 0x48, 0xF7, 0xD8);                             /* neg rax        */
 
     /* .ok: clear flag, return */
-    sb_emit_mov_rip_byte(sb, 0, data_va, rt->flag_off, text_va, base);
-    sb_emit_leave(sb);
-    sb_emit_ret(sb);
+    sb_emit_mov_rip_byte(sb, 0, rt->flag_off);
+    sb_emit_restore_ret(sb);
 
     /* .error: set flag, return 0 */
     sb->data[jle_patch_ri + 1] = (uint8_t)(sb->len - (jle_patch_ri + 2));
-    sb_emit8(sb, 0x31); sb_emit8(sb, 0xC0);                     /* xor eax, eax   */
-    sb_emit_mov_rip_byte(sb, 1, data_va, rt->flag_off, text_va, base);
-    sb_emit_leave(sb);
-    sb_emit_ret(sb);
-
-    /* ────────────────────────────────────────────────────────
-     * __axis_read_line()
-     * Read line from stdin into static buffer.
-     * Strips trailing newline, null-terminates.
-     * Returns pointer to buffer in RAX.
-     * ──────────────────────────────────────────────────────── */
-    so.read_line_off = base + sb->len;
-
-    sb_emit_push_rbp(sb);
-    sb_emit_mov_rbp_rsp(sb);
+    SB_BYTES(sb, 0x31, 0xC0);                                   /* xor eax, eax   */
+    sb_emit_mov_rip_byte(sb, 1, rt->flag_off);
+    sb_emit_restore_ret(sb);
+}
 
+/* ────────────────────────────────────────────────────────
+ * __axis_read_line()
+ * Read line from stdin into static buffer.
+ * Strips trailing newline, null-terminates.
+ * Returns pointer to buffer in RAX.
+ * ──────────────────────────────────────────────────────── */
+static void stub_read_line(StubBuf *sb, const RtData *rt)
+{
+    sb_emit_save_rsi_rdi(sb);
     /* read(0, buf, 255) */
-    sb_emit8(sb, 0x31); sb_emit8(sb, 0xC0);                     /* xor eax, eax   */
-    sb_emit8(sb, 0x31); sb_emit8(sb, 0xFF);                     /* xor edi, edi   */
-    sb_emit_lea_rip(sb, RSI, data_va, rt->buf_off, text_va, base);
+    SB_BYTES(sb, 0x31, 0xC0);                                   /* xor eax, eax   */
+    SB_BYTES(sb, 0x31, 0xFF);                                   /* xor edi, edi   */
+    sb_emit_lea_rip(sb, RSI, rt->buf_off);
     sb_emit8(sb, 0xBA); sb_emit32(sb, 255);                     /* mov edx, 255   */
     sb_emit_syscall(sb);
 
-    sb_emit8(sb, 0x85); sb_emit8(sb, 0xC0);                     /* test eax, eax  */
+    SB_BYTES(sb, 0x85, 0xC0);                                   /* test eax, eax  */
     int jle_patch_rl = sb->len;
-    sb_emit8(sb, 0x7E); sb_emit8(sb, 0x00);                     /* jle .error     */
+    SB_BYTES(sb, 0x7E, 0x00);                                   /* jle .error     */
 
     /* Save byte count in r9d */
-    sb_emit8(sb, 0x41); sb_emit8(sb, 0x89); sb_emit8(sb, 0xC1); /* mov r9d, eax   */
+    SB_BYTES(sb, 0x41, 0x89, 0xC1);                             /* mov r9d, eax   */
 
     /* Scan for newline: rdi = buf, ecx = count */
-    sb_emit_lea_rip(sb, RDI, data_va, rt->buf_off, text_va, base);
-    sb_emit8(sb, 0x44); sb_emit8(sb, 0x89); sb_emit8(sb, 0xC9); /* mov ecx, r9d   */
+    sb_emit_lea_rip(sb, RDI, rt->buf_off);
+    SB_BYTES(sb, 0x44, 0x89, 0xC9);                             /* mov ecx, r9d   */
 
     /* .scan: */
     int scan_loop = sb->len;
-    sb_emit8(sb, 0x85); sb_emit8(sb, 0xC9);                     /* test ecx, ecx  */
-    sb_emit8(sb, 0x74); sb_emit8(sb, 0x0C);                     /* jz .done (+12) */
-    sb_emit8(sb, 0x80); sb_emit8(sb, 0x3F); sb_emit8(sb, 0x0A); /* cmp byte[rdi],\n */
-    sb_emit8(sb, 0x74); sb_emit8(sb, 0x07);                     /* je .done (+7)  */
-    sb_emit8(sb, 0x48); sb_emit8(sb, 0xFF); sb_emit8(sb, 0xC7); /* inc rdi        */
-    sb_emit8(sb, 0xFF); sb_emit8(sb, 0xC9);                     /* dec ecx        */
+    SB_BYTES(sb, 0x85, 0xC9);                                   /* test ecx, ecx  */
+    SB_BYTES(sb, 0x74, 0x0C);                                   /* jz .done (+12) */
+    SB_BYTES(sb, 0x80, 0x3F, 0x0A);                             /* cmp byte[rdi],\n */
+    SB_BYTES(sb, 0x74, 0x07);                                   /* je .done (+7)  */
+    SB_BYTES(sb, 0x48, 0xFF, 0xC7);                             /* inc rdi        */
+    SB_BYTES(sb, 0xFF, 0xC9);                                   /* dec ecx        */
     /* jmp .scan */
     sb_emit8(sb, 0xEB);
     sb_emit8(sb, (uint8_t)(scan_loop - (sb->len + 1)));
 
     /* .done: null-terminate at rdi */
-    sb_emit8(sb, 0xC6); sb_emit8(sb, 0x07); sb_emit8(sb, 0x00); /* mov byte[rdi],0*/
+    SB_BYTES(sb, 0xC6, 0x07, 0x00);                             /* mov byte[rdi],0*/
 
     /* Return buffer pointer in rax */
-    sb_emit_lea_rip(sb, RAX, data_va, rt->buf_off, text_va, base);
+    sb_emit_lea_rip(sb, RAX, rt->buf_off);
     /* Clear flag */
-    sb_emit_mov_rip_byte(sb, 0, data_va, rt->flag_off, text_va, base);
-    sb_emit_leave(sb);
-    sb_emit_ret(sb);
+    sb_emit_mov_rip_byte(sb, 0, rt->flag_off);
+    sb_emit_restore_ret(sb);
 
     /* .error: */
     sb->data[jle_patch_rl + 1] = (uint8_t)(sb->len - (jle_patch_rl + 2));
-    sb_emit8(sb, 0x31); sb_emit8(sb, 0xC0);                     /* xor eax, eax   */
-    sb_emit_mov_rip_byte(sb, 1, data_va, rt->flag_off, text_va, base);
-    sb_emit_leave(sb);
-    sb_emit_ret(sb);
-
-    /* ────────────────────────────────────────────────────────
-     * __axis_read_char()
-     * Read 1 byte from stdin, return in RAX.
-     * ──────────────────────────────────────────────────────── */
-    so.read_char_off = base + sb->len;
-
-    sb_emit_push_rbp(sb);
-    sb_emit_mov_rbp_rsp(sb);
-    sb_emit_sub_rsp(sb, 16);
+    SB_BYTES(sb, 0x31, 0xC0);                                   /* xor eax, eax   */
+    sb_emit_mov_rip_byte(sb, 1, rt->flag_off);
+    sb_emit_restore_ret(sb);
+}
 
-    /* read(0, rbp-1, 1) */
-    sb_emit8(sb, 0x31); sb_emit8(sb, 0xC0);                     /* xor eax, eax   */
-    sb_emit8(sb, 0x31); sb_emit8(sb, 0xFF);                     /* xor edi, edi   */
-    sb_emit8(sb, 0x48); sb_emit8(sb, 0x8D); sb_emit8(sb, 0x75); /* lea rsi,[rbp-1]*/
-    sb_emit8(sb, 0xFF);
+/* ────────────────────────────────────────────────────────
+ * __axis_read_char()
+ * Read 1 byte from stdin, return in RAX.
+ * ──────────────────────────────────────────────────────── */
+static void stub_read_char(StubBuf *sb, const RtData *rt)
+{
+    /* Leaf stub: the byte lands in the red zone below rsp */
+    sb_emit_save_rsi_rdi(sb);
+
+    /* read(0, rsp-8, 1) */
+    SB_BYTES(sb, 0x31, 0xC0);                                   /* xor eax, eax   */
+    SB_BYTES(sb, 0x31, 0xFF);                                   /* xor edi, edi   */
+    SB_BYTES(sb, 0x48, 0x8D, 0x74, 0x24);                       /* lea rsi,[rsp-8]*/
+    sb_emit8(sb, 0xF8);
     sb_emit8(sb, 0xBA); sb_emit32(sb, 1);                       /* mov edx, 1     */
     sb_emit_syscall(sb);
 
-    sb_emit8(sb, 0x85); sb_emit8(sb, 0xC0);                     /* test eax, eax  */
+    SB_BYTES(sb, 0x85, 0xC0);                                   /* test eax, eax  */
     int jle_patch_rc = sb->len;
-    sb_emit8(sb, 0x7E); sb_emit8(sb, 0x00);                     /* jle .error     */
+    SB_BYTES(sb, 0x7E, 0x00);                                   /* jle .error     */
 
-    sb_emit8(sb, 0x0F); sb_emit8(sb, 0xB6); sb_emit8(sb, 0x45); /* movzx eax,[rbp-1]*/
-    sb_emit8(sb, 0xFF);
-    sb_emit_mov_rip_byte(sb, 0, data_va, rt->flag_off, text_va, base);
-    sb_emit_leave(sb);
-    sb_emit_ret(sb);
+    SB_BYTES(sb, 0x0F, 0xB6, 0x44, 0x24);                       /* movzx eax,[rsp-8]*/
+    sb_emit8(sb, 0xF8);
+    sb_emit_mov_rip_byte(sb, 0, rt->flag_off);
+    sb_emit_restore_ret(sb);
 
     /* .error: */
     sb->data[jle_patch_rc + 1] = (uint8_t)(sb->len - (jle_patch_rc + 2));
-    sb_emit8(sb, 0x31); sb_emit8(sb, 0xC0);                     /* xor eax, eax   */
-    sb_emit_mov_rip_byte(sb, 1, data_va, rt->flag_off, text_va, base);
-    sb_emit_leave(sb);
-    sb_emit_ret(sb);
-
-    /* ────────────────────────────────────────────────────────
-     * __axis_read_failed()
-     * Return read_failed flag (0 or 1) in RAX.
-     * ──────────────────────────────────────────────────────── */
-    so.read_failed_off = base + sb->len;
+    SB_BYTES(sb, 0x31, 0xC0);                                   /* xor eax, eax   */
+    sb_emit_mov_rip_byte(sb, 1, rt->flag_off);
+    sb_emit_restore_ret(sb);
+}
 
-    sb_emit_push_rbp(sb);
-    sb_emit_mov_rbp_rsp(sb);
-    sb_emit_movzx_eax_rip(sb, data_va, rt->flag_off, text_va, base);
-    sb_emit_leave(sb);
+/* ────────────────────────────────────────────────────────
+ * __axis_read_failed()
+ * Return read_failed flag (0 or 1) in RAX.
+ * ──────────────────────────────────────────────────────── */
+static void stub_read_failed(StubBuf *sb, const RtData *rt)
+{
+    sb_emit_movzx_eax_rip(sb, rt->flag_off);
     sb_emit_ret(sb);
+}
 
-    /* ────────────────────────────────────────────────────────
-     * __axis_memcpy(dst=RCX, src=RDX, count=R8)
-     * ──────────────────────────────────────────────────────── */
-    so.memcpy_off = base + sb->len;
-
+/* ────────────────────────────────────────────────────────
+ * __axis_memcpy(dst=RCX, src=RDX, count=R8)
+ * ──────────────────────────────────────────────────────── */
+static void stub_memcpy(StubBuf *sb, const RtData *rt)
+{
+    (void)rt;
     sb_emit8(sb, 0x57);                                          /* push rdi       */
     sb_emit8(sb, 0x56);                                          /* push rsi       */
-    sb_emit8(sb, 0x48); sb_emit8(sb, 0x89); sb_emit8(sb, 0xCF); /* mov rdi, rcx   */
-    sb_emit8(sb, 0x48); sb_emit8(sb, 0x89); sb_emit8(sb, 0xD6); /* mov rsi, rdx   */
-    sb_emit8(sb, 0x4C); sb_emit8(sb, 0x89); sb_emit8(sb, 0xC1); /* mov rcx, r8    */
-    sb_emit8(sb, 0xF3); sb_emit8(sb, 0xA4);                     /* rep movsb      */
+    SB_BYTES(sb, 0x48, 0x89, 0xCF);                             /* mov rdi, rcx   */
+    SB_BYTES(sb, 0x48, 0x89, 0xD6);                             /* mov rsi, rdx   */
+    SB_BYTES(sb, 0x4C, 0x89, 0xC1);                             /* mov rcx, r8    */
+    SB_BYTES(sb, 0xF3, 0xA4);                                   /* rep movsb      */
     sb_emit8(sb, 0x5E);                                          /* pop rsi        */
     sb_emit8(sb, 0x5F);                                          /* pop rdi        */
     sb_emit_ret(sb);
+}
 
-    /* ────────────────────────────────────────────────────────
-     * __axis_div_zero  –  print error message and exit(1)
-     * ──────────────────────────────────────────────────────── */
-    so.div_zero_off = base + sb->len;
-
+/* ────────────────────────────────────────────────────────
+ * __axis_div_zero  –  print error message and exit(1)
+ * ──────────────────────────────────────────────────────── */
+static void stub_div_zero(StubBuf *sb, const RtData *rt)
+{
     /* lea rsi, [rip + div_zero_msg]   (message pointer) */
-    sb_emit_lea_rip(sb, 6 /*RSI*/, data_va, rt->div_zero_off,
-                    text_va, base);
+    sb_emit_lea_rip(sb, 6 /*RSI*/, rt->div_zero_off);
     /* mov edx, msg_len */
     sb_emit8(sb, 0xBA);
     sb_emit32(sb, (uint32_t)rt->div_zero_len);
@@ -608,7 +640,46 @@ static StubOffsets gen_stubs(StubBuf *sb,
     /* mov eax, 60  (SYS_EXIT) */
     sb_emit8(sb, 0xB8); sb_emit32(sb, SYS_EXIT);
     sb_emit_syscall(sb);
+}
+
+/* Stub generators in emission order, indexed by runtime helper id */
+typedef void (*StubGen)(StubBuf *sb, const RtData *rt);
+
+static const StubGen stub_gens[RTSYM_COUNT] = {
+    [RTSYM_WRITE_I64]       = stub_write_i64,
+    [RTSYM_WRITE_STR]       = stub_write_str,
+    [RTSYM_WRITE_BOOL]      = stub_write_bool,
+    [RTSYM_WRITE_CHAR]      = stub_write_char,
+    [RTSYM_WRITE_NL]        = stub_write_nl,
+    [RTSYM_READ_I64]        = stub_read_i64,
+    [RTSYM_READ_LINE]       = stub_read_line,
+    [RTSYM_READ_CHAR]       = stub_read_char,
+    [RTSYM_READ_FAILED]     = stub_read_failed,
+    [RTSYM_MEMCPY]          = stub_memcpy,
+    [RTSYM_DIV_ZERO]        = stub_div_zero,
+};
+
+/* ═════════════════════════════════════════════════════════════
+ * Generate the runtime stubs the program calls (Linux syscalls)
+ *
+ * Helpers no relocation refers to are left out, so a program
+ * without input carries no read stubs.
+ * ═════════════════════════════════════════════════════════════ */
+
+static StubOffsets gen_stubs(StubBuf *sb,
+                             const RtData *rt,
+                             const bool *used,
+                             int user_code_len)
+{
+    StubOffsets so;
+    sb_init(sb);
 
+    for (int id = 0; id < RTSYM_COUNT; id++) {
+        so.off[id] = -1;
+        if (!stub_gens[id] || !used[id]) continue;
+        so.off[id] = user_code_len + sb->len;
+        stub_gens[id](sb, rt);
+    }
     return so;
 }
 
@@ -651,8 +722,7 @@ static int gen_entry_stub(StubBuf *sb, const X64Ctx *x64)
     int entry_stub_off = x64->code.len + sb->len;
 
     /* sub rsp, 40C (shadow space + alignment) */
-    sb_emit8(sb, 0x48); sb_emit8(sb, 0x83);
-    sb_emit8(sb, 0xEC); sb_emit8(sb, 0x28);               /* 4 bytes */
+    SB_BYTES(sb, 0x48, 0x83, 0xEC, 0x28);                 /* 4 bytes */
 
     /* call rel32 → __top_level */
     sb_emit8(sb, 0xE8);                                    /* 1 byte  */
@@ -673,9 +743,9 @@ static int gen_entry_stub(StubBuf *sb, const X64Ctx *x64)
 
     /* Exit code: main() → use return value; else → 0 */
     if (entry_name && strcmp(entry_name, "main") == 0) {
-        sb_emit8(sb, 0x89); sb_emit8(sb, 0xC7);           /* mov edi, eax */
+        SB_BYTES(sb, 0x89, 0xC7);                         /* mov edi, eax */
     } else {
-        sb_emit8(sb, 0x31); sb_emit8(sb, 0xFF);           /* xor edi, edi */
+        SB_BYTES(sb, 0x31, 0xFF);                         /* xor edi, edi */
     }
 
     /* mov eax, 60 (SYS_exit) */
@@ -700,19 +770,8 @@ static void patch_runtime_relocs(X64Ctx *x64_mut, const StubOffsets *so)
         if (r->kind != RELOC_REL32 || r->target_sym == NULL)
             continue;
 
-        int target = -1;
-        if      (strcmp(r->target_sym, "__axis_write_i64") == 0)   target = so->write_i64_off;
-        else if (strcmp(r->target_sym, "__axis_write_str") == 0)   target = so->write_str_off;
-        else if (strcmp(r->target_sym, "__axis_write_bool") == 0)  target = so->write_bool_off;
-        else if (strcmp(r->target_sym, "__axis_write_char") == 0)  target = so->write_char_off;
-        else if (strcmp(r->target_sym, "__axis_write_nl") == 0)    target = so->write_nl_off;
-        else if (strcmp(r->target_sym, "__axis_read_i64") == 0)    target = so->read_i64_off;
-        else if (strcmp(r->target_sym, "__axis_read_line") == 0)   target = so->read_line_off;
-        else if (strcmp(r->target_sym, "__axis_read_char") == 0)   target = so->read_char_off;
-        else if (strcmp(r->target_sym, "__axis_read_failed") == 0) target = so->read_failed_off;
-        else if (strcmp(r->target_sym, "__axis_memcpy") == 0)      target = so->memcpy_off;
-        else if (strcmp(r->target_sym, "__axis_div_zero") == 0)    target = so->div_zero_off;
-        else continue;  /* user function – already resolved */
+        if (r->rt == RTSYM_NONE) continue;  /* user function – already resolved */
+        int target = so->off[r->rt];
 
         int from = r->offset + 4;
         int32_t rel = target - from + r->addend;
@@ -771,13 +830,11 @@ int elf_write(ELFCtx *ctx, const X64Ctx *x64)
 
     int user_code_len = x64->code.len;
 
-    /* ── Pass 1: generate stubs with dummy VAs to measure size ── */
-    StubBuf sb1;
-    StubOffsets so1 = gen_stubs(&sb1, &rt, 0, 0, user_code_len);
-    (void)so1;
-    gen_entry_stub(&sb1, x64);
-    int stubs_size = sb1.len;
-    sb_free(&sb1);
+    /* ── Generate stubs (RIP-relative operands patched below) ── */
+    StubBuf sb;
+    StubOffsets so = gen_stubs(&sb, &rt, x64->rt_used, user_code_len);
+    int entry_stub_off = gen_entry_stub(&sb, x64);
+    int stubs_size = sb.len;
 
     /* ── Compute layout ──────────────────────────────────────── */
     uint32_t text_off  = ELF_EHDR_SIZE + 2 * ELF_PHDR_SIZE;  /* 176 = 0xB0 */
@@ -788,10 +845,7 @@ int elf_write(ELFCtx *ctx, const X64Ctx *x64)
     uint64_t data_va   = ELF_BASE_VA + data_off;
     uint32_t data_size = (uint32_t)rt.total;
 
-    /* ── Pass 2: generate stubs with real VAs ────────────────── */
-    StubBuf sb;
-    StubOffsets so = gen_stubs(&sb, &rt, text_va, data_va, user_code_len);
-    int entry_stub_off = gen_entry_stub(&sb, x64);
+    sb_patch_rip(&sb, text_va + (uint64_t)user_code_len, data_va);
 
     /* ── Patch relocations ───────────────────────────────────── */
     patch_runtime_relocs(&x64_mut, &so);
@@ -906,22 +960,41 @@ int elf_write(ELFCtx *ctx, const X64Ctx *x64)
 
 int elf_save(const ELFCtx *ctx, const char *path)
 {
-    FILE *f = fopen(path, "wb");
+    /* Write beside the target and rename into place: an interrupted
+     * write must not leave a truncated binary behind.  Script mode
+     * trusts a cached binary whose trailing 8 bytes hold the FNV-1a
+     * key of its source; that trailer is appended only after this
+     * save succeeds, so a binary without it is simply rebuilt. */
+    char tmp[1024];
+    if (snprintf(tmp, sizeof(tmp), "%s.tmp", path) >= (int)sizeof(tmp)) {
+        fprintf(stderr, "error: output path too long: '%s'\n", path);
+        return -1;
+    }
+
+    FILE *f = fopen(tmp, "wb");
     if (!f) {
-        fprintf(stderr, "error: cannot open '%s' for writing\n", path);
+        fprintf(stderr, "error: cannot open '%s' for writing\n", tmp);
         return -1;
     }
     size_t written = fwrite(ctx->buf, 1, (size_t)ctx->len, f);
-    fclose(f);
+    int close_rc = fclose(f);
 
-    if ((int)written != ctx->len) {
-        fprintf(stderr, "error: incomplete write to '%s'\n", path);
+    if ((int)written != ctx->len || close_rc != 0) {
+        fprintf(stderr, "error: incomplete write to '%s'\n", tmp);
+        remove(tmp);
         return -1;
     }
 
 #ifndef _WIN32
-    chmod(path, 0755);
+    chmod(tmp, 0755);
+#else
+    remove(path);   /* rename() does not replace on Windows */
 #endif
+    if (rename(tmp, path) != 0) {
+        fprintf(stderr, "error: cannot replace '%s'\n", path);
+        remove(tmp);
+        return -1;
+    }
     return 0;
 }
 
@@ -216,7 +216,7 @@ static int irgen_name_lookup(IRGen *g, const char *name, SrcLoc loc)
 {
     for (IRScope *sc = s_scope; sc; sc = sc->parent)
         for (IRLocal *l = sc->locals; l; l = l->next)
-            if (strcmp(l->name, name) == 0)
+            if (axis_name_eq(l->name, name))
                 return l->stack_off;
     ir_error(g, loc, "IRGen: variable '%s' not found in scope", name);
 }
@@ -227,7 +227,7 @@ static IRLocal *irgen_scope_lookup(IRGen *g, const char *name)
     AXIS_UNUSED(g);
     for (IRScope *sc = s_scope; sc; sc = sc->parent)
         for (IRLocal *l = sc->locals; l; l = l->next)
-            if (strcmp(l->name, name) == 0)
+            if (axis_name_eq(l->name, name))
                 return l;
     return NULL;
 }
@@ -257,11 +257,8 @@ static int intern_string(IRGen *g, const char *str)
 
 static int type_size(const char *t)
 {
-    if (!t) return 8;
-    if (strcmp(t,"i8")==0 || strcmp(t,"u8")==0 || strcmp(t,"bool")==0) return 1;
-    if (strcmp(t,"i16")==0 || strcmp(t,"u16")==0) return 2;
-    if (strcmp(t,"i32")==0 || strcmp(t,"u32")==0) return 4;
-    return 8;
+    int size = axis_type_size(axis_type_kind(t));
+    return size ? size : 8;
 }
 
 /* Used later by x64 codegen via expr_type; keep available. */
@@ -280,7 +277,7 @@ static const char *expr_type(ASTExpr *e)
 static ASTFieldDef *irgen_find_field(IRGen *g, const char *name)
 {
     for (int i = 0; i < g->field_count; i++)
-        if (strcmp(g->field_defs[i].name, name) == 0)
+        if (axis_name_eq(g->field_defs[i].name, name))
             return &g->field_defs[i];
     return NULL;
 }
@@ -288,7 +285,7 @@ static ASTFieldDef *irgen_find_field(IRGen *g, const char *name)
 static ASTEnumDef *irgen_find_enum(IRGen *g, const char *name)
 {
     for (int i = 0; i < g->enum_count; i++)
-        if (strcmp(g->enum_defs[i].name, name) == 0)
+        if (axis_name_eq(g->enum_defs[i].name, name))
             return &g->enum_defs[i];
     return NULL;
 }
@@ -364,6 +361,70 @@ static IROper gen_ident(IRGen *g, ASTExpr *e)
     return oper_temp(t, sz);
 }
 
+/* Operator token → IR opcode in one lookup, for binary operators and
+ * their compound-assign forms.  IR_NOP marks every other token,
+ * including the short-circuit 'and' / 'or'. */
+static const IROpcode binop_ir[TOK_COUNT_] = {
+    [TOK_PLUS]    = IR_ADD,     [TOK_MINUS]   = IR_SUB,
+    [TOK_STAR]    = IR_MUL,     [TOK_SLASH]   = IR_DIV,
+    [TOK_PERCENT] = IR_MOD,     [TOK_AMP]     = IR_BIT_AND,
+    [TOK_PIPE]    = IR_BIT_OR,  [TOK_CARET]   = IR_BIT_XOR,
+    [TOK_LSHIFT]  = IR_SHL,     [TOK_RSHIFT]  = IR_SHR,
+    [TOK_EQ]      = IR_CMP_EQ,  [TOK_NE]      = IR_CMP_NE,
+    [TOK_LT]      = IR_CMP_LT,  [TOK_LE]      = IR_CMP_LE,
+    [TOK_GT]      = IR_CMP_GT,  [TOK_GE]      = IR_CMP_GE,
+
+    [TOK_PLUS_ASSIGN]    = IR_ADD,     [TOK_MINUS_ASSIGN]   = IR_SUB,
+    [TOK_STAR_ASSIGN]    = IR_MUL,     [TOK_SLASH_ASSIGN]   = IR_DIV,
+    [TOK_PERCENT_ASSIGN] = IR_MOD,     [TOK_AMP_ASSIGN]     = IR_BIT_AND,
+    [TOK_PIPE_ASSIGN]    = IR_BIT_OR,  [TOK_CARET_ASSIGN]   = IR_BIT_XOR,
+    [TOK_LSHIFT_ASSIGN]  = IR_SHL,     [TOK_RSHIFT_ASSIGN]  = IR_SHR,
+};
+
+/* Per-opcode properties of the binary ops above */
+enum {
+    BINOP_CMP    = 1 << 0,   /* result is a 1-byte bool                */
+    BINOP_SIGNED = 1 << 1,   /* lowering depends on operand signedness */
+};
+
+static const unsigned char binop_flags[IR_OPCODE_COUNT] = {
+    [IR_CMP_EQ] = BINOP_CMP,
+    [IR_CMP_NE] = BINOP_CMP,
+    [IR_CMP_LT] = BINOP_CMP | BINOP_SIGNED,
+    [IR_CMP_LE] = BINOP_CMP | BINOP_SIGNED,
+    [IR_CMP_GT] = BINOP_CMP | BINOP_SIGNED,
+    [IR_CMP_GE] = BINOP_CMP | BINOP_SIGNED,
+    [IR_DIV]    = BINOP_SIGNED,
+    [IR_MOD]    = BINOP_SIGNED,
+    [IR_SHR]    = BINOP_SIGNED,
+};
+
+static bool is_plain_binop(const ASTExpr *e)
+{
+    return e->kind == EXPR_BINARY && binop_ir[e->binary.op] != IR_NOP;
+}
+
+/* Lower one non-short-circuit binary op on already-evaluated operands */
+static IROper emit_binop(IRGen *g, ASTExpr *e, IROper lv, IROper rv)
+{
+    int sz = type_size(expr_type(e));
+
+    IROpcode irop = binop_ir[e->binary.op];
+    if (irop == IR_NOP)
+        ir_error(g, e->loc, "Unknown binary operator");
+
+    int is_cmp = (binop_flags[irop] & BINOP_CMP) != 0;
+    int res_sz = is_cmp ? 1 : sz;
+    int t      = new_temp(g, res_sz);
+
+    {
+        int unsig = (binop_flags[irop] & BINOP_SIGNED)
+                    && !is_signed(expr_type(e->binary.left));
+        EMIT_X(irop, oper_temp(t, res_sz), lv, rv, unsig, e->loc);
+    }
+    return oper_temp(t, res_sz);
+}
+
 static IROper gen_binop(IRGen *g, ASTExpr *e)
 {
     TokenType op = e->binary.op;
@@ -405,48 +466,30 @@ static IROper gen_binop(IRGen *g, ASTExpr *e)
     }
 
     /* ── Standard binary ops ──────────────────────────── */
-    IROper lv = gen_expr(g, e->binary.left);
-    IROper rv = gen_expr(g, e->binary.right);
-    int sz    = type_size(expr_type(e));
-
-    IROpcode irop;
-    switch (op) {
-    case TOK_PLUS:    irop = IR_ADD;     break;
-    case TOK_MINUS:   irop = IR_SUB;     break;
-    case TOK_STAR:    irop = IR_MUL;     break;
-    case TOK_SLASH:   irop = IR_DIV;     break;
-    case TOK_PERCENT: irop = IR_MOD;     break;
-    case TOK_AMP:     irop = IR_BIT_AND; break;
-    case TOK_PIPE:    irop = IR_BIT_OR;  break;
-    case TOK_CARET:   irop = IR_BIT_XOR; break;
-    case TOK_LSHIFT:  irop = IR_SHL;     break;
-    case TOK_RSHIFT:  irop = IR_SHR;     break;
-    case TOK_EQ:      irop = IR_CMP_EQ;  break;
-    case TOK_NE:      irop = IR_CMP_NE;  break;
-    case TOK_LT:      irop = IR_CMP_LT;  break;
-    case TOK_LE:      irop = IR_CMP_LE;  break;
-    case TOK_GT:      irop = IR_CMP_GT;  break;
-    case TOK_GE:      irop = IR_CMP_GE;  break;
-    default:
-        ir_error(g, e->loc, "Unknown binary operator");
+    /* A left-leaning chain such as a + b + c + d is lowered from an
+     * explicit stack of its nodes, bottom-up, instead of recursing
+     * once per operator.  Evaluation order and temp numbering match
+     * the recursive form. */
+    int depth = 1;
+    for (ASTExpr *n = e->binary.left; is_plain_binop(n); n = n->binary.left)
+        depth++;
+
+    ASTExpr *single = e;
+    ASTExpr **spine = (depth == 1)
+        ? &single
+        : arena_alloc(g->arena, (size_t)depth * sizeof(ASTExpr*));
+    ASTExpr *n = e;
+    for (int i = depth - 1; i >= 0; i--) {
+        spine[i] = n;
+        n = n->binary.left;
     }
 
-    int is_cmp = (irop == IR_CMP_EQ || irop == IR_CMP_NE ||
-                  irop == IR_CMP_LT || irop == IR_CMP_LE ||
-                  irop == IR_CMP_GT || irop == IR_CMP_GE);
-    int res_sz = is_cmp ? 1 : sz;
-    int t      = new_temp(g, res_sz);
-
-    {
-        int unsig = 0;
-        if ((irop == IR_CMP_LT || irop == IR_CMP_LE ||
-             irop == IR_CMP_GT || irop == IR_CMP_GE ||
-             irop == IR_DIV || irop == IR_MOD || irop == IR_SHR)
-            && !is_signed(expr_type(e->binary.left)))
-            unsig = 1;
-        EMIT_X(irop, oper_temp(t, res_sz), lv, rv, unsig, e->loc);
+    IROper acc = gen_expr(g, spine[0]->binary.left);
+    for (int i = 0; i < depth; i++) {
+        IROper rv = gen_expr(g, spine[i]->binary.right);
+        acc = emit_binop(g, spine[i], acc, rv);
     }
-    return oper_temp(t, res_sz);
+    return acc;
 }
 
 static IROper gen_unary(IRGen *g, ASTExpr *e)
@@ -857,20 +900,9 @@ static void gen_compound_assign(IRGen *g, ASTStmt *st)
     int sz = tv.size > 0 ? tv.size : 4;
     int t  = new_temp(g, sz);
 
-    IROpcode irop;
-    switch (st->compound_assign.op) {
-    case TOK_PLUS_ASSIGN:    irop = IR_ADD;     break;
-    case TOK_MINUS_ASSIGN:   irop = IR_SUB;     break;
-    case TOK_STAR_ASSIGN:    irop = IR_MUL;     break;
-    case TOK_SLASH_ASSIGN:   irop = IR_DIV;     break;
-    case TOK_PERCENT_ASSIGN: irop = IR_MOD;     break;
-    case TOK_AMP_ASSIGN:     irop = IR_BIT_AND; break;
-    case TOK_PIPE_ASSIGN:    irop = IR_BIT_OR;  break;
-    case TOK_CARET_ASSIGN:   irop = IR_BIT_XOR; break;
-    case TOK_LSHIFT_ASSIGN:  irop = IR_SHL;     break;
-    case TOK_RSHIFT_ASSIGN:  irop = IR_SHR;     break;
-    default: ir_error(g, st->loc, "Unknown compound-assign op");
-    }
+    IROpcode irop = binop_ir[st->compound_assign.op];
+    if (irop == IR_NOP)
+        ir_error(g, st->loc, "Unknown compound-assign op");
 
     emit(g, irop, oper_temp(t, sz), tv, vv, 0, st->loc);
 
@@ -899,10 +931,12 @@ static int infer_write_type(ASTExpr *e)
     /* Determine write-type hint from the expression's inferred_type:
      * 0 = integer, 1 = string, 2 = bool, 3 = char */
     const char *ty = e->inferred_type;
-    if (ty) {
-        if (strcmp(ty, "str") == 0)  return 1;
-        if (strcmp(ty, "bool") == 0) return 2;
-        if (strcmp(ty, "char") == 0) return 3;
+    switch (axis_type_kind(ty)) {
+    case TYPE_STR:  return 1;
+    case TYPE_BOOL: return 2;
+    default:
+        if (ty && strcmp(ty, "char") == 0) return 3;
+        break;
     }
     /* Also check for string literal expression directly */
     if (e->kind == EXPR_STRING_LIT) return 1;
@@ -917,6 +951,59 @@ static void gen_write(IRGen *g, ASTStmt *st)
          v, oper_none(), wtype, st->loc);
 }
 
+/* ── Statement blocks ──────────────────────────────────────── */
+
+static bool is_const_str_write(const ASTStmt *st)
+{
+    return st->kind == STMT_WRITE
+        && st->write.value->kind == EXPR_STRING_LIT
+        && infer_write_type(st->write.value) == 1;
+}
+
+/* A run of write/writeln statements with literal strings becomes one
+ * string and one runtime write: the literals are joined at compile
+ * time with the writeln newlines folded in, so writeln("x") no longer
+ * costs a second call for its newline. */
+static void gen_const_writes(IRGen *g, ASTStmt **run, int n)
+{
+    size_t len = 0;
+    for (int i = 0; i < n; i++)
+        len += strlen(run[i]->write.value->string_lit.value)
+             + (run[i]->write.newline ? 1 : 0);
+
+    char *buf = arena_alloc(g->arena, len + 1);
+    char *p = buf;
+    for (int i = 0; i < n; i++) {
+        const char *v = run[i]->write.value->string_lit.value;
+        size_t vl = strlen(v);
+        memcpy(p, v, vl);
+        p += vl;
+        if (run[i]->write.newline) *p++ = '\n';
+    }
+    *p = '\0';
+
+    int idx = intern_string(g, buf);
+    int t   = new_temp(g, 8);
+    emit(g, IR_LOAD_STR, oper_temp(t, 8), oper_str(idx), oper_none(),
+         0, run[0]->loc);
+    emit(g, IR_WRITE, oper_imm(0, 4), oper_temp(t, 8), oper_none(),
+         1, run[0]->loc);
+}
+
+static void gen_block(IRGen *g, ASTStmt **body, int count)
+{
+    for (int i = 0; i < count; ) {
+        if (is_const_str_write(body[i])) {
+            int j = i + 1;
+            while (j < count && is_const_str_write(body[j])) j++;
+            gen_const_writes(g, &body[i], j - i);
+            i = j;
+        } else {
+            gen_stmt(g, body[i++]);
+        }
+    }
+}
+
 static void gen_read_stmt(IRGen *g, ASTStmt *st)
 {
     int kind = st->read.read_kind == READ_READCHAR ? 2
@@ -991,8 +1078,7 @@ static void gen_if(IRGen *g, ASTStmt *st)
     }
 
     irgen_scope_push(g);
-    for (int i = 0; i < st->if_stmt.body_count; i++)
-        gen_stmt(g, st->if_stmt.body[i]);
+    gen_block(g, st->if_stmt.body, st->if_stmt.body_count);
     irgen_scope_pop(g);
 
     if (st->if_stmt.else_body) {
@@ -1001,8 +1087,7 @@ static void gen_if(IRGen *g, ASTStmt *st)
         emit(g, IR_LABEL, oper_label(else_lbl), oper_none(), oper_none(),
              0, st->loc);
         irgen_scope_push(g);
-        for (int i = 0; i < st->if_stmt.else_count; i++)
-            gen_stmt(g, st->if_stmt.else_body[i]);
+        gen_block(g, st->if_stmt.else_body, st->if_stmt.else_count);
         irgen_scope_pop(g);
     }
 
@@ -1026,8 +1111,7 @@ static void gen_while(IRGen *g, ASTStmt *st)
     emit(g, IR_JZ, oper_label(end_lbl), cond, oper_none(), 0, st->loc);
 
     irgen_scope_push(g);
-    for (int i = 0; i < st->while_loop.body_count; i++)
-        gen_stmt(g, st->while_loop.body[i]);
+    gen_block(g, st->while_loop.body, st->while_loop.body_count);
     irgen_scope_pop(g);
 
     emit(g, IR_JMP, oper_label(top_lbl), oper_none(), oper_none(),
@@ -1053,8 +1137,7 @@ static void gen_repeat(IRGen *g, ASTStmt *st)
          0, st->loc);
 
     irgen_scope_push(g);
-    for (int i = 0; i < st->repeat_loop.body_count; i++)
-        gen_stmt(g, st->repeat_loop.body[i]);
+    gen_block(g, st->repeat_loop.body, st->repeat_loop.body_count);
     irgen_scope_pop(g);
 
     emit(g, IR_JMP, oper_label(top_lbl), oper_none(), oper_none(),
@@ -1115,8 +1198,7 @@ static void gen_for(IRGen *g, ASTStmt *st)
              0, st->loc);
 
         /* body */
-        for (int i = 0; i < st->for_loop.body_count; i++)
-            gen_stmt(g, st->for_loop.body[i]);
+        gen_block(g, st->for_loop.body, st->for_loop.body_count);
 
         /* step: var += step */
         emit(g, IR_LABEL, oper_label(step_lbl), oper_none(), oper_none(),
@@ -1190,8 +1272,7 @@ static void gen_for(IRGen *g, ASTStmt *st)
              oper_temp(t_elem, esz), oper_none(), 0, st->loc);
 
         /* body */
-        for (int i = 0; i < st->for_loop.body_count; i++)
-            gen_stmt(g, st->for_loop.body[i]);
+        gen_block(g, st->for_loop.body, st->for_loop.body_count);
 
         /* step: __idx += 1 */
         emit(g, IR_LABEL, oper_label(step_lbl), oper_none(), oper_none(),
@@ -1234,8 +1315,7 @@ static void gen_match(IRGen *g, ASTStmt *st)
         }
 
         irgen_scope_push(g);
-        for (int i = 0; i < arm->body_count; i++)
-            gen_stmt(g, arm->body[i]);
+        gen_block(g, arm->body, arm->body_count);
         irgen_scope_pop(g);
 
         emit(g, IR_JMP, oper_label(end_lbl), oper_none(), oper_none(),
@@ -1405,8 +1485,7 @@ static void gen_function(IRGen *g, ASTFunction *fn, IRFunc *out)
     }
 
     /* Body */
-    for (int i = 0; i < fn->body_count; i++)
-        gen_stmt(g, fn->body[i]);
+    gen_block(g, fn->body, fn->body_count);
 
     /* Implicit void return at end */
     if (out->instr_count == 0 ||
@@ -1468,8 +1547,7 @@ void ir_generate(IRProgram *p, ASTProgram *ast, const char *filename)
         g.cur = &p->top_level;
 
         irgen_scope_push(&g);
-        for (int i = 0; i < ast->stmt_count; i++)
-            gen_stmt(&g, ast->statements[i]);
+        gen_block(&g, ast->statements, ast->stmt_count);
         irgen_scope_pop(&g);
 
         /* End with exit */
@@ -1533,7 +1611,7 @@ static const char *opcode_names[] = {
 static void dump_oper(FILE *f, IROper o)
 {
     switch (o.kind) {
-    case OPER_NONE:  fprintf(f, "_");    break;
+    case OPER_NONE:  fputc('_', f);      break;
     case OPER_TEMP:  fprintf(f, "t%d:%d", o.temp_id, o.size); break;
     case OPER_IMM:   fprintf(f, "#%" PRId64, o.imm); break;
     case OPER_STACK: fprintf(f, "[rbp%+d]:%d", o.stack_off, o.size); break;
@@ -1558,11 +1636,11 @@ static void dump_func(FILE *f, const IRFunc *fn)
             fprintf(f, "    %-12s ", name);
             dump_oper(f, ins->dest);
             if (ins->src1.kind != OPER_NONE) {
-                fprintf(f, ", ");
+                fputs(", ", f);
                 dump_oper(f, ins->src1);
             }
             if (ins->src2.kind != OPER_NONE) {
-                fprintf(f, ", ");
+                fputs(", ", f);
                 dump_oper(f, ins->src2);
             }
             if (ins->extra)
@@ -6,50 +6,72 @@
  * string escapes, all operators, and keyword recognition.
  */
 #include "axis_lexer.h"
-#include <ctype.h>
 
 /* ── Keyword table ─────────────────────────────────────────── */
-typedef struct { const char *kw; TokenType tt; } KWEntry;
+/* Lengths are fixed at compile time so lookups never call strlen. */
+typedef struct { const char *kw; int len; TokenType tt; } KWEntry;
+#define KW(s, t) { s, (int)sizeof(s) - 1, t }
 
 static const KWEntry kw_table[] = {
     /* control flow */
-    {"when",     TOK_WHEN},     {"else",      TOK_ELSE},
-    {"while",    TOK_WHILE},    {"repeat",    TOK_REPEAT},
-    {"loop",     TOK_REPEAT},   /* alias */
-    {"for",      TOK_FOR},      {"in",        TOK_IN},
-    {"break",    TOK_BREAK},    {"stop",      TOK_BREAK},
-    {"continue", TOK_CONTINUE}, {"skip",      TOK_CONTINUE},
-    {"match",    TOK_MATCH},
+    KW("when",     TOK_WHEN),     KW("else",      TOK_ELSE),
+    KW("while",    TOK_WHILE),    KW("repeat",    TOK_REPEAT),
+    KW("loop",     TOK_REPEAT),   /* alias */
+    KW("for",      TOK_FOR),      KW("in",        TOK_IN),
+    KW("break",    TOK_BREAK),    KW("stop",      TOK_BREAK),
+    KW("continue", TOK_CONTINUE), KW("skip",      TOK_CONTINUE),
+    KW("match",    TOK_MATCH),
     /* functions */
-    {"func",     TOK_FUNC},     {"give",      TOK_GIVE},
-    {"return",   TOK_RETURN},
+    KW("func",     TOK_FUNC),     KW("give",      TOK_GIVE),
+    KW("return",   TOK_RETURN),
     /* declarations */
-    {"mode",     TOK_MODE},     {"script",    TOK_SCRIPT},
-    {"compile",  TOK_COMPILE},  {"field",     TOK_FIELD},
-    {"enum",     TOK_ENUM},     {"update",    TOK_UPDATE},
-    {"copy",     TOK_COPY},
+    KW("mode",     TOK_MODE),     KW("script",    TOK_SCRIPT),
+    KW("compile",  TOK_COMPILE),  KW("field",     TOK_FIELD),
+    KW("enum",     TOK_ENUM),     KW("update",    TOK_UPDATE),
+    KW("copy",     TOK_COPY),
     /* types */
-    {"i8",   TOK_I8},   {"i16",  TOK_I16},  {"i32",  TOK_I32},  {"i64",  TOK_I64},
-    {"u8",   TOK_U8},   {"u16",  TOK_U16},  {"u32",  TOK_U32},  {"u64",  TOK_U64},
-    {"bool", TOK_BOOL},  {"str",  TOK_STR},
+    KW("i8",   TOK_I8),   KW("i16",  TOK_I16),  KW("i32",  TOK_I32),  KW("i64",  TOK_I64),
+    KW("u8",   TOK_U8),   KW("u16",  TOK_U16),  KW("u32",  TOK_U32),  KW("u64",  TOK_U64),
+    KW("bool", TOK_BOOL),  KW("str",  TOK_STR),
     /* booleans */
-    {"True",  TOK_TRUE},  {"False", TOK_FALSE},
+    KW("True",  TOK_TRUE),  KW("False", TOK_FALSE),
     /* I/O */
-    {"write",    TOK_WRITE},    {"writeln",    TOK_WRITELN},
-    {"read",     TOK_READ},     {"readln",     TOK_READLN},
-    {"readchar", TOK_READCHAR}, {"read_failed",TOK_READ_FAILED},
+    KW("write",    TOK_WRITE),    KW("writeln",    TOK_WRITELN),
+    KW("read",     TOK_READ),     KW("readln",     TOK_READLN),
+    KW("readchar", TOK_READCHAR), KW("read_failed",TOK_READ_FAILED),
     /* logical */
-    {"and", TOK_AND}, {"or", TOK_OR}, {"not", TOK_NOT},
+    KW("and", TOK_AND), KW("or", TOK_OR), KW("not", TOK_NOT),
     /* syscall */
-    {"syscall", TOK_SYSCALL},
+    KW("syscall", TOK_SYSCALL),
 };
+#undef KW
+
+/* Keywords chained by first character (entry index + 1, 0 ends a
+ * chain).  The longest chain is six entries, against a scan of the
+ * whole table, and characters that start no keyword end at once. */
+static uint8_t kw_head[128];
+static uint8_t kw_next[AXIS_ARRAY_LEN(kw_table)];
+
+static void kw_index_init(void)
+{
+    static bool built = false;
+    if (built) return;
+    built = true;
+    for (size_t i = AXIS_ARRAY_LEN(kw_table); i-- > 0; ) {
+        unsigned char c = (unsigned char)kw_table[i].kw[0];
+        kw_next[i] = kw_head[c];
+        kw_head[c] = (uint8_t)(i + 1);
+    }
+}
 
 static TokenType lookup_keyword(const char *text, int len)
 {
-    for (size_t i = 0; i < AXIS_ARRAY_LEN(kw_table); i++) {
-        const char *k = kw_table[i].kw;
-        if ((int)strlen(k) == len && memcmp(k, text, (size_t)len) == 0)
-            return kw_table[i].tt;
+    unsigned char c = (unsigned char)text[0];
+    if (c >= 128) return TOK_IDENT;
+    for (int i = kw_head[c]; i != 0; i = kw_next[i - 1]) {
+        const KWEntry *k = &kw_table[i - 1];
+        if (k->len == len && memcmp(k->kw, text, (size_t)len) == 0)
+            return k->tt;
     }
     return TOK_IDENT;
 }
@@ -107,6 +129,75 @@ const char *token_type_name(TokenType t)
     return "UNKNOWN";
 }
 
+/* ── Character classes ────────────────────────────────────── */
+/* Classifies a byte with one table load in the scanner's hot paths
+ * (ASCII only, matching the C locale).  Bytes >= 0x80 are 0. */
+enum {
+    CH_SPACE = 1 << 0,   /* ' ' '\t' '\r' (newline is a token)   */
+    CH_DIGIT = 1 << 1,   /* 0-9                                  */
+    CH_ALPHA = 1 << 2,   /* A-Z a-z _  (identifier start)        */
+    CH_HEX   = 1 << 3,   /* 0-9 A-F a-f                          */
+    CH_BIN   = 1 << 4,   /* 0 1                                  */
+    CH_IDENT = CH_DIGIT | CH_ALPHA,
+};
+
+#define S CH_SPACE
+#define B (CH_DIGIT | CH_HEX | CH_BIN)
+#define D (CH_DIGIT | CH_HEX)
+#define H (CH_ALPHA | CH_HEX)
+#define A CH_ALPHA
+static const uint8_t char_class[256] = {
+    /* 00 */ 0,0,0,0,0,0,0,0,0,S,0,0,0,S,0,0,
+    /* 10 */ 0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,
+    /* 20 */ S,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,
+    /* 30 */ B,B,D,D,D,D,D,D,D,D,0,0,0,0,0,0,
+    /* 40 */ 0,H,H,H,H,H,H,A,A,A,A,A,A,A,A,A,
+    /* 50 */ A,A,A,A,A,A,A,A,A,A,A,0,0,0,0,A,
+    /* 60 */ 0,H,H,H,H,H,H,A,A,A,A,A,A,A,A,A,
+    /* 70 */ A,A,A,A,A,A,A,A,A,A,A,0,0,0,0,0,
+};
+#undef S
+#undef B
+#undef D
+#undef H
+#undef A
+
+#define CH_IS(c, m) (char_class[(unsigned char)(c)] & (m))
+
+/* ── Single-character tokens ──────────────────────────────── */
+/* 0 (TOK_INT_LIT) never stands for a single character: "no token". */
+static const TokenType single_tok[128] = {
+    ['+'] = TOK_PLUS,     ['-'] = TOK_MINUS,    ['*'] = TOK_STAR,
+    ['/'] = TOK_SLASH,    ['%'] = TOK_PERCENT,
+    ['&'] = TOK_AMP,      ['|'] = TOK_PIPE,     ['^'] = TOK_CARET,
+    ['='] = TOK_ASSIGN,
+    ['('] = TOK_LPAREN,   [')'] = TOK_RPAREN,
+    ['['] = TOK_LBRACKET, [']'] = TOK_RBRACKET,
+    ['{'] = TOK_LBRACE,   ['}'] = TOK_RBRACE,
+    [':'] = TOK_COLON,    [';'] = TOK_SEMICOLON,
+    [','] = TOK_COMMA,    ['.'] = TOK_DOT,
+    ['!'] = TOK_BANG,     ['<'] = TOK_LT,       ['>'] = TOK_GT,
+};
+
+/* ── Multi-character operators ────────────────────────────── */
+/* "X=" – comparisons and compound assignments */
+static const TokenType eq_tok[128] = {
+    ['='] = TOK_EQ,             ['!'] = TOK_NE,
+    ['<'] = TOK_LE,             ['>'] = TOK_GE,
+    ['+'] = TOK_PLUS_ASSIGN,    ['-'] = TOK_MINUS_ASSIGN,
+    ['*'] = TOK_STAR_ASSIGN,    ['/'] = TOK_SLASH_ASSIGN,
+    ['%'] = TOK_PERCENT_ASSIGN, ['&'] = TOK_AMP_ASSIGN,
+    ['|'] = TOK_PIPE_ASSIGN,    ['^'] = TOK_CARET_ASSIGN,
+};
+/* "XX" – doubled characters, and "XX=" where one exists */
+static const TokenType dbl_tok[128] = {
+    ['<'] = TOK_LSHIFT,  ['>'] = TOK_RSHIFT,
+    ['.'] = TOK_DOTDOT,  [':'] = TOK_COLONCOLON,
+};
+static const TokenType dbl_eq_tok[128] = {
+    ['<'] = TOK_LSHIFT_ASSIGN, ['>'] = TOK_RSHIFT_ASSIGN,
+};
+
 /* ── Helpers ──────────────────────────────────────────────── */
 
 static inline char cur(const Lexer *lex)
@@ -120,21 +211,33 @@ static inline char peek(const Lexer *lex, int offset)
     return (p < lex->src_len) ? lex->src[p] : '\0';
 }
 
+/* Column after a non-newline character (tabs stop every 4 columns) */
+static inline int next_col(int col, char c)
+{
+    return (c == '\t') ? ((col - 1) / 4 + 1) * 4 + 1 : col + 1;
+}
+
 static inline void adv(Lexer *lex)
 {
     if (lex->pos < lex->src_len) {
         if (lex->src[lex->pos] == '\n') {
             lex->line++;
             lex->col = 1;
-        } else if (lex->src[lex->pos] == '\t') {
-            lex->col = ((lex->col - 1) / 4 + 1) * 4 + 1;
         } else {
-            lex->col++;
+            lex->col = next_col(lex->col, lex->src[lex->pos]);
         }
         lex->pos++;
     }
 }
 
+/* Advance over n bytes already known to hold no newline or tab
+ * (identifier and digit runs), so line/col bookkeeping is one add. */
+static inline void adv_run(Lexer *lex, size_t n)
+{
+    lex->pos += n;
+    lex->col += (int)n;
+}
+
 static inline Token mktok(TokenType t, int line, int col, const char *start, int len)
 {
     Token tok;
@@ -166,24 +269,23 @@ static Token pop_pending(Lexer *lex)
 
 /* ── Escape map ───────────────────────────────────────────── */
 
-static char escape_char(char c)
-{
-    switch (c) {
-    case 'n':  return '\n';
-    case 't':  return '\t';
-    case 'r':  return '\r';
-    case '\\': return '\\';
-    case '"':  return '"';
-    case '0':  return '\0';
-    default:   return 0;   /* invalid */
-    }
-}
+/* Character after a backslash → decoded byte.  0 marks an invalid
+ * escape, except for '0' itself, which decodes to NUL. */
+static const char escape_map[128] = {
+    ['n']  = '\n',
+    ['t']  = '\t',
+    ['r']  = '\r',
+    ['\\'] = '\\',
+    ['"']  = '"',
+    ['0']  = '\0',
+};
 
 /* ── Init ─────────────────────────────────────────────────── */
 
 void lexer_init(Lexer *lex, const char *src, size_t len,
                 const char *filename, Arena *arena)
 {
+    kw_index_init();
     memset(lex, 0, sizeof(*lex));
     lex->src      = src;
     lex->src_len  = len;
@@ -201,21 +303,35 @@ void lexer_init(Lexer *lex, const char *src, size_t len,
 
 /* ── Skip helpers ─────────────────────────────────────────── */
 
+/* The skip loops stay on the current line, so they run on a local
+ * pointer and column and store them back once at the end. */
+
 static void skip_inline_ws(Lexer *lex)
 {
-    while (lex->pos < lex->src_len) {
-        char c = cur(lex);
-        if (c == ' ' || c == '\t' || c == '\r')
-            adv(lex);
-        else
-            break;
-    }
+    const char *p = lex->src + lex->pos, *end = lex->src + lex->src_len;
+    int col = lex->col;
+    while (p < end && CH_IS(*p, CH_SPACE))
+        col = next_col(col, *p++);
+    lex->pos = (size_t)(p - lex->src);
+    lex->col = col;
 }
 
 static void skip_comment(Lexer *lex)
 {
-    while (lex->pos < lex->src_len && cur(lex) != '\n')
-        adv(lex);
+    const char *p = lex->src + lex->pos, *end = lex->src + lex->src_len;
+    const char *nl = memchr(p, '\n', (size_t)(end - p));
+    if (!nl) nl = end;
+    int col = lex->col;
+    /* Only a tab breaks the one-column-per-byte rule; comments
+     * without one are skipped with a single add. */
+    if (!memchr(p, '\t', (size_t)(nl - p))) {
+        col += (int)(nl - p);
+    } else {
+        while (p < nl)
+            col = next_col(col, *p++);
+    }
+    lex->pos = (size_t)(nl - lex->src);
+    lex->col = col;
 }
 
 /* ── Indentation handler ──────────────────────────────────── */
@@ -227,11 +343,17 @@ static bool handle_indent(Lexer *lex, Token *out)
 
     int indent = 0;
     bool has_tab = false, has_space = false;
-    while (lex->pos < lex->src_len) {
-        char c = cur(lex);
-        if (c == ' ')       { indent += 1; has_space = true; adv(lex); }
-        else if (c == '\t') { indent += 4; has_tab = true; adv(lex); }
-        else break;
+    {
+        const char *p = lex->src + lex->pos, *end = lex->src + lex->src_len;
+        int col = lex->col;
+        for (; p < end; p++) {
+            if (*p == ' ')       { indent += 1; has_space = true; }
+            else if (*p == '\t') { indent += 4; has_tab = true; }
+            else break;
+            col = next_col(col, *p);
+        }
+        lex->pos = (size_t)(p - lex->src);
+        lex->col = col;
     }
 
     /* blank / comment-only line → ignore indentation */
@@ -285,52 +407,46 @@ static bool handle_indent(Lexer *lex, Token *out)
 
 /* ── Number literal ───────────────────────────────────────── */
 
+/* Value of a character already classified as CH_HEX */
+static inline unsigned hex_value(char c)
+{
+    return (c <= '9') ? (unsigned)(c - '0') : (unsigned)((c | 0x20) - 'a' + 10);
+}
+
+/*
+ * Scan and evaluate in a single pass: digits are accumulated as they
+ * are consumed, '_' separators are skipped, and the first character
+ * that is not a digit of the base ends the literal.  Values beyond
+ * 64 bits saturate, as strtoull does.
+ */
 static Token read_number(Lexer *lex)
 {
     int sl = lex->line, sc = lex->col;
     const char *start = lex->src + lex->pos;
-
-    /* hex 0x */
-    if (cur(lex) == '0' && (peek(lex,1) == 'x' || peek(lex,1) == 'X')) {
-        adv(lex); adv(lex);
-        while (lex->pos < lex->src_len && (isxdigit((unsigned char)cur(lex)) || cur(lex) == '_'))
-            adv(lex);
-        int len = (int)(lex->src + lex->pos - start);
-        Token tok = mktok(TOK_INT_LIT, sl, sc, start, len);
-        /* Parse value (skip underscores) */
-        char buf[64]; int bi = 0;
-        for (const char *p = start; p < start + len && bi < 62; p++)
-            if (*p != '_') buf[bi++] = *p;
-        buf[bi] = '\0';
-        tok.int_val = (int64_t)strtoull(buf, NULL, 0);
-        return tok;
+    const char *p = start, *end = lex->src + lex->src_len;
+
+    unsigned base = 10;
+    uint8_t  digits = CH_DIGIT;
+    if (p[0] == '0' && p + 1 < end) {
+        char x = (char)(p[1] | 0x20);
+        if (x == 'x')      { base = 16; digits = CH_HEX; p += 2; }  /* 0x */
+        else if (x == 'b') { base = 2;  digits = CH_BIN; p += 2; }  /* 0b */
     }
 
-    /* binary 0b */
-    if (cur(lex) == '0' && (peek(lex,1) == 'b' || peek(lex,1) == 'B')) {
-        adv(lex); adv(lex);
-        while (lex->pos < lex->src_len && (cur(lex) == '0' || cur(lex) == '1' || cur(lex) == '_'))
-            adv(lex);
-        int len = (int)(lex->src + lex->pos - start);
-        Token tok = mktok(TOK_INT_LIT, sl, sc, start, len);
-        char buf[128]; int bi = 0;
-        for (const char *p = start; p < start + len && bi < 126; p++)
-            if (*p != '_') buf[bi++] = *p;
-        buf[bi] = '\0';
-        tok.int_val = (int64_t)strtoull(buf + 2, NULL, 2);
-        return tok;
+    uint64_t val = 0;
+    bool overflow = false;
+    for (; p < end; p++) {
+        if (*p == '_') continue;
+        if (!CH_IS(*p, digits)) break;
+        unsigned d = hex_value(*p);
+        if (val > (UINT64_MAX - d) / base) overflow = true;
+        val = val * base + d;
     }
 
-    /* decimal */
-    while (lex->pos < lex->src_len && (isdigit((unsigned char)cur(lex)) || cur(lex) == '_'))
-        adv(lex);
-    int len = (int)(lex->src + lex->pos - start);
+    int len = (int)(p - start);
+    adv_run(lex, (size_t)len);
     Token tok = mktok(TOK_INT_LIT, sl, sc, start, len);
-    char buf[64]; int bi = 0;
-    for (const char *p = start; p < start + len && bi < 62; p++)
-        if (*p != '_') buf[bi++] = *p;
-    buf[bi] = '\0';
-    tok.int_val = (int64_t)strtoull(buf, NULL, 10);
+    tok.int_val = (int64_t)(overflow ? UINT64_MAX : val);
     return tok;
 }
 
@@ -341,77 +457,143 @@ static Token read_string(Lexer *lex)
     int sl = lex->line, sc = lex->col;
     adv(lex); /* skip opening " */
 
-    /* First pass: compute length */
-    size_t save_pos = lex->pos;
-    int save_line = lex->line, save_col = lex->col;
-    size_t slen = 0;
-    while (lex->pos < lex->src_len && cur(lex) != '"') {
-        if (cur(lex) == '\\') { adv(lex); slen++; adv(lex); }
-        else if (cur(lex) == '\n') {
-            fprintf(stderr, "%s:%d:%d: unterminated string literal\n",
-                    lex->filename, lex->line, lex->col);
-            lex->error_count++;
-            if (!lex->check_mode) exit(1);
-            break;
+    /* Find the closing quote with a plain pointer scan, noting whether
+     * the body needs escape decoding or tab-aware column tracking.  An
+     * escaped character is skipped, so \" does not end the literal. */
+    const char *start = lex->src + lex->pos;
+    const char *end   = lex->src + lex->src_len;
+    const char *p     = start;
+    bool has_escape = false, has_tab = false;
+    while (p < end && *p != '"' && *p != '\n') {
+        if (*p == '\\') {
+            has_escape = true;
+            if (p + 1 < end) p++;
+        } else if (*p == '\t') {
+            has_tab = true;
         }
-        else { slen++; adv(lex); }
+        p++;
     }
-    if (lex->pos >= lex->src_len) {
+    if (p >= end) {
         fprintf(stderr, "%s:%d:%d: unterminated string literal\n",
                 lex->filename, sl, sc);
         lex->error_count++;
         if (!lex->check_mode) exit(1);
+        while (lex->pos < lex->src_len) adv(lex);
         return mktok(TOK_STRING_LIT, sl, sc, "", 0);
     }
 
-    /* Second pass: copy with escapes */
-    lex->pos  = save_pos;
-    lex->line = save_line;
-    lex->col  = save_col;
-
-    char *buf = (char *)arena_alloc(lex->arena, slen + 1);
-    size_t bi = 0;
-    while (cur(lex) != '"') {
-        if (cur(lex) == '\\') {
-            adv(lex);
-            char esc = escape_char(cur(lex));
-            if (esc == 0 && cur(lex) != '0') {
-                fprintf(stderr, "%s:%d:%d: unknown escape sequence: \\%c\n",
-                        lex->filename, lex->line, lex->col, cur(lex));
-                lex->error_count++;
-                if (!lex->check_mode) exit(1);
-                esc = cur(lex);  /* use literal char as fallback */
-            }
-            buf[bi++] = esc;
-            adv(lex);
+    /* Escapes only shrink the text, so the raw length bounds the copy */
+    size_t raw = (size_t)(p - start);
+    char *buf = (char *)arena_alloc(lex->arena, raw + 1);
+    size_t bi;
+    if (!has_escape) {
+        memcpy(buf, start, raw);
+        bi = raw;
+        if (has_tab) {
+            for (size_t i = 0; i < raw; i++) adv(lex);
         } else {
-            buf[bi++] = cur(lex);
-            adv(lex);
+            adv_run(lex, raw);
+        }
+    } else {
+        bi = 0;
+        while (lex->src + lex->pos < p) {
+            if (cur(lex) == '\\') {
+                adv(lex);
+                unsigned char c = (unsigned char)cur(lex);
+                char esc = (c < 128) ? escape_map[c] : 0;
+                if (esc == 0 && c != '0') {
+                    fprintf(stderr, "%s:%d:%d: unknown escape sequence: \\%c\n",
+                            lex->filename, lex->line, lex->col, c);
+                    lex->error_count++;
+                    if (!lex->check_mode) exit(1);
+                    esc = (char)c;  /* use literal char as fallback */
+                }
+                buf[bi++] = esc;
+                adv(lex);
+            } else {
+                buf[bi++] = cur(lex);
+                adv(lex);
+            }
         }
     }
     buf[bi] = '\0';
-    adv(lex); /* skip closing " */
+
+    if (*p == '\n') {
+        /* Leave the newline for the next token */
+        fprintf(stderr, "%s:%d:%d: unterminated string literal\n",
+                lex->filename, lex->line, lex->col);
+        lex->error_count++;
+        if (!lex->check_mode) exit(1);
+    } else {
+        adv(lex); /* skip closing " */
+    }
 
     Token tok = mktok(TOK_STRING_LIT, sl, sc, buf, (int)bi);
     tok.str_val = buf;
     return tok;
 }
 
+/* ── Identifier interning ─────────────────────────────────── */
+
+/* Every occurrence of a name shares one arena copy, so a name used
+ * a thousand times is allocated once and later passes can compare
+ * names by pointer first (see axis_name_eq). */
+
+static uint32_t ident_hash(const char *s, size_t len)
+{
+    uint32_t h = 2166136261u;
+    for (size_t i = 0; i < len; i++) {
+        h ^= (uint8_t)s[i];
+        h *= 16777619u;
+    }
+    return h;
+}
+
+static void ident_grow(Lexer *lex)
+{
+    int cap = lex->ident_cap ? lex->ident_cap * 2 : 256;
+    const char **slots = (const char **)arena_alloc(lex->arena,
+                                                    (size_t)cap * sizeof(*slots));
+    for (int i = 0; i < lex->ident_cap; i++) {
+        const char *s = lex->idents[i];
+        if (!s) continue;
+        uint32_t j = ident_hash(s, strlen(s)) & (uint32_t)(cap - 1);
+        while (slots[j]) j = (j + 1) & (uint32_t)(cap - 1);
+        slots[j] = s;
+    }
+    lex->idents    = slots;
+    lex->ident_cap = cap;
+}
+
+static const char *intern_ident(Lexer *lex, const char *start, size_t len)
+{
+    if (2 * (lex->ident_count + 1) > lex->ident_cap)
+        ident_grow(lex);
+    uint32_t mask = (uint32_t)(lex->ident_cap - 1);
+    uint32_t j = ident_hash(start, len) & mask;
+    for (const char *s; (s = lex->idents[j]) != NULL; j = (j + 1) & mask)
+        if (strncmp(s, start, len) == 0 && s[len] == '\0')
+            return s;
+    const char *s = arena_strndup(lex->arena, start, len);
+    lex->idents[j] = s;
+    lex->ident_count++;
+    return s;
+}
+
 /* ── Identifier / keyword ─────────────────────────────────── */
 
 static Token read_ident(Lexer *lex)
 {
     int sl = lex->line, sc = lex->col;
     const char *start = lex->src + lex->pos;
-    while (lex->pos < lex->src_len && (isalnum((unsigned char)cur(lex)) || cur(lex) == '_'))
-        adv(lex);
-    int len = (int)(lex->src + lex->pos - start);
+    const char *p = start, *end = lex->src + lex->src_len;
+    while (p < end && CH_IS(*p, CH_IDENT))
+        p++;
+    int len = (int)(p - start);
+    adv_run(lex, (size_t)len);
     TokenType tt = lookup_keyword(start, len);
     Token tok = mktok(tt, sl, sc, start, len);
-    if (tt == TOK_IDENT)
-        tok.str_val = arena_strndup(lex->arena, start, (size_t)len);
-    else
-        tok.str_val = arena_strndup(lex->arena, start, (size_t)len);
+    tok.str_val = intern_ident(lex, start, (size_t)len);
     return tok;
 }
 
@@ -441,8 +623,10 @@ Token lexer_next(Lexer *lex)
             return mktok(TOK_NEWLINE, sl, sc, lex->src + lex->pos - 1, 1);
         }
 
+        uint8_t cls = char_class[(unsigned char)c];
+
         /* Inline whitespace */
-        if (c == ' ' || c == '\t' || c == '\r') {
+        if (cls & CH_SPACE) {
             skip_inline_ws(lex);
             continue;
         }
@@ -458,105 +642,39 @@ Token lexer_next(Lexer *lex)
         if (c == '"') return read_string(lex);
 
         /* Number literal */
-        if (isdigit((unsigned char)c))
+        if (cls & CH_DIGIT)
             return read_number(lex);
 
         /* Negative number (only if next char is digit and previous context suggests expression start) */
         /* NOT handled here – unary minus is handled by the parser */
 
         /* Identifier / keyword */
-        if (isalpha((unsigned char)c) || c == '_')
+        if (cls & CH_ALPHA)
             return read_ident(lex);
 
-        /* ── Multi-char operators ─────────────────────── */
-
-        /* == */
-        if (c == '=' && peek(lex,1) == '=') { adv(lex); adv(lex); return mktok(TOK_EQ, sl, sc, sp, 2); }
-        /* != */
-        if (c == '!' && peek(lex,1) == '=') { adv(lex); adv(lex); return mktok(TOK_NE, sl, sc, sp, 2); }
-        /* ! */
-        if (c == '!') { adv(lex); return mktok(TOK_BANG, sl, sc, sp, 1); }
-
-        /* <<, <<=, <=, < */
-        if (c == '<') {
-            if (peek(lex,1) == '<') {
-                adv(lex); adv(lex);
-                if (cur(lex) == '=') { adv(lex); return mktok(TOK_LSHIFT_ASSIGN, sl, sc, sp, 3); }
-                return mktok(TOK_LSHIFT, sl, sc, sp, 2);
-            }
-            if (peek(lex,1) == '=') { adv(lex); adv(lex); return mktok(TOK_LE, sl, sc, sp, 2); }
-            adv(lex); return mktok(TOK_LT, sl, sc, sp, 1);
-        }
-
-        /* >>, >>=, >=, > */
-        if (c == '>') {
-            if (peek(lex,1) == '>') {
-                adv(lex); adv(lex);
-                if (cur(lex) == '=') { adv(lex); return mktok(TOK_RSHIFT_ASSIGN, sl, sc, sp, 3); }
-                return mktok(TOK_RSHIFT, sl, sc, sp, 2);
-            }
-            if (peek(lex,1) == '=') { adv(lex); adv(lex); return mktok(TOK_GE, sl, sc, sp, 2); }
-            adv(lex); return mktok(TOK_GT, sl, sc, sp, 1);
-        }
-
-        /* -> (arrow) */
-        if (c == '-' && peek(lex,1) == '>') { adv(lex); adv(lex); return mktok(TOK_ARROW, sl, sc, sp, 2); }
-
-        /* .. (range) */
-        if (c == '.' && peek(lex,1) == '.') { adv(lex); adv(lex); return mktok(TOK_DOTDOT, sl, sc, sp, 2); }
-
-        /* :: (enum access) */
-        if (c == ':' && peek(lex,1) == ':') { adv(lex); adv(lex); return mktok(TOK_COLONCOLON, sl, sc, sp, 2); }
-
-        /* Compound assignments: +=, -=, *=, /=, %=, &=, |=, ^= */
-        if (peek(lex,1) == '=') {
-            TokenType ctt = TOK_EOF;
-            int clen = 2;
-            switch (c) {
-            case '+': ctt = TOK_PLUS_ASSIGN;    break;
-            case '-': ctt = TOK_MINUS_ASSIGN;   break;
-            case '*': ctt = TOK_STAR_ASSIGN;    break;
-            case '/': ctt = TOK_SLASH_ASSIGN;   break;
-            case '%': ctt = TOK_PERCENT_ASSIGN; break;
-            case '&': ctt = TOK_AMP_ASSIGN;     break;
-            case '|': ctt = TOK_PIPE_ASSIGN;    break;
-            case '^': ctt = TOK_CARET_ASSIGN;   break;
-            default: break;
+        /* ── Operators: longest match first ──────────── */
+        unsigned char uc = (unsigned char)c;
+        if (uc < 128) {
+            char n = peek(lex, 1);
+            if (n == '=' && eq_tok[uc] != 0) {
+                adv_run(lex, 2);
+                return mktok(eq_tok[uc], sl, sc, sp, 2);
             }
-            if (ctt != TOK_EOF) {
-                adv(lex); adv(lex);
-                return mktok(ctt, sl, sc, sp, clen);
+            if (n == c && dbl_tok[uc] != 0) {
+                if (peek(lex, 2) == '=' && dbl_eq_tok[uc] != 0) {
+                    adv_run(lex, 3);
+                    return mktok(dbl_eq_tok[uc], sl, sc, sp, 3);
+                }
+                adv_run(lex, 2);
+                return mktok(dbl_tok[uc], sl, sc, sp, 2);
             }
-        }
-
-        /* ── Single-char operators ────────────────────── */
-        {
-            TokenType stt = TOK_EOF;
-            switch (c) {
-            case '+': stt = TOK_PLUS;      break;
-            case '-': stt = TOK_MINUS;     break;
-            case '*': stt = TOK_STAR;      break;
-            case '/': stt = TOK_SLASH;     break;
-            case '%': stt = TOK_PERCENT;   break;
-            case '&': stt = TOK_AMP;       break;
-            case '|': stt = TOK_PIPE;      break;
-            case '^': stt = TOK_CARET;     break;
-            case '=': stt = TOK_ASSIGN;    break;
-            case '(': stt = TOK_LPAREN;    break;
-            case ')': stt = TOK_RPAREN;    break;
-            case '[': stt = TOK_LBRACKET;  break;
-            case ']': stt = TOK_RBRACKET;  break;
-            case '{': stt = TOK_LBRACE;    break;
-            case '}': stt = TOK_RBRACE;    break;
-            case ':': stt = TOK_COLON;     break;
-            case ';': stt = TOK_SEMICOLON; break;
-            case ',': stt = TOK_COMMA;     break;
-            case '.': stt = TOK_DOT;       break;
-            default: break;
+            if (c == '-' && n == '>') {
+                adv_run(lex, 2);
+                return mktok(TOK_ARROW, sl, sc, sp, 2);
             }
-            if (stt != TOK_EOF) {
-                adv(lex);
-                return mktok(stt, sl, sc, sp, 1);
+            if (single_tok[uc] != 0) {
+                adv_run(lex, 1);
+                return mktok(single_tok[uc], sl, sc, sp, 1);
             }
         }
 
@@ -121,6 +121,35 @@ static void print_version(void) {
  * Argument parsing
  * ═════════════════════════════════════════════════════════════ */
 
+/* ── Boolean flags ────────────────────────────────────────── */
+typedef struct {
+    const char *name;
+    size_t      field;      /* offsetof(Options, <bool>) */
+} FlagOpt;
+
+static const FlagOpt bool_flags[] = {
+    { "--unused",      offsetof(Options, check_unused) },
+    { "--dead",        offsetof(Options, check_dead)   },
+    { "--all",         offsetof(Options, check_all)    },
+    { "--dump-tokens", offsetof(Options, dump_tokens)  },
+    { "--dump-ir",     offsetof(Options, dump_ir)      },
+    { "--dump-x64",    offsetof(Options, dump_x64)     },
+    { "-v",            offsetof(Options, verbose)      },
+    { "--verbose",     offsetof(Options, verbose)      },
+};
+
+/* Compare the two characters after the leading '-' before falling
+ * back to strcmp, so most entries are rejected without a call. */
+static const FlagOpt *find_flag(const char *arg) {
+    if (arg[0] != '-') return NULL;
+    for (size_t i = 0; i < sizeof(bool_flags) / sizeof(bool_flags[0]); i++) {
+        const char *name = bool_flags[i].name;
+        if (name[1] == arg[1] && name[2] == arg[2] && strcmp(name, arg) == 0)
+            return &bool_flags[i];
+    }
+    return NULL;
+}
+
 static int parse_args(int argc, char **argv, Options *opts) {
     memset(opts, 0, sizeof(*opts));
     opts->command = CMD_NONE;
@@ -176,14 +205,9 @@ static int parse_args(int argc, char **argv, Options *opts) {
         }
         if (strcmp(arg, "--pe") == 0)          { opts->format = FMT_PE; continue; }
         if (strcmp(arg, "--elf") == 0)         { opts->format = FMT_ELF; continue; }
-        if (strcmp(arg, "--unused") == 0)      { opts->check_unused = true; continue; }
-        if (strcmp(arg, "--dead") == 0)        { opts->check_dead = true; continue; }
-        if (strcmp(arg, "--all") == 0)         { opts->check_all = true; continue; }
-        if (strcmp(arg, "--dump-tokens") == 0) { opts->dump_tokens = true; continue; }
-        if (strcmp(arg, "--dump-ir") == 0)     { opts->dump_ir = true; continue; }
-        if (strcmp(arg, "--dump-x64") == 0)    { opts->dump_x64 = true; continue; }
-        if (strcmp(arg, "-v") == 0 || strcmp(arg, "--verbose") == 0) {
-            opts->verbose = true;
+        const FlagOpt *fl = find_flag(arg);
+        if (fl) {
+            *(bool *)((char *)opts + fl->field) = true;
             continue;
         }
         /* Unknown flag */
@@ -263,6 +287,17 @@ static const char *token_kind_name(TokenType t) {
     }
 }
 
+/* stderr is unbuffered, so every fprintf in a dump is its own write.
+ * When a dump is requested, stderr gets one full buffer up front
+ * (before anything is written to it) and is flushed at the points
+ * where ordering against other output matters. */
+static char dump_buf[1 << 16];
+
+static void buffer_dumps(const Options *opts) {
+    if (opts->dump_tokens || opts->dump_ir || opts->dump_x64)
+        setvbuf(stderr, dump_buf, _IOFBF, sizeof(dump_buf));
+}
+
 static void dump_tokens(const Token *tokens, int count) {
     fprintf(stderr, "=== TOKENS (%d) ===\n", count);
     for (int i = 0; i < count; i++) {
@@ -277,34 +312,26 @@ static void dump_tokens(const Token *tokens, int count) {
         fprintf(stderr, "\n");
     }
     fprintf(stderr, "=== END TOKENS ===\n\n");
+    fflush(stderr);
 }
 
 /* ═════════════════════════════════════════════════════════════
  * Ensure __axcache__ directory exists
+ *
+ * The directory is the cache path minus its final component, so
+ * the input path is not split a second time.  mkdir on an existing
+ * directory fails harmlessly, which saves a stat() per compile.
  * ═════════════════════════════════════════════════════════════ */
 
-static void ensure_cache_dir(const char *input_path) {
-    /* Put __axcache__ next to the input file */
+static void ensure_cache_dir(const char *cache_path) {
     char dir[1024];
-    const char *last_sep = strrchr(input_path, PATH_SEP);
-#ifdef _WIN32
-    /* Also check forward slash on Windows */
-    const char *last_fwd = strrchr(input_path, '/');
-    if (last_fwd && (!last_sep || last_fwd > last_sep)) last_sep = last_fwd;
-#endif
-    if (last_sep) {
-        size_t prefix_len = (size_t)(last_sep - input_path + 1);
-        if (prefix_len >= sizeof(dir) - 16) return;
-        memcpy(dir, input_path, prefix_len);
-        snprintf(dir + prefix_len, sizeof(dir) - prefix_len, "__axcache__");
-    } else {
-        snprintf(dir, sizeof(dir), "__axcache__");
-    }
-
-    struct stat st;
-    if (stat(dir, &st) != 0) {
-        axis_mkdir(dir);
-    }
+    const char *last_sep = strrchr(cache_path, PATH_SEP);
+    if (!last_sep) return;
+    size_t dir_len = (size_t)(last_sep - cache_path);
+    if (dir_len >= sizeof(dir)) return;
+    memcpy(dir, cache_path, dir_len);
+    dir[dir_len] = '\0';
+    axis_mkdir(dir);
 }
 
 /* ═════════════════════════════════════════════════════════════
@@ -346,14 +373,46 @@ static void build_cache_path(const char *input_path, char *out, size_t out_size)
 }
 
 /* ═════════════════════════════════════════════════════════════
- * Check if cache is fresh (cached exe newer than source file)
+ * Cache key: FNV-1a over the compiler version and source text
+ *
+ * Timestamps say nothing about content: touching a file forced a
+ * rebuild, while restoring an older copy could reuse a binary built
+ * from different source.  The key is appended to the cached binary
+ * as an 8-byte trailer (loaders ignore bytes past the last section)
+ * after a successful compile, so one open and read answers both
+ * "is there a binary?" and "was it built from this source?".
  * ═════════════════════════════════════════════════════════════ */
 
-static bool cache_is_fresh(const char *source_path, const char *cache_path) {
-    struct stat src_st, cache_st;
-    if (stat(source_path, &src_st) != 0) return false;
-    if (stat(cache_path, &cache_st) != 0) return false;
-    return cache_st.st_mtime >= src_st.st_mtime;
+static uint64_t fnv1a64(const void *data, size_t len, uint64_t h) {
+    const uint8_t *p = (const uint8_t *)data;
+    for (size_t i = 0; i < len; i++) {
+        h ^= p[i];
+        h *= 0x100000001b3ULL;
+    }
+    return h;
+}
+
+static uint64_t source_key(const char *source, size_t len) {
+    uint64_t h = fnv1a64(AXIS_VERSION_STR, sizeof(AXIS_VERSION_STR) - 1,
+                         0xcbf29ce484222325ULL);
+    return fnv1a64(source, len, h);
+}
+
+static bool cache_is_fresh(const char *cache_path, uint64_t key) {
+    FILE *f = fopen(cache_path, "rb");
+    if (!f) return false;
+    uint64_t stored = 0;
+    bool ok = fseek(f, -(long)sizeof(stored), SEEK_END) == 0
+           && fread(&stored, sizeof(stored), 1, f) == 1;
+    fclose(f);
+    return ok && stored == key;
+}
+
+static void write_cache_key(const char *cache_path, uint64_t key) {
+    FILE *f = fopen(cache_path, "ab");
+    if (!f) return;
+    fwrite(&key, sizeof(key), 1, f);
+    fclose(f);
 }
 
 /* ═════════════════════════════════════════════════════════════
@@ -364,6 +423,7 @@ static int run_executable(const char *path, bool verbose) {
     if (verbose) {
         fprintf(stderr, "[axis] running '%s'...\n", path);
     }
+    fflush(stderr);
 
 #ifdef _WIN32
     /* On Windows, use _spawnl to run and wait */
@@ -396,17 +456,9 @@ static int run_executable(const char *path, bool verbose) {
  * Returns 0 on success, nonzero on error.
  * ═════════════════════════════════════════════════════════════ */
 
-static int compile_to_exe(const char *input_path, const char *output_path,
-                          const Options *opts) {
-
-    /* ── Read source ────────────────────────────────────── */
-    if (opts->verbose) {
-        fprintf(stderr, "[axis] reading '%s'...\n", input_path);
-    }
-
-    size_t src_len = 0;
-    char *source = read_source(input_path, &src_len);
-    if (!source) return 1;
+/* Compile an already-loaded source buffer; takes ownership of it */
+static int compile_source(const char *input_path, char *source, size_t src_len,
+                          const char *output_path, const Options *opts) {
 
     /* ── Arena ──────────────────────────────────────────── */
     Arena arena;
@@ -491,26 +543,24 @@ static int compile_to_exe(const char *input_path, const char *output_path,
     ir_program_init(&ir, &arena);
     ir_generate(&ir, ast, input_path);
 
-    /* ── Optimization passes (compile mode only) ──────── */
-    if (ast->mode == MODE_COMPILE) {
-        if (opts->verbose) fprintf(stderr, "[axis] running optimization passes...\n");
-        opt_dce(&ir);
-        opt_inline(&ir);
-        opt_constfold(&ir);
-        opt_copyprop(&ir);
-        opt_strength_reduce(&ir);
-        opt_peephole(&ir);
-        opt_loadstore_elim(&ir);
-        opt_licm(&ir);
-        opt_unroll(&ir);
-        opt_loadstore_elim(&ir); /* re-run after unrolling */
-        opt_rie(&ir);
-        opt_dce(&ir);            /* final cleanup */
-    } else if (opts->verbose) {
-        fprintf(stderr, "[axis] skipping optimizations (script mode)\n");
-    }
-
-    if (opts->dump_ir) ir_dump(&ir, stderr);
+    /* ── Optimization passes ───────────────────────────── */
+    /* Scripts are compiled once into __axcache__ and then reused, so
+     * they get the same pipeline as compile mode. */
+    if (opts->verbose) fprintf(stderr, "[axis] running optimization passes...\n");
+    opt_dce(&ir);
+    opt_inline(&ir);
+    opt_constfold(&ir);
+    opt_copyprop(&ir);
+    opt_strength_reduce(&ir);
+    opt_peephole(&ir);
+    opt_loadstore_elim(&ir);
+    opt_licm(&ir);
+    opt_unroll(&ir);
+    opt_loadstore_elim(&ir); /* re-run after unrolling */
+    opt_rie(&ir);
+    opt_dce(&ir);            /* final cleanup */
+
+    if (opts->dump_ir) { ir_dump(&ir, stderr); fflush(stderr); }
     if (opts->verbose) {
         fprintf(stderr, "[axis] %d IR functions, %d strings\n",
                 ir.func_count, ir.str_count);
@@ -523,7 +573,7 @@ static int compile_to_exe(const char *input_path, const char *output_path,
     memset(&x64, 0, sizeof(x64));
     x64_codegen(&x64, &ir, &arena);
 
-    if (opts->dump_x64) x64_dump(&x64, stderr);
+    if (opts->dump_x64) { x64_dump(&x64, stderr); fflush(stderr); }
     if (opts->verbose) {
         fprintf(stderr, "[axis] code: %d bytes, rdata: %d bytes, %d relocs\n",
                 x64.code.len, x64.rdata_len, x64.reloc_count);
@@ -598,38 +648,118 @@ static int compile_to_exe(const char *input_path, const char *output_path,
     return 0;
 }
 
+/* Read the source from disk, then compile it */
+static int compile_to_exe(const char *input_path, const char *output_path,
+                          const Options *opts) {
+    if (opts->verbose) {
+        fprintf(stderr, "[axis] reading '%s'...\n", input_path);
+    }
+
+    size_t src_len = 0;
+    char *source = read_source(input_path, &src_len);
+    if (!source) return 1;
+    return compile_source(input_path, source, src_len, output_path, opts);
+}
+
+/* ═════════════════════════════════════════════════════════════
+ * Run a script through the __axcache__ binary, rebuilding it when
+ * the cache key no longer matches the source
+ * ═════════════════════════════════════════════════════════════ */
+
+static int run_cached(const Options *opts) {
+    char cache_path[1024];
+    build_cache_path(opts->input_file, cache_path, sizeof(cache_path));
+
+    /* One read serves both the cache key and, on a miss, the compile */
+    size_t src_len = 0;
+    char *source = read_source(opts->input_file, &src_len);
+    if (!source) return 1;
+    uint64_t key = source_key(source, src_len);
+
+    if (!cache_is_fresh(cache_path, key)) {
+        ensure_cache_dir(cache_path);
+        int rc = compile_source(opts->input_file, source, src_len,
+                                cache_path, opts);
+        if (rc != 0) return rc;
+        write_cache_key(cache_path, key);
+    } else {
+        free(source);
+        if (opts->verbose)
+            fprintf(stderr, "[axis] cache hit: '%s'\n", cache_path);
+    }
+
+    return run_executable(cache_path, opts->verbose);
+}
+
 /* ═════════════════════════════════════════════════════════════
  * Quick mode detection (peek at source without full parse)
  * Returns MODE_SCRIPT or MODE_COMPILE.
  * ═════════════════════════════════════════════════════════════ */
 
 static ProgramMode detect_mode_quick(const char *path) {
-    FILE *f = fopen(path, "r");
+    FILE *f = fopen(path, "rb");
     if (!f) return MODE_COMPILE; /* fallback */
 
-    char line[256];
-    while (fgets(line, sizeof(line), f)) {
-        /* Skip blank lines and comments */
-        const char *p = line;
-        while (*p == ' ' || *p == '\t') p++;
-        if (*p == '\0' || *p == '\n' || *p == '\r') continue;
-        if (*p == '/' && *(p+1) == '/') continue;
-        if (*p == '#') continue;
-
-        /* Check for mode declaration */
-        if (strncmp(p, "mode ", 5) == 0) {
-            const char *m = p + 5;
-            while (*m == ' ' || *m == '\t') m++;
-            if (strncmp(m, "script", 6) == 0) {
-                fclose(f);
-                return MODE_SCRIPT;
+    /* Read in chunks and carry a small scanner state across them, so
+     * neither a long leading comment nor a chunk boundary can split
+     * the decision.  Comment lines are skipped whole with memchr. */
+    static const char mode_kw[] = "mode ", script_kw[] = "script";
+    enum { AT_INDENT, AT_SLASH, IN_COMMENT, IN_MODE, AT_GAP, IN_SCRIPT }
+        st = AT_INDENT;
+    size_t matched = 0;
+    ProgramMode mode = MODE_COMPILE;
+    static char buf[16384];
+    size_t len;
+
+    while ((len = fread(buf, 1, sizeof(buf), f)) > 0) {
+        const char *p = buf, *end = buf + len;
+        while (p < end) {
+            if (st == IN_COMMENT) {
+                const char *nl = memchr(p, '\n', (size_t)(end - p));
+                if (!nl) break;          /* comment runs into next chunk */
+                p = nl + 1;
+                st = AT_INDENT;
+                continue;
+            }
+            char c = *p++;
+            switch (st) {
+            case AT_INDENT:              /* skip blank lines, indentation */
+                if (c == ' ' || c == '\t' || c == '\r' || c == '\n') break;
+                if (c == '#') st = IN_COMMENT;
+                else if (c == '/') st = AT_SLASH;
+                else if (c == mode_kw[0]) { st = IN_MODE; matched = 1; }
+                else goto done;          /* first code line: not a mode */
+                break;
+            case AT_SLASH:
+                if (c != '/') goto done;
+                st = IN_COMMENT;
+                break;
+            case IN_MODE:
+                if (c != mode_kw[matched]) goto done;
+                if (++matched == sizeof(mode_kw) - 1) st = AT_GAP;
+                break;
+            case AT_GAP:
+                if (c == ' ' || c == '\t') break;
+                if (c != script_kw[0]) goto done;
+                st = IN_SCRIPT;
+                matched = 1;
+                break;
+            case IN_SCRIPT:
+                if (c != script_kw[matched]) goto done;
+                if (++matched == sizeof(script_kw) - 1) {
+                    mode = MODE_SCRIPT;
+                    goto done;
+                }
+                break;
+            case IN_COMMENT:
+                break;
             }
         }
-        fclose(f);
-        return MODE_COMPILE;
     }
+
+done:
     fclose(f);
-    return MODE_COMPILE;
+    return mode;
 }
 
 /* ═════════════════════════════════════════════════════════════
@@ -748,6 +878,7 @@ int main(int argc, char **argv) {
         print_version();
         return 0;
     }
+    buffer_dumps(&opts);
 
     /* ── CMD_CHECK: syntax/semantic check ───────────────── */
     if (opts.command == CMD_CHECK) {
@@ -776,19 +907,7 @@ int main(int argc, char **argv) {
             return 1;
         }
 
-        char cache_path[1024];
-        build_cache_path(opts.input_file, cache_path, sizeof(cache_path));
-
-        /* Check cache freshness */
-        if (!cache_is_fresh(opts.input_file, cache_path)) {
-            ensure_cache_dir(opts.input_file);
-            int rc = compile_to_exe(opts.input_file, cache_path, &opts);
-            if (rc != 0) return rc;
-        } else if (opts.verbose) {
-            fprintf(stderr, "[axis] cache hit: '%s'\n", cache_path);
-        }
-
-        return run_executable(cache_path, opts.verbose);
+        return run_cached(&opts);
     }
 
     /* ── CMD_BUILD: compile to specified output ─────────── */
@@ -822,18 +941,7 @@ int main(int argc, char **argv) {
             }
 
             /* Script mode → compile to cache + run */
-            char cache_path[1024];
-            build_cache_path(opts.input_file, cache_path, sizeof(cache_path));
-
-            if (!cache_is_fresh(opts.input_file, cache_path)) {
-                ensure_cache_dir(opts.input_file);
-                int rc = compile_to_exe(opts.input_file, cache_path, &opts);
-                if (rc != 0) return rc;
-            } else if (opts.verbose) {
-                fprintf(stderr, "[axis] cache hit: '%s'\n", cache_path);
-            }
-
-            return run_executable(cache_path, opts.verbose);
+            return run_cached(&opts);
         } else {
             /* Compile mode → ask for output if not given */
             char out_path[1024];
@@ -843,6 +951,7 @@ int main(int argc, char **argv) {
                 char default_out[1024];
                 default_output_path(opts.input_file, opts.format, default_out, sizeof(default_out));
                 fprintf(stderr, "Output file [%s]: ", default_out);
+                fflush(stderr);
                 if (fgets(out_path, sizeof(out_path), stdin)) {
                     /* Trim newline */
                     size_t len = strlen(out_path);
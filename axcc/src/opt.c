@@ -13,44 +13,96 @@
 /* ═════════════════════════════════════════════════════════════
  * Dead Code Elimination
  *
- * Walk each function's instruction list.  When we encounter an
- * unconditional terminator (IR_JMP, IR_RET, IR_RET_VOID), mark
- * all subsequent instructions as dead until we see an IR_LABEL
- * (which could be a branch target).  Then compact the array.
+ * Mark every instruction reachable from the function entry by
+ * following fall-through and branch targets, then NOP out and
+ * compact away the rest.  Unlike stopping at the next label, this
+ * also drops whole branches made dead by constant folding (a
+ * 'when False:' body, code after 'while True:' with no 'stop'),
+ * including loops and labels nested inside them.
  * ═════════════════════════════════════════════════════════════ */
 
+static int label_target(const IRInstr *ins)
+{
+    if (ins->op == IR_LABEL) return -1;
+    if (ins->dest.kind == OPER_LABEL) return ins->dest.label_id;
+    if (ins->src1.kind == OPER_LABEL) return ins->src1.label_id;
+    if (ins->src2.kind == OPER_LABEL) return ins->src2.label_id;
+    return -1;
+}
+
 static void dce_func(IRFunc *fn)
 {
-    if (fn->instr_count == 0) return;
+    int n = fn->instr_count;
+    if (n == 0) return;
 
-    /* Mark dead instructions by setting op = IR_NOP */
-    bool dead = false;
-    for (int i = 0; i < fn->instr_count; i++) {
-        IRInstr *ins = &fn->instrs[i];
+    int max_label = -1;
+    for (int i = 0; i < n; i++) {
+        const IRInstr *ins = &fn->instrs[i];
+        if (ins->op == IR_LABEL && ins->dest.label_id > max_label)
+            max_label = ins->dest.label_id;
+    }
+    int  *label_pos = (int *)malloc((size_t)(max_label + 2) * sizeof(int));
+    for (int l = 0; l <= max_label; l++) label_pos[l] = -1;
+    for (int i = 0; i < n; i++) {
+        const IRInstr *ins = &fn->instrs[i];
+        if (ins->op == IR_LABEL && ins->dest.label_id >= 0)
+            label_pos[ins->dest.label_id] = i;
+    }
 
-        if (dead) {
-            if (ins->op == IR_LABEL) {
-                dead = false;       /* label is reachable from a branch */
-            } else {
-                ins->op = IR_NOP;   /* unreachable — kill it */
+    /* Worklist of block starts; each entry is pushed at most once
+     * because its instruction is marked before the push. */
+    bool *live  = (bool *)calloc((size_t)n, sizeof(bool));
+    int  *work  = (int *)malloc((size_t)n * sizeof(int));
+    int   wn    = 0;
+    live[0] = true;
+    work[wn++] = 0;
+    while (wn > 0) {
+        for (int i = work[--wn]; i < n; i++) {
+            const IRInstr *ins = &fn->instrs[i];
+            live[i] = true;
+
+            int lbl = label_target(ins);
+            if (lbl >= 0 && lbl <= max_label) {
+                int t = label_pos[lbl];
+                if (t >= 0 && !live[t]) {
+                    live[t] = true;
+                    work[wn++] = t;
+                }
             }
-        }
 
-        /* Check if this instruction is an unconditional terminator */
-        if (ins->op == IR_JMP || ins->op == IR_RET || ins->op == IR_RET_VOID) {
-            dead = true;
+            if (ins->op == IR_JMP || ins->op == IR_RET || ins->op == IR_RET_VOID)
+                break;
+            if (i + 1 < n && live[i + 1])
+                break;
         }
     }
 
-    /* Compact: remove NOP instructions */
+    /* Compact: keep only reachable instructions */
     int w = 0;
-    for (int i = 0; i < fn->instr_count; i++) {
-        if (fn->instrs[i].op != IR_NOP) {
+    for (int i = 0; i < n; i++) {
+        if (live[i] && fn->instrs[i].op != IR_NOP) {
             if (w != i) fn->instrs[w] = fn->instrs[i];
             w++;
         }
     }
     fn->instr_count = w;
+
+    /* A folded 'when' often leaves "jmp L; L:" behind — drop the jump */
+    w = 0;
+    for (int i = 0; i < fn->instr_count; i++) {
+        const IRInstr *ins = &fn->instrs[i];
+        if (ins->op == IR_JMP && i + 1 < fn->instr_count
+            && fn->instrs[i + 1].op == IR_LABEL
+            && fn->instrs[i + 1].dest.label_id == ins->dest.label_id)
+            continue;
+        if (w != i) fn->instrs[w] = fn->instrs[i];
+        w++;
+    }
+    fn->instr_count = w;
+
+    free(work);
+    free(live);
+    free(label_pos);
 }
 
 void opt_dce(IRProgram *ir)
@@ -159,15 +211,47 @@ static bool fold_branch(IRInstr *ins)
     return false;
 }
 
-/* Replace OPER_TEMP references with a known constant value. */
-static void replace_oper(IROper *op, int temp_id, int64_t val)
+/* Constant-propagation table, allocated once per function and
+ * refilled on every round of the fixpoint loop. */
+typedef struct {
+    int     *def_count;  /* number of defs per temp                */
+    bool    *def_const;  /* the def is LOAD_IMM or MOV of an imm   */
+    int64_t *def_val;    /* its value when def_const               */
+    int      tc;
+} ConstDefs;
+
+static void constdefs_fill(ConstDefs *cd, const IRFunc *fn)
 {
-    if (op->kind == OPER_TEMP && op->temp_id == temp_id) {
-        op->kind = OPER_IMM;
-        op->imm  = val;
+    memset(cd->def_count, 0, (size_t)cd->tc * sizeof(int));
+    for (int i = 0; i < fn->instr_count; i++) {
+        const IRInstr *ins = &fn->instrs[i];
+        if (ins->dest.kind != OPER_TEMP) continue;
+        int id = ins->dest.temp_id;
+        if (id < 0 || id >= cd->tc) continue;
+        cd->def_count[id]++;
+        cd->def_const[id] = ins->op == IR_LOAD_IMM ||
+                            (ins->op == IR_MOV && ins->src1.kind == OPER_IMM);
+        cd->def_val[id] = cd->def_const[id] ? ins->src1.imm : 0;
     }
 }
 
+/* Replace op with its value if it names a single-def constant temp
+ * other than the one ins defines.  Returns true if op changed. */
+static bool propagate_oper(const ConstDefs *cd, const IRInstr *ins,
+                           IROper *op)
+{
+    if (op->kind != OPER_TEMP) return false;
+    int t = op->temp_id;
+    if (t < 0 || t >= cd->tc) return false;
+    if (cd->def_count[t] != 1 || !cd->def_const[t]) return false;
+    /* Don't replace the definition itself */
+    if (ins->dest.kind == OPER_TEMP && ins->dest.temp_id == t)
+        return false;
+    op->kind = OPER_IMM;
+    op->imm  = cd->def_val[t];
+    return true;
+}
+
 static void constfold_func(IRFunc *fn)
 {
     if (fn->instr_count == 0) return;
@@ -175,6 +259,13 @@ static void constfold_func(IRFunc *fn)
     int tc = fn->temp_count;
     if (tc <= 0) tc = 0;
 
+    ConstDefs cd = { NULL, NULL, NULL, tc };
+    if (tc > 0) {
+        cd.def_count = (int *)malloc((size_t)tc * sizeof(int));
+        cd.def_const = (bool *)malloc((size_t)tc * sizeof(bool));
+        cd.def_val   = (int64_t *)malloc((size_t)tc * sizeof(int64_t));
+    }
+
     /* Iterate until no more changes */
     bool changed = true;
     while (changed) {
@@ -184,62 +275,15 @@ static void constfold_func(IRFunc *fn)
          *                                                     *
          * A temp is propagatable if it is defined exactly once *
          * by IR_LOAD_IMM.  We count defs and track the value. */
-        int *def_count = NULL;
-        int64_t *def_val = NULL;
         if (tc > 0) {
-            def_count = (int *)calloc((size_t)tc, sizeof(int));
-            def_val   = (int64_t *)calloc((size_t)tc, sizeof(int64_t));
-
-            for (int i = 0; i < fn->instr_count; i++) {
-                IRInstr *ins = &fn->instrs[i];
-                if (ins->dest.kind == OPER_TEMP) {
-                    int id = ins->dest.temp_id;
-                    if (id >= 0 && id < tc) {
-                        def_count[id]++;
-                        if (ins->op == IR_LOAD_IMM)
-                            def_val[id] = ins->src1.imm;
-                        else if (ins->op == IR_MOV && ins->src1.kind == OPER_IMM)
-                            def_val[id] = ins->src1.imm;
-                        else
-                            def_val[id] = 0; /* not a constant def */
-                    }
-                }
-            }
+            constdefs_fill(&cd, fn);
 
             /* Propagation: replace uses of single-def constant temps */
             for (int i = 0; i < fn->instr_count; i++) {
                 IRInstr *ins = &fn->instrs[i];
-                for (int t = 0; t < tc; t++) {
-                    if (def_count[t] != 1) continue;
-                    /* Check the single def is IR_LOAD_IMM or IR_MOV imm */
-                    bool is_const = false;
-                    for (int k = 0; k < fn->instr_count; k++) {
-                        IRInstr *d = &fn->instrs[k];
-                        if (d->dest.kind == OPER_TEMP && d->dest.temp_id == t) {
-                            is_const = (d->op == IR_LOAD_IMM) ||
-                                       (d->op == IR_MOV && d->src1.kind == OPER_IMM);
-                            break;
-                        }
-                    }
-                    if (!is_const) continue;
-
-                    /* Don't replace the definition itself */
-                    if (ins->dest.kind == OPER_TEMP && ins->dest.temp_id == t)
-                        continue;
-
-                    int64_t v = def_val[t];
-                    IROper old_src1 = ins->src1;
-                    IROper old_src2 = ins->src2;
-                    replace_oper(&ins->src1, t, v);
-                    replace_oper(&ins->src2, t, v);
-                    if (ins->src1.kind != old_src1.kind || ins->src1.imm != old_src1.imm ||
-                        ins->src2.kind != old_src2.kind || ins->src2.imm != old_src2.imm)
-                        changed = true;
-                }
+                if (propagate_oper(&cd, ins, &ins->src1)) changed = true;
+                if (propagate_oper(&cd, ins, &ins->src2)) changed = true;
             }
-
-            free(def_count);
-            free(def_val);
         }
 
         /* ── Pass B: Constant Folding ────────────────────── */
@@ -250,6 +294,10 @@ static void constfold_func(IRFunc *fn)
         }
     }
 
+    free(cd.def_count);
+    free(cd.def_const);
+    free(cd.def_val);
+
     /* ── Dead-instruction cleanup ────────────────────────── *
      * After propagation, some IR_LOAD_IMM / IR_MOV defs may  *
      * have no remaining uses — turn them into NOP.            */
@@ -26,14 +26,26 @@
 
 static void parse_error(Parser *p, const char *fmt, ...)
 {
+    /* Format the whole line first and emit it with one fputs, so the
+     * location and the message never reach stderr as separate pieces.
+     * By default stderr is unbuffered and this is a single write that
+     * parallel builds cannot split; under a dump, buffer_dumps() makes
+     * stderr fully buffered and the line goes out at the next flush. */
+    char msg[512];
+    size_t cap = sizeof(msg) - 1;           /* keep room for '\n' */
+    int n = snprintf(msg, cap, "%s:%d:%d: parse error: ",
+                     p->filename, p->cur ? p->cur->loc.line : 0,
+                     p->cur ? p->cur->loc.col : 0);
+    if (n < 0) n = 0;
+    if ((size_t)n >= cap) n = (int)cap - 1;
     va_list ap;
     va_start(ap, fmt);
-    fprintf(stderr, "%s:%d:%d: parse error: ",
-            p->filename, p->cur ? p->cur->loc.line : 0,
-            p->cur ? p->cur->loc.col : 0);
-    vfprintf(stderr, fmt, ap);
-    fputc('\n', stderr);
+    vsnprintf(msg + n, cap - (size_t)n, fmt, ap);
     va_end(ap);
+    size_t len = strlen(msg);
+    msg[len] = '\n';
+    msg[len + 1] = '\0';
+    fputs(msg, stderr);
     p->error_count++;
     if (p->check_mode) {
         longjmp(p->err_jmp, 1);
@@ -103,9 +115,18 @@ static SrcLoc loc(Parser *p)
     return s;
 }
 
-/* Arena helpers for node allocation */
-#define NEW_EXPR(p)   ((ASTExpr *)arena_alloc((p)->arena, sizeof(ASTExpr)))
-#define NEW_STMT(p)   ((ASTStmt *)arena_alloc((p)->arena, sizeof(ASTStmt)))
+/* Arena helpers for node allocation.  A node only gets room for the
+ * union member its kind uses (m), so a literal doesn't pay for the
+ * largest variant.  Payload-less kinds pass the last header field. */
+#define NODE_SIZE(T, m) (offsetof(T, m) + sizeof(((T *)0)->m))
+#define NEW_EXPR(p, m)  ((ASTExpr *)arena_alloc((p)->arena, NODE_SIZE(ASTExpr, m)))
+#define NEW_STMT(p, m)  ((ASTStmt *)arena_alloc((p)->arena, NODE_SIZE(ASTStmt, m)))
+
+/* semantic.c rewrites a FIELD_ACCESS node into ENUM_ACCESS in place,
+ * so the field_access allocation must also hold enum_access. */
+_Static_assert(sizeof(((ASTExpr *)0)->enum_access)
+               <= sizeof(((ASTExpr *)0)->field_access),
+               "enum_access must fit in a field_access-sized node");
 
 /* Dynamic list helpers – grow an arena-allocated pointer array.
  * We keep a small local buffer, then copy into the arena at the end. */
@@ -226,7 +247,7 @@ static ASTExpr *parse_primary(Parser *p)
 {
     /* Integer literal */
     if (match(p, TOK_INT_LIT)) {
-        ASTExpr *e = NEW_EXPR(p);
+        ASTExpr *e = NEW_EXPR(p, int_lit);
         e->kind = EXPR_INT_LIT;
         e->loc  = loc(p);
         e->int_lit.value = cur(p)->int_val;
@@ -236,7 +257,7 @@ static ASTExpr *parse_primary(Parser *p)
 
     /* String literal */
     if (match(p, TOK_STRING_LIT)) {
-        ASTExpr *e = NEW_EXPR(p);
+        ASTExpr *e = NEW_EXPR(p, string_lit);
         e->kind = EXPR_STRING_LIT;
         e->loc  = loc(p);
         e->string_lit.value = cur(p)->str_val;
@@ -246,7 +267,7 @@ static ASTExpr *parse_primary(Parser *p)
 
     /* Boolean literals */
     if (match(p, TOK_TRUE)) {
-        ASTExpr *e = NEW_EXPR(p);
+        ASTExpr *e = NEW_EXPR(p, bool_lit);
         e->kind = EXPR_BOOL_LIT;
         e->loc  = loc(p);
         e->bool_lit.value = true;
@@ -254,7 +275,7 @@ static ASTExpr *parse_primary(Parser *p)
         return e;
     }
     if (match(p, TOK_FALSE)) {
-        ASTExpr *e = NEW_EXPR(p);
+        ASTExpr *e = NEW_EXPR(p, bool_lit);
         e->kind = EXPR_BOOL_LIT;
         e->loc  = loc(p);
         e->bool_lit.value = false;
@@ -279,7 +300,7 @@ static ASTExpr *parse_primary(Parser *p)
             }
         }
         ASTExpr *operand = parse_unary(p);  /* copy applies to a single operand */
-        ASTExpr *e = NEW_EXPR(p);
+        ASTExpr *e = NEW_EXPR(p, copy);
         e->kind = EXPR_COPY;
         e->loc  = l;
         e->copy.expr         = operand;
@@ -301,7 +322,7 @@ static ASTExpr *parse_primary(Parser *p)
             }
         }
         expect(p, TOK_RBRACKET);
-        ASTExpr *e = NEW_EXPR(p);
+        ASTExpr *e = NEW_EXPR(p, array_lit);
         e->kind = EXPR_ARRAY_LIT;
         e->loc  = l;
         e->array_lit.elements = (ASTExpr **)elems.items;
@@ -322,7 +343,7 @@ static ASTExpr *parse_primary(Parser *p)
         advance(p);
         expect(p, TOK_LPAREN);
         expect(p, TOK_RPAREN);
-        ASTExpr *e = NEW_EXPR(p);
+        ASTExpr *e = NEW_EXPR(p, call);
         e->kind = EXPR_CALL;
         e->loc  = l;
         e->call.name         = name;
@@ -338,7 +359,7 @@ static ASTExpr *parse_primary(Parser *p)
         advance(p);
         expect(p, TOK_LPAREN);
         expect(p, TOK_RPAREN);
-        ASTExpr *e = NEW_EXPR(p);
+        ASTExpr *e = NEW_EXPR(p, inferred_type);
         e->kind = EXPR_READ_FAILED;
         e->loc  = l;
         return e;
@@ -357,7 +378,7 @@ static ASTExpr *parse_primary(Parser *p)
                 parse_error(p, "expected variant name after '::'");
             const char *variant = cur(p)->str_val;
             advance(p);
-            ASTExpr *e = NEW_EXPR(p);
+            ASTExpr *e = NEW_EXPR(p, enum_access);
             e->kind = EXPR_ENUM_ACCESS;
             e->loc  = l;
             e->enum_access.enum_name = name;
@@ -378,7 +399,7 @@ static ASTExpr *parse_primary(Parser *p)
                 }
             }
             expect(p, TOK_RPAREN);
-            ASTExpr *e = NEW_EXPR(p);
+            ASTExpr *e = NEW_EXPR(p, call);
             e->kind = EXPR_CALL;
             e->loc  = l;
             e->call.name         = name;
@@ -396,7 +417,7 @@ static ASTExpr *parse_primary(Parser *p)
         }
 
         /* Plain identifier */
-        ASTExpr *e = NEW_EXPR(p);
+        ASTExpr *e = NEW_EXPR(p, ident);
         e->kind = EXPR_IDENT;
         e->loc  = l;
         e->ident.name = name;
@@ -425,7 +446,7 @@ static ASTExpr *parse_postfix(Parser *p)
             advance(p);
             ASTExpr *idx = parse_expression(p);
             expect(p, TOK_RBRACKET);
-            ASTExpr *n = NEW_EXPR(p);
+            ASTExpr *n = NEW_EXPR(p, index);
             n->kind = EXPR_INDEX;
             n->loc  = e->loc;
             n->index.array = e;
@@ -437,7 +458,7 @@ static ASTExpr *parse_postfix(Parser *p)
                 parse_error(p, "expected member name after '.'");
             const char *member = cur(p)->str_val;
             advance(p);
-            ASTExpr *n = NEW_EXPR(p);
+            ASTExpr *n = NEW_EXPR(p, field_access);
             n->kind = EXPR_FIELD_ACCESS;
             n->loc  = e->loc;
             n->field_access.object = e;
@@ -457,7 +478,7 @@ static ASTExpr *parse_unary(Parser *p)
         SrcLoc l = loc(p);
         advance(p);
         ASTExpr *operand = parse_unary(p);
-        ASTExpr *e = NEW_EXPR(p);
+        ASTExpr *e = NEW_EXPR(p, unary);
         e->kind = EXPR_UNARY;
         e->loc  = l;
         e->unary.op      = TOK_MINUS;
@@ -468,7 +489,7 @@ static ASTExpr *parse_unary(Parser *p)
         SrcLoc l = loc(p);
         advance(p);
         ASTExpr *operand = parse_unary(p);
-        ASTExpr *e = NEW_EXPR(p);
+        ASTExpr *e = NEW_EXPR(p, unary);
         e->kind = EXPR_UNARY;
         e->loc  = l;
         e->unary.op      = TOK_BANG;
@@ -479,7 +500,7 @@ static ASTExpr *parse_unary(Parser *p)
         SrcLoc l = loc(p);
         advance(p);
         ASTExpr *operand = parse_unary(p);
-        ASTExpr *e = NEW_EXPR(p);
+        ASTExpr *e = NEW_EXPR(p, unary);
         e->kind = EXPR_UNARY;
         e->loc  = l;
         e->unary.op      = TOK_NOT;
@@ -505,7 +526,7 @@ static ASTExpr *name(Parser *p)                                           \
                 TokenType op = cur(p)->type;                              \
                 advance(p);                                               \
                 ASTExpr *right = next(p);                                 \
-                ASTExpr *n = NEW_EXPR(p);                                 \
+                ASTExpr *n = NEW_EXPR(p, binary);                         \
                 n->kind         = EXPR_BINARY;                            \
                 n->loc          = l;                                      \
                 n->binary.left  = e;                                      \
@@ -596,7 +617,7 @@ static ASTStmt *parse_var_decl(Parser *p)
     }
     skip_newlines(p);
 
-    ASTStmt *s = NEW_STMT(p);
+    ASTStmt *s = NEW_STMT(p, var_decl);
     s->kind = STMT_VAR_DECL;
     s->loc  = l;
     s->var_decl.name         = name;
@@ -616,7 +637,7 @@ static ASTStmt *parse_return(Parser *p)
         value = parse_expression(p);
     skip_newlines(p);
 
-    ASTStmt *s = NEW_STMT(p);
+    ASTStmt *s = NEW_STMT(p, return_stmt);
     s->kind = STMT_RETURN;
     s->loc  = l;
     s->return_stmt.value = value;
@@ -652,7 +673,7 @@ static ASTStmt *parse_if(Parser *p)
         }
     }
 
-    ASTStmt *s = NEW_STMT(p);
+    ASTStmt *s = NEW_STMT(p, if_stmt);
     s->kind = STMT_IF;
     s->loc  = l;
     s->if_stmt.condition  = cond;
@@ -675,7 +696,7 @@ static ASTStmt *parse_while(Parser *p)
     int body_count;
     parse_block(p, &body, &body_count);
 
-    ASTStmt *s = NEW_STMT(p);
+    ASTStmt *s = NEW_STMT(p, while_loop);
     s->kind = STMT_WHILE;
     s->loc  = l;
     s->while_loop.condition  = cond;
@@ -695,7 +716,7 @@ static ASTStmt *parse_repeat(Parser *p)
     int body_count;
     parse_block(p, &body, &body_count);
 
-    ASTStmt *s = NEW_STMT(p);
+    ASTStmt *s = NEW_STMT(p, repeat_loop);
     s->kind = STMT_REPEAT;
     s->loc  = l;
     s->repeat_loop.body       = body;
@@ -741,7 +762,7 @@ static ASTStmt *parse_match(Parser *p)
     }
     expect(p, TOK_DEDENT);
 
-    ASTStmt *s = NEW_STMT(p);
+    ASTStmt *s = NEW_STMT(p, match);
     s->kind = STMT_MATCH;
     s->loc  = l;
     s->match.expr      = expr;
@@ -775,7 +796,7 @@ static ASTStmt *parse_for(Parser *p)
             step = parse_expression(p);
         }
         expect(p, TOK_RPAREN);
-        iterable = NEW_EXPR(p);
+        iterable = NEW_EXPR(p, range);
         iterable->kind = EXPR_RANGE;
         iterable->loc  = rl;
         iterable->range.start = start;
@@ -792,7 +813,7 @@ static ASTStmt *parse_for(Parser *p)
     int body_count;
     parse_block(p, &body, &body_count);
 
-    ASTStmt *s = NEW_STMT(p);
+    ASTStmt *s = NEW_STMT(p, for_loop);
     s->kind = STMT_FOR;
     s->loc  = l;
     s->for_loop.var_name   = var_name;
@@ -812,7 +833,7 @@ static ASTStmt *parse_write(Parser *p)
     expect(p, TOK_RPAREN);
     skip_newlines(p);
 
-    ASTStmt *s = NEW_STMT(p);
+    ASTStmt *s = NEW_STMT(p, write);
     s->kind = STMT_WRITE;
     s->loc  = l;
     s->write.value   = value;
@@ -837,7 +858,7 @@ static ASTStmt *parse_expr_statement(Parser *p)
             advance(p);
             ASTExpr *val = parse_expression(p);
             skip_newlines(p);
-            ASTStmt *s = NEW_STMT(p);
+            ASTStmt *s = NEW_STMT(p, compound_assign);
             s->kind = STMT_COMPOUND_ASSIGN;
             s->loc  = expr->loc;
             s->compound_assign.target = expr;
@@ -855,7 +876,7 @@ static ASTStmt *parse_expr_statement(Parser *p)
 
         /* Determine target kind */
         if (expr->kind == EXPR_INDEX) {
-            ASTStmt *s = NEW_STMT(p);
+            ASTStmt *s = NEW_STMT(p, index_assign);
             s->kind = STMT_INDEX_ASSIGN;
             s->loc  = expr->loc;
             s->index_assign.array = expr->index.array;
@@ -864,7 +885,7 @@ static ASTStmt *parse_expr_statement(Parser *p)
             return s;
         }
         if (expr->kind == EXPR_FIELD_ACCESS) {
-            ASTStmt *s = NEW_STMT(p);
+            ASTStmt *s = NEW_STMT(p, field_assign);
             s->kind = STMT_FIELD_ASSIGN;
             s->loc  = expr->loc;
             s->field_assign.object = expr->field_access.object;
@@ -873,7 +894,7 @@ static ASTStmt *parse_expr_statement(Parser *p)
             return s;
         }
         if (expr->kind == EXPR_IDENT) {
-            ASTStmt *s = NEW_STMT(p);
+            ASTStmt *s = NEW_STMT(p, assign);
             s->kind = STMT_ASSIGN;
             s->loc  = expr->loc;
             s->assign.name  = expr->ident.name;
@@ -884,7 +905,7 @@ static ASTStmt *parse_expr_statement(Parser *p)
     }
 
     skip_newlines(p);
-    ASTStmt *s = NEW_STMT(p);
+    ASTStmt *s = NEW_STMT(p, expr_stmt);
     s->kind = STMT_EXPR;
     s->loc  = expr->loc;
     s->expr_stmt.expr = expr;
@@ -932,7 +953,7 @@ static ASTStmt *parse_statement(Parser *p)
         SrcLoc l = loc(p);
         advance(p);
         skip_newlines(p);
-        ASTStmt *s = NEW_STMT(p);
+        ASTStmt *s = NEW_STMT(p, loc);
         s->kind = STMT_BREAK;
         s->loc  = l;
         return s;
@@ -943,7 +964,7 @@ static ASTStmt *parse_statement(Parser *p)
         SrcLoc l = loc(p);
         advance(p);
         skip_newlines(p);
-        ASTStmt *s = NEW_STMT(p);
+        ASTStmt *s = NEW_STMT(p, loc);
         s->kind = STMT_CONTINUE;
         s->loc  = l;
         return s;
@@ -969,7 +990,7 @@ static ASTStmt *parse_statement(Parser *p)
         }
         expect(p, TOK_RPAREN);
         skip_newlines(p);
-        ASTStmt *s = NEW_STMT(p);
+        ASTStmt *s = NEW_STMT(p, syscall);
         s->kind = STMT_SYSCALL;
         s->loc  = l;
         s->syscall.args      = (ASTExpr **)args.items;
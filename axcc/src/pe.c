@@ -482,12 +482,26 @@ static RtFormats add_rt_formats(uint8_t **rdata, int *rdata_len, int *rdata_cap)
     return rf;
 }
 
+/* A RIP-relative disp32 whose target is not placed yet: either an
+ * offset in .rdata or the IAT slot of an import. */
+typedef enum { FIX_RDATA, FIX_IAT } FixKind;
+
+typedef struct {
+    int     pos;        /* offset of the disp32 within the stub buffer  */
+    int     next;       /* offset of the following instruction (= RIP) */
+    int     target;     /* .rdata offset, or IMP_* index for FIX_IAT   */
+    FixKind kind;
+} RipFixup;
+
 /* Emit bytes into a temporary buffer for stubs, to be later appended
  * into the main .text section. */
 typedef struct {
-    uint8_t *data;
-    int      len;
-    int      cap;
+    uint8_t  *data;
+    int       len;
+    int       cap;
+    RipFixup *fix;
+    int       fix_count;
+    int       fix_cap;
 } StubBuf;
 
 static void sb_init(StubBuf *sb)
@@ -495,65 +509,100 @@ static void sb_init(StubBuf *sb)
     sb->cap = 1024;
     sb->len = 0;
     sb->data = (uint8_t *)calloc(1, sb->cap);
+    sb->fix = NULL;
+    sb->fix_count = sb->fix_cap = 0;
 }
 
-static void sb_emit8(StubBuf *sb, uint8_t v)
+static void sb_grow(StubBuf *sb, int need)
 {
-    if (sb->len >= sb->cap) {
+    while (sb->len + need > sb->cap) {
         sb->cap *= 2;
         sb->data = (uint8_t *)realloc(sb->data, sb->cap);
     }
+}
+
+/* One capacity check and one memcpy per instruction, not per byte */
+static void sb_emit_bytes(StubBuf *sb, const uint8_t *b, int n)
+{
+    sb_grow(sb, n);
+    memcpy(sb->data + sb->len, b, (size_t)n);
+    sb->len += n;
+}
+
+#define SB_BYTES(sb, ...) \
+    sb_emit_bytes((sb), (const uint8_t[]){ __VA_ARGS__ }, \
+                  (int)sizeof((const uint8_t[]){ __VA_ARGS__ }))
+
+static void sb_emit8(StubBuf *sb, uint8_t v)
+{
+    sb_grow(sb, 1);
     sb->data[sb->len++] = v;
 }
 
 static void sb_emit32(StubBuf *sb, uint32_t v)
 {
-    for (int i = 0; i < 4; i++) sb_emit8(sb, (uint8_t)(v >> (i * 8)));
+    uint8_t b[4] = { (uint8_t)v, (uint8_t)(v >> 8),
+                     (uint8_t)(v >> 16), (uint8_t)(v >> 24) };
+    sb_emit_bytes(sb, b, 4);
+}
+
+static void sb_add_fixup(StubBuf *sb, int next, int target, FixKind kind)
+{
+    if (sb->fix_count >= sb->fix_cap) {
+        sb->fix_cap = sb->fix_cap ? sb->fix_cap * 2 : 32;
+        sb->fix = (RipFixup *)realloc(sb->fix, sb->fix_cap * sizeof(RipFixup));
+    }
+    sb->fix[sb->fix_count++] = (RipFixup){ sb->len, next, target, kind };
+}
+
+/* Fill in every recorded disp32 once the section RVAs are known.
+ * stub_rva = RVA of the first stub byte (text_rva + user_code_len). */
+static void sb_patch_rip(StubBuf *sb, uint32_t stub_rva, uint32_t rdata_rva,
+                         const IdataBuilder *idata)
+{
+    for (int i = 0; i < sb->fix_count; i++) {
+        const RipFixup *f = &sb->fix[i];
+        uint32_t target = (f->kind == FIX_IAT)
+                        ? idata->iat_entry_rva[f->target]
+                        : rdata_rva + (uint32_t)f->target;
+        int32_t disp = (int32_t)(target - (stub_rva + (uint32_t)f->next));
+        memcpy(&sb->data[f->pos], &disp, 4);
+    }
 }
 
-/* Emit: call [rip + disp32]  (FF 15 disp32) */
-static void sb_emit_call_iat(StubBuf *sb, uint32_t iat_rva,
-                             uint32_t text_rva, int stub_text_off)
+/* Emit: call [rip + disp32]  (FF 15 disp32) through the IAT slot of imp */
+static void sb_emit_call_iat(StubBuf *sb, int imp)
 {
-    /* The call [rip+disp32] instruction is 6 bytes.
-     * RIP at execution = text_rva + stub_text_off + sb->len + 6
-     * disp32 = iat_rva - RIP */
-    int rip = (int)(text_rva + stub_text_off + sb->len + 6);
-    int disp = (int)iat_rva - rip;
-    sb_emit8(sb, 0xFF);
-    sb_emit8(sb, 0x15); /* ModRM: mod=00 reg=010 rm=101 → [rip+d32] */
-    sb_emit32(sb, (uint32_t)disp);
+    SB_BYTES(sb, 0xFF, 0x15); /* ModRM: mod=00 reg=010 rm=101 → [rip+d32] */
+    sb_add_fixup(sb, sb->len + 4, imp, FIX_IAT);
+    sb_emit32(sb, 0);
 }
 
 /* Emit: lea reg, [rip + disp32]  to load a .rdata address */
-static void sb_emit_lea_rip(StubBuf *sb, int reg,
-                            uint32_t rdata_rva, int rdata_off,
-                            uint32_t text_rva, int stub_text_off)
+static void sb_emit_lea_rip(StubBuf *sb, int reg, int rdata_off)
 {
-    /* lea r64, [rip+disp32]: REX.W + 8D modrm(00, reg, 101) disp32
-     * Instruction is 7 bytes. RIP = text_rva + stub_text_off + sb->len + 7 */
-    int rip = (int)(text_rva + stub_text_off + sb->len + 7);
-    int disp = (int)(rdata_rva + rdata_off) - rip;
-    sb_emit8(sb, (uint8_t)(0x48 | ((reg >= 8) ? 0x04 : 0)));  /* REX.W + R */
-    sb_emit8(sb, 0x8D);
-    sb_emit8(sb, (uint8_t)(0x05 | ((reg & 7) << 3)));  /* modrm(00, reg, 5) */
-    sb_emit32(sb, (uint32_t)disp);
+    /* lea r64, [rip+disp32]: REX.W + 8D modrm(00, reg, 101) disp32 */
+    SB_BYTES(sb, (uint8_t)(0x48 | ((reg >= 8) ? 0x04 : 0)),  /* REX.W + R */
+                 0x8D,
+                 (uint8_t)(0x05 | ((reg & 7) << 3)));       /* modrm(00, reg, 5) */
+    sb_add_fixup(sb, sb->len + 4, rdata_off, FIX_RDATA);
+    sb_emit32(sb, 0);
 }
 
 /* Emit: mov rdx, rcx (pass value as 2nd arg, push format to 1st) */
 static void sb_emit_mov_rdx_rcx(StubBuf *sb)
 {
-    sb_emit8(sb, 0x48); sb_emit8(sb, 0x89); sb_emit8(sb, 0xCA); /* mov rdx, rcx */
+    SB_BYTES(sb, 0x48, 0x89, 0xCA); /* mov rdx, rcx */
 }
 
 /* sub rsp, 40 ; add rsp, 40 */
 static void sb_emit_sub_rsp_40(StubBuf *sb)
 {
-    sb_emit8(sb, 0x48); sb_emit8(sb, 0x83); sb_emit8(sb, 0xEC); sb_emit8(sb, 0x28);
+    SB_BYTES(sb, 0x48, 0x83, 0xEC, 0x28);
 }
 static void sb_emit_add_rsp_40(StubBuf *sb)
 {
-    sb_emit8(sb, 0x48); sb_emit8(sb, 0x83); sb_emit8(sb, 0xC4); sb_emit8(sb, 0x28);
+    SB_BYTES(sb, 0x48, 0x83, 0xC4, 0x28);
 }
 
 static void sb_emit_ret(StubBuf *sb)
@@ -564,216 +613,227 @@ static void sb_emit_ret(StubBuf *sb)
 /* xor eax, eax */
 static void sb_emit_xor_eax_eax(StubBuf *sb)
 {
-    sb_emit8(sb, 0x31); sb_emit8(sb, 0xC0);
+    SB_BYTES(sb, 0x31, 0xC0);
 }
 
-/*
- * Generate all runtime stubs.  Returns stub info (name + text offset)
- * for each stub so we can patch call relocations in the user code.
- *
- * Stubs are emitted into sb; their text_offset is relative to the
- * start of the generated code's .text section (user_code_len is the
- * byte offset where stubs begin in .text).
- */
-typedef struct {
-    int write_i64_off;
-    int write_str_off;
-    int write_bool_off;
-    int write_char_off;
-    int write_nl_off;
-    int read_i64_off;
-    int read_line_off;
-    int read_char_off;
-    int memcpy_off;
-    int read_failed_off;
-    int div_zero_off;
-} StubOffsets;
-
-static StubOffsets gen_stubs(StubBuf *sb,
-                             const IdataBuilder *idata,
-                             const RtFormats *rf,
-                             uint32_t text_rva,
-                             uint32_t rdata_rva,
-                             int user_code_len)
+/* ── __axis_write_i64: printf("%lld", val) ──────────── */
+static void stub_write_i64(StubBuf *sb, const RtFormats *rf)
 {
-    StubOffsets so;
-    sb_init(sb);
-
-    int base = user_code_len; /* stubs start after user code in .text */
-
-    /* ── __axis_write_i64: printf("%lld", val) ──────────── */
-    so.write_i64_off = base + sb->len;
     sb_emit_mov_rdx_rcx(sb);   /* value → rdx (arg2) */
-    sb_emit_lea_rip(sb, RCX, rdata_rva, rf->fmt_lld,
-                    text_rva, base);   /* fmt → rcx (arg1) */
+    sb_emit_lea_rip(sb, RCX, rf->fmt_lld);   /* fmt → rcx (arg1) */
     sb_emit_sub_rsp_40(sb);
-    sb_emit_call_iat(sb, idata->iat_entry_rva[IMP_PRINTF],
-                     text_rva, base);
+    sb_emit_call_iat(sb, IMP_PRINTF);
     sb_emit_add_rsp_40(sb);
     sb_emit_ret(sb);
+}
 
-    /* ── __axis_write_str: printf("%s", str) ────────────── */
-    so.write_str_off = base + sb->len;
+/* ── __axis_write_str: printf("%s", str) ────────────── */
+static void stub_write_str(StubBuf *sb, const RtFormats *rf)
+{
     sb_emit_mov_rdx_rcx(sb);
-    sb_emit_lea_rip(sb, RCX, rdata_rva, rf->fmt_s,
-                    text_rva, base);
+    sb_emit_lea_rip(sb, RCX, rf->fmt_s);
     sb_emit_sub_rsp_40(sb);
-    sb_emit_call_iat(sb, idata->iat_entry_rva[IMP_PRINTF],
-                     text_rva, base);
+    sb_emit_call_iat(sb, IMP_PRINTF);
     sb_emit_add_rsp_40(sb);
     sb_emit_ret(sb);
+}
 
-    /* ── __axis_write_bool: print "true"/"false" ────────── */
-    so.write_bool_off = base + sb->len;
+/* ── __axis_write_bool: print "true"/"false" ────────── */
+static void stub_write_bool(StubBuf *sb, const RtFormats *rf)
+{
     /* test ecx, ecx → jz print_false */
-    sb_emit8(sb, 0x85); sb_emit8(sb, 0xC9); /* test ecx, ecx */
+    SB_BYTES(sb, 0x85, 0xC9);               /* test ecx, ecx */
     sb_emit8(sb, 0x74);                       /* jz +N (short) */
     /* We need to skip the "true" path. Calculate relative. */
     int jz_patch = sb->len;
     sb_emit8(sb, 0);                          /* placeholder offset */
     /* true path */
-    sb_emit_lea_rip(sb, RCX, rdata_rva, rf->fmt_true,
-                    text_rva, base);
+    sb_emit_lea_rip(sb, RCX, rf->fmt_true);
     sb_emit8(sb, 0xEB);                       /* jmp short +N */
     int jmp_patch = sb->len;
     sb_emit8(sb, 0);
     /* false path */
     int false_off = sb->len;
     sb->data[jz_patch] = (uint8_t)(false_off - (jz_patch + 1));
-    sb_emit_lea_rip(sb, RCX, rdata_rva, rf->fmt_false,
-                    text_rva, base);
+    sb_emit_lea_rip(sb, RCX, rf->fmt_false);
     int after_false = sb->len;
     sb->data[jmp_patch] = (uint8_t)(after_false - (jmp_patch + 1));
     /* Common: call printf */
     sb_emit_sub_rsp_40(sb);
-    sb_emit_call_iat(sb, idata->iat_entry_rva[IMP_PRINTF],
-                     text_rva, base);
+    sb_emit_call_iat(sb, IMP_PRINTF);
     sb_emit_add_rsp_40(sb);
     sb_emit_ret(sb);
+}
 
-    /* ── __axis_write_char: putchar(val) ────────────────── */
-    so.write_char_off = base + sb->len;
+/* ── __axis_write_char: putchar(val) ────────────────── */
+static void stub_write_char(StubBuf *sb, const RtFormats *rf)
+{
+    (void)rf;
     /* RCX already has the char value */
     sb_emit_sub_rsp_40(sb);
-    sb_emit_call_iat(sb, idata->iat_entry_rva[IMP_PUTCHAR],
-                     text_rva, base);
+    sb_emit_call_iat(sb, IMP_PUTCHAR);
     sb_emit_add_rsp_40(sb);
     sb_emit_ret(sb);
+}
 
-    /* ── __axis_write_nl: putchar('\n') ─────────────────── */
-    so.write_nl_off = base + sb->len;
+/* ── __axis_write_nl: putchar('\n') ─────────────────── */
+static void stub_write_nl(StubBuf *sb, const RtFormats *rf)
+{
+    (void)rf;
     /* mov ecx, 10 ('\n') */
     sb_emit8(sb, 0xB9); sb_emit32(sb, 10);
     sb_emit_sub_rsp_40(sb);
-    sb_emit_call_iat(sb, idata->iat_entry_rva[IMP_PUTCHAR],
-                     text_rva, base);
+    sb_emit_call_iat(sb, IMP_PUTCHAR);
     sb_emit_add_rsp_40(sb);
     sb_emit_ret(sb);
+}
 
-    /* ── __axis_read_i64: scanf("%lld", &buf) → return buf ── */
-    so.read_i64_off = base + sb->len;
-    sb_emit_lea_rip(sb, RDX, rdata_rva, rf->fmt_buf,
-                    text_rva, base);  /* &buf → rdx */
-    sb_emit_lea_rip(sb, RCX, rdata_rva, rf->fmt_lld_in,
-                    text_rva, base);  /* fmt → rcx */
+/* ── __axis_read_i64: scanf("%lld", &buf) → return buf ── */
+static void stub_read_i64(StubBuf *sb, const RtFormats *rf)
+{
+    sb_emit_lea_rip(sb, RDX, rf->fmt_buf);  /* &buf → rdx */
+    sb_emit_lea_rip(sb, RCX, rf->fmt_lld_in);  /* fmt → rcx */
     sb_emit_sub_rsp_40(sb);
-    sb_emit_call_iat(sb, idata->iat_entry_rva[IMP_SCANF],
-                     text_rva, base);
+    sb_emit_call_iat(sb, IMP_SCANF);
     sb_emit_add_rsp_40(sb);
     /* eax = scanf return (1=success). Set read_failed flag. */
-    sb_emit8(sb, 0x83); sb_emit8(sb, 0xF8); sb_emit8(sb, 0x01); /* cmp eax, 1 */
-    sb_emit8(sb, 0x0F); sb_emit8(sb, 0x95); sb_emit8(sb, 0xC1); /* setne cl */
-    sb_emit_lea_rip(sb, R11, rdata_rva, rf->read_failed_flag,
-                    text_rva, base);  /* lea r11, [rip+flag] */
-    sb_emit8(sb, 0x41); sb_emit8(sb, 0x88); sb_emit8(sb, 0x0B); /* mov byte [r11], cl */
+    SB_BYTES(sb, 0x83, 0xF8, 0x01);                             /* cmp eax, 1 */
+    SB_BYTES(sb, 0x0F, 0x95, 0xC1);                             /* setne cl */
+    sb_emit_lea_rip(sb, R11, rf->read_failed_flag);  /* lea r11, [rip+flag] */
+    SB_BYTES(sb, 0x41, 0x88, 0x0B);                             /* mov byte [r11], cl */
     /* Load result: mov rax, [buf_addr] */
-    sb_emit_lea_rip(sb, RAX, rdata_rva, rf->fmt_buf,
-                    text_rva, base);
+    sb_emit_lea_rip(sb, RAX, rf->fmt_buf);
     /* mov rax, [rax] */
-    sb_emit8(sb, 0x48); sb_emit8(sb, 0x8B); sb_emit8(sb, 0x00);
+    SB_BYTES(sb, 0x48, 0x8B, 0x00);
     sb_emit_ret(sb);
+}
 
-    /* ── __axis_read_line: fgets-like → return ptr to buffer ── */
-    so.read_line_off = base + sb->len;
+/* ── __axis_read_line: fgets-like → return ptr to buffer ── */
+static void stub_read_line(StubBuf *sb, const RtFormats *rf)
+{
     /* Simple: read chars with getchar until newline, store in buf */
     /* For now: return pointer to static buffer (filled by scanf) */
-    sb_emit_lea_rip(sb, RDX, rdata_rva, rf->fmt_buf,
-                    text_rva, base);
+    sb_emit_lea_rip(sb, RDX, rf->fmt_buf);
     /* Use scanf("%255s", buf) – simplified */
-    sb_emit_lea_rip(sb, RCX, rdata_rva, rf->fmt_s,
-                    text_rva, base);
+    sb_emit_lea_rip(sb, RCX, rf->fmt_s);
     sb_emit_sub_rsp_40(sb);
-    sb_emit_call_iat(sb, idata->iat_entry_rva[IMP_SCANF],
-                     text_rva, base);
+    sb_emit_call_iat(sb, IMP_SCANF);
     sb_emit_add_rsp_40(sb);
     /* eax = scanf return (1=success). Set read_failed flag. */
-    sb_emit8(sb, 0x83); sb_emit8(sb, 0xF8); sb_emit8(sb, 0x01); /* cmp eax, 1 */
-    sb_emit8(sb, 0x0F); sb_emit8(sb, 0x95); sb_emit8(sb, 0xC1); /* setne cl */
-    sb_emit_lea_rip(sb, R11, rdata_rva, rf->read_failed_flag,
-                    text_rva, base);
-    sb_emit8(sb, 0x41); sb_emit8(sb, 0x88); sb_emit8(sb, 0x0B); /* mov byte [r11], cl */
-    sb_emit_lea_rip(sb, RAX, rdata_rva, rf->fmt_buf,
-                    text_rva, base);
+    SB_BYTES(sb, 0x83, 0xF8, 0x01);                             /* cmp eax, 1 */
+    SB_BYTES(sb, 0x0F, 0x95, 0xC1);                             /* setne cl */
+    sb_emit_lea_rip(sb, R11, rf->read_failed_flag);
+    SB_BYTES(sb, 0x41, 0x88, 0x0B);                             /* mov byte [r11], cl */
+    sb_emit_lea_rip(sb, RAX, rf->fmt_buf);
     sb_emit_ret(sb);
+}
 
-    /* ── __axis_read_char: getchar() ────────────────────── */
-    so.read_char_off = base + sb->len;
+/* ── __axis_read_char: getchar() ────────────────────── */
+static void stub_read_char(StubBuf *sb, const RtFormats *rf)
+{
     sb_emit_sub_rsp_40(sb);
-    sb_emit_call_iat(sb, idata->iat_entry_rva[IMP_GETCHAR],
-                     text_rva, base);
+    sb_emit_call_iat(sb, IMP_GETCHAR);
     sb_emit_add_rsp_40(sb);
     /* eax = getchar return (-1 = EOF). Set read_failed flag. */
-    sb_emit8(sb, 0x83); sb_emit8(sb, 0xF8); sb_emit8(sb, 0xFF); /* cmp eax, -1 */
-    sb_emit8(sb, 0x0F); sb_emit8(sb, 0x94); sb_emit8(sb, 0xC1); /* sete cl */
-    sb_emit_lea_rip(sb, R11, rdata_rva, rf->read_failed_flag,
-                    text_rva, base);
-    sb_emit8(sb, 0x41); sb_emit8(sb, 0x88); sb_emit8(sb, 0x0B); /* mov byte [r11], cl */
+    SB_BYTES(sb, 0x83, 0xF8, 0xFF);                             /* cmp eax, -1 */
+    SB_BYTES(sb, 0x0F, 0x94, 0xC1);                             /* sete cl */
+    sb_emit_lea_rip(sb, R11, rf->read_failed_flag);
+    SB_BYTES(sb, 0x41, 0x88, 0x0B);                             /* mov byte [r11], cl */
     /* Result already in eax, zero-extend to rax */
-    sb_emit8(sb, 0x48); sb_emit8(sb, 0x0F); sb_emit8(sb, 0xB7);
+    SB_BYTES(sb, 0x48, 0x0F, 0xB7);
     sb_emit8(sb, 0xC0); /* movzx rax, ax */
     sb_emit_ret(sb);
+}
 
-    /* ── __axis_read_failed: return the flag byte ──────── */
-    so.read_failed_off = base + sb->len;
-    sb_emit_lea_rip(sb, RAX, rdata_rva, rf->read_failed_flag,
-                    text_rva, base);
-    sb_emit8(sb, 0x0F); sb_emit8(sb, 0xB6); sb_emit8(sb, 0x00); /* movzx eax, byte [rax] */
+/* ── __axis_read_failed: return the flag byte ──────── */
+static void stub_read_failed(StubBuf *sb, const RtFormats *rf)
+{
+    sb_emit_lea_rip(sb, RAX, rf->read_failed_flag);
+    SB_BYTES(sb, 0x0F, 0xB6, 0x00);                             /* movzx eax, byte [rax] */
     sb_emit_ret(sb);
+}
 
-    /* ── __axis_memcpy: trivial byte copy ───────────────── */
-    so.memcpy_off = base + sb->len;
+/* ── __axis_memcpy: trivial byte copy ───────────────── */
+static void stub_memcpy(StubBuf *sb, const RtFormats *rf)
+{
+    (void)rf;
     /* rcx=dst, rdx=src, r8=count; use rep movsb */
     /* Push rdi, rsi */
     sb_emit8(sb, 0x57);  /* push rdi */
     sb_emit8(sb, 0x56);  /* push rsi */
     /* mov rdi, rcx; mov rsi, rdx; mov rcx, r8 */
-    sb_emit8(sb, 0x48); sb_emit8(sb, 0x89); sb_emit8(sb, 0xCF); /* mov rdi, rcx */
-    sb_emit8(sb, 0x48); sb_emit8(sb, 0x89); sb_emit8(sb, 0xD6); /* mov rsi, rdx */
-    sb_emit8(sb, 0x4C); sb_emit8(sb, 0x89); sb_emit8(sb, 0xC1); /* mov rcx, r8 */
+    SB_BYTES(sb, 0x48, 0x89, 0xCF);                             /* mov rdi, rcx */
+    SB_BYTES(sb, 0x48, 0x89, 0xD6);                             /* mov rsi, rdx */
+    SB_BYTES(sb, 0x4C, 0x89, 0xC1);                             /* mov rcx, r8 */
     /* rep movsb */
-    sb_emit8(sb, 0xF3); sb_emit8(sb, 0xA4);
+    SB_BYTES(sb, 0xF3, 0xA4);
     /* Pop rsi, rdi */
     sb_emit8(sb, 0x5E);  /* pop rsi */
     sb_emit8(sb, 0x5F);  /* pop rdi */
     sb_emit_ret(sb);
+}
 
-    /* ── __axis_div_zero: print error message and exit(1) ──── */
-    so.div_zero_off = base + sb->len;
-    sb_emit_lea_rip(sb, RCX, rdata_rva, rf->fmt_div_zero,
-                    text_rva, base);   /* error msg → rcx (arg1) */
+/* ── __axis_div_zero: print error message and exit(1) ──── */
+static void stub_div_zero(StubBuf *sb, const RtFormats *rf)
+{
+    sb_emit_lea_rip(sb, RCX, rf->fmt_div_zero);   /* error msg → rcx (arg1) */
     sb_emit_sub_rsp_40(sb);
-    sb_emit_call_iat(sb, idata->iat_entry_rva[IMP_PRINTF],
-                     text_rva, base);
+    sb_emit_call_iat(sb, IMP_PRINTF);
     sb_emit_add_rsp_40(sb);
-    sb_emit8(sb, 0xB9); sb_emit8(sb, 0x01); sb_emit8(sb, 0x00);
-    sb_emit8(sb, 0x00); sb_emit8(sb, 0x00); /* mov ecx, 1 */
+    SB_BYTES(sb, 0xB9, 0x01, 0x00);
+    SB_BYTES(sb, 0x00, 0x00);               /* mov ecx, 1 */
     sb_emit_sub_rsp_40(sb);
-    sb_emit_call_iat(sb, idata->iat_entry_rva[IMP_EXIT],
-                     text_rva, base);
+    sb_emit_call_iat(sb, IMP_EXIT);
 
     /* ── entry point stub: call __axis_top_level, then exit(0) ── */
     /* This is NOT in StubOffsets; we handle it separately. */
+}
+
+/* Stub generators in emission order, indexed by runtime helper id */
+typedef void (*StubGen)(StubBuf *sb, const RtFormats *rf);
+
+static const StubGen stub_gens[RTSYM_COUNT] = {
+    [RTSYM_WRITE_I64]       = stub_write_i64,
+    [RTSYM_WRITE_STR]       = stub_write_str,
+    [RTSYM_WRITE_BOOL]      = stub_write_bool,
+    [RTSYM_WRITE_CHAR]      = stub_write_char,
+    [RTSYM_WRITE_NL]        = stub_write_nl,
+    [RTSYM_READ_I64]        = stub_read_i64,
+    [RTSYM_READ_LINE]       = stub_read_line,
+    [RTSYM_READ_CHAR]       = stub_read_char,
+    [RTSYM_READ_FAILED]     = stub_read_failed,
+    [RTSYM_MEMCPY]          = stub_memcpy,
+    [RTSYM_DIV_ZERO]        = stub_div_zero,
+};
+
+/*
+ * Generate the runtime stubs the program calls.  Returns the text
+ * offset of each stub, indexed by runtime helper id, so we can patch
+ * call relocations in the user code; helpers nothing calls are left
+ * out and get offset -1.
+ *
+ * Stubs are emitted into sb; their text_offset is relative to the
+ * start of the generated code's .text section (user_code_len is the
+ * byte offset where stubs begin in .text).
+ */
+typedef struct {
+    int off[RTSYM_COUNT];
+} StubOffsets;
+
+static StubOffsets gen_stubs(StubBuf *sb,
+                             const RtFormats *rf,
+                             const bool *used,
+                             int user_code_len)
+{
+    StubOffsets so;
+    sb_init(sb);
 
+    for (int id = 0; id < RTSYM_COUNT; id++) {
+        so.off[id] = -1;
+        if (!stub_gens[id] || !used[id]) continue;
+        so.off[id] = user_code_len + sb->len;  /* stubs follow user code */
+        stub_gens[id](sb, rf);
+    }
     return so;
 }
 
@@ -793,19 +853,8 @@ static void patch_runtime_relocs(X64Ctx *x64_mut, const StubOffsets *so)
         Reloc *r = &x64_mut->relocs[i];
         if (r->kind != RELOC_REL32 || r->target_sym == NULL) continue;
 
-        int target = -1;
-        if (strcmp(r->target_sym, "__axis_write_i64") == 0)  target = so->write_i64_off;
-        else if (strcmp(r->target_sym, "__axis_write_str") == 0)  target = so->write_str_off;
-        else if (strcmp(r->target_sym, "__axis_write_bool") == 0) target = so->write_bool_off;
-        else if (strcmp(r->target_sym, "__axis_write_char") == 0) target = so->write_char_off;
-        else if (strcmp(r->target_sym, "__axis_write_nl") == 0)   target = so->write_nl_off;
-        else if (strcmp(r->target_sym, "__axis_read_i64") == 0)   target = so->read_i64_off;
-        else if (strcmp(r->target_sym, "__axis_read_line") == 0)  target = so->read_line_off;
-        else if (strcmp(r->target_sym, "__axis_read_char") == 0)  target = so->read_char_off;
-        else if (strcmp(r->target_sym, "__axis_read_failed") == 0) target = so->read_failed_off;
-        else if (strcmp(r->target_sym, "__axis_memcpy") == 0)     target = so->memcpy_off;
-        else if (strcmp(r->target_sym, "__axis_div_zero") == 0)    target = so->div_zero_off;
-        else continue; /* user function – should already be resolved */
+        if (r->rt == RTSYM_NONE) continue;  /* user function – already resolved */
+        int target = so->off[r->rt];
 
         int from = r->offset + 4;
         int rel = target - from + r->addend;
@@ -844,9 +893,7 @@ static void patch_string_relocs(X64Ctx *x64_mut,
  * Generate entry point stub: call __top_level then exit(0)
  * ═════════════════════════════════════════════════════════════ */
 
-static int gen_entry_stub(StubBuf *sb, const X64Ctx *x64,
-                          const IdataBuilder *idata,
-                          uint32_t text_rva)
+static int gen_entry_stub(StubBuf *sb, const X64Ctx *x64)
 {
     /* Find entry function offset: prefer __top_level, then main, then _start,
      * finally fall back to the last function. */
@@ -899,13 +946,12 @@ static int gen_entry_stub(StubBuf *sb, const X64Ctx *x64,
      * otherwise (script mode) exit with 0. */
     if (entry_name && strcmp(entry_name, "main") == 0) {
         /* mov ecx, eax — main's return value becomes exit code */
-        sb_emit8(sb, 0x89); sb_emit8(sb, 0xC1);
+        SB_BYTES(sb, 0x89, 0xC1);
     } else {
         /* xor ecx, ecx — exit(0) */
-        sb_emit8(sb, 0x31); sb_emit8(sb, 0xC9);
+        SB_BYTES(sb, 0x31, 0xC9);
     }
-    sb_emit_call_iat(sb, idata->iat_entry_rva[IMP_EXIT],
-                     text_rva, x64->code.len);
+    sb_emit_call_iat(sb, IMP_EXIT);
     sb_emit8(sb, 0xCC);                            /* int3 */
 
     return entry_stub_off;
@@ -962,29 +1008,22 @@ int pe_write(PECtx *ctx, const X64Ctx *x64)
     ctx->text_rva  = PE_SECTION_ALIGNMENT;
     ctx->text_raw  = (uint32_t)headers_size;
 
-    /* ── Two-pass stub generation ─────────────────────
+    /* ── Stub generation ───────────────────────────────
      *
      * Stubs contain RIP-relative addresses to .rdata (format strings)
-     * and .idata (IAT entries).  Computing those RVAs requires knowing
-     * the total .text size, which in turn includes the stubs.
-     *
-     * Pass 1: generate stubs with dummy RVAs purely to measure their
-     *         total byte count (which is RVA-independent).
-     * Pass 2: compute the real section layout, rebuild idata, and
-     *         regenerate stubs with the correct RVAs.
+     * and .idata (IAT entries).  Those RVAs depend on the total .text
+     * size, which includes the stubs, but instruction lengths do not
+     * depend on the RVAs.  So the stubs are generated once with their
+     * disp32 fields recorded as fixups, the sections are laid out from
+     * the final size, and sb_patch_rip fills the fixups in.
      * ──────────────────────────────────────────────── */
 
-    /* --- Pass 1: measure stub size --- */
-    StubBuf sb_measure;
-    IdataBuilder idata_measure;
-    build_idata(&idata_measure, /* dummy idata_rva */ 0x10000);
-    gen_stubs(&sb_measure, &idata_measure, &rf,
-              ctx->text_rva, /* dummy rdata_rva */ 0x10000,
-              x64->code.len);
-    gen_entry_stub(&sb_measure, x64, &idata_measure, ctx->text_rva);
-    int total_text_len = x64->code.len + sb_measure.len;
-
-    /* --- Compute real section layout using actual text size --- */
+    StubBuf sb;
+    StubOffsets so = gen_stubs(&sb, &rf, x64->rt_used, x64->code.len);
+    int entry_stub_off = gen_entry_stub(&sb, x64);
+    int total_text_len = x64->code.len + sb.len;
+
+    /* --- Section layout from the actual text size --- */
     uint32_t text_raw_size = align_up((uint32_t)total_text_len, PE_FILE_ALIGNMENT);
 
     ctx->rdata_rva = align_up(ctx->text_rva + (uint32_t)total_text_len,
@@ -997,20 +1036,15 @@ int pe_write(PECtx *ctx, const X64Ctx *x64)
                               PE_SECTION_ALIGNMENT);
     ctx->idata_raw = ctx->rdata_raw + rdata_raw_size;
 
-    /* --- Pass 2: generate stubs with correct RVAs --- */
     IdataBuilder idata;
     build_idata(&idata, ctx->idata_rva);
     ctx->idata_size = (uint32_t)idata.len;
     ctx->iat_rva = ctx->idata_rva + (uint32_t)idata.iat_off;
     uint32_t idata_raw_size = align_up((uint32_t)idata.len, PE_FILE_ALIGNMENT);
 
-    StubBuf sb;
-    StubOffsets so = gen_stubs(&sb, &idata, &rf,
-                               ctx->text_rva, ctx->rdata_rva,
-                               x64->code.len);
-    int entry_stub_off = gen_entry_stub(&sb, x64, &idata, ctx->text_rva);
+    sb_patch_rip(&sb, ctx->text_rva + (uint32_t)x64->code.len,
+                 ctx->rdata_rva, &idata);
 
-    total_text_len = x64->code.len + sb.len;
     ctx->text_size = (uint32_t)total_text_len;
     ctx->entry_rva = ctx->text_rva + (uint32_t)entry_stub_off;
 
@@ -1133,6 +1167,7 @@ int pe_write(PECtx *ctx, const X64Ctx *x64)
     free(x64_mut.strings);
     free(rdata_buf);
     free(sb.data);
+    free(sb.fix);
     free(idata.data);
 
     return 0;
@@ -1140,11 +1175,29 @@ int pe_write(PECtx *ctx, const X64Ctx *x64)
 
 int pe_save(const PECtx *ctx, const char *path)
 {
-    FILE *f = fopen(path, "wb");
+    /* Same temp-and-rename scheme as elf_save: the script cache's
+     * source-key trailer is appended only after a complete save */
+    char tmp[1024];
+    if (snprintf(tmp, sizeof(tmp), "%s.tmp", path) >= (int)sizeof(tmp))
+        return -1;
+
+    FILE *f = fopen(tmp, "wb");
     if (!f) return -1;
     size_t written = fwrite(ctx->buf, 1, ctx->len, f);
-    fclose(f);
-    return (written == (size_t)ctx->len) ? 0 : -1;
+    int close_rc = fclose(f);
+    if (written != (size_t)ctx->len || close_rc != 0) {
+        remove(tmp);
+        return -1;
+    }
+
+#ifdef _WIN32
+    remove(path);   /* rename() does not replace on Windows */
+#endif
+    if (rename(tmp, path) != 0) {
+        remove(tmp);
+        return -1;
+    }
+    return 0;
 }
 
 void pe_free(PECtx *ctx)
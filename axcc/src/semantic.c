@@ -31,13 +31,21 @@ static int         calc_field_size(Semantic *s, ASTFieldDef *fd);
 static void sem_error(Semantic *s, SrcLoc loc,
                       const char *fmt, ...)
 {
-    fprintf(stderr, "%s:%d:%d: semantic error: ",
-            s->filename ? s->filename : "<unknown>", loc.line, loc.col);
+    /* One buffer, one fputs – see parse_error */
+    char msg[512];
+    size_t cap = sizeof(msg) - 1;           /* keep room for '\n' */
+    int n = snprintf(msg, cap, "%s:%d:%d: semantic error: ",
+                     s->filename ? s->filename : "<unknown>", loc.line, loc.col);
+    if (n < 0) n = 0;
+    if ((size_t)n >= cap) n = (int)cap - 1;
     va_list ap;
     va_start(ap, fmt);
-    vfprintf(stderr, fmt, ap);
+    vsnprintf(msg + n, cap - (size_t)n, fmt, ap);
     va_end(ap);
-    fputc('\n', stderr);
+    size_t len = strlen(msg);
+    msg[len] = '\n';
+    msg[len + 1] = '\0';
+    fputs(msg, stderr);
     s->error_count++;
     if (s->check_mode) {
         longjmp(s->err_jmp, 1);
@@ -49,42 +57,27 @@ static void sem_error(Semantic *s, SrcLoc loc,
  * Type helpers
  * ═════════════════════════════════════════════════════════════ */
 
-static const struct { const char *name; int size; } type_size_tab[] = {
-    {"i8",  1}, {"i16", 2}, {"i32", 4}, {"i64",  8},
-    {"u8",  1}, {"u16", 2}, {"u32", 4}, {"u64",  8},
-    {"bool", 1},
-    {"str",  8},
-};
-
 static bool is_integer_type(const char *t)
 {
-    if (!t) return false;
-    return strcmp(t,"i8")==0  || strcmp(t,"i16")==0 ||
-           strcmp(t,"i32")==0 || strcmp(t,"i64")==0 ||
-           strcmp(t,"u8")==0  || strcmp(t,"u16")==0 ||
-           strcmp(t,"u32")==0 || strcmp(t,"u64")==0;
+    return axis_type_is_integer(axis_type_kind(t));
 }
 
 static bool is_signed_type(const char *t)
 {
-    if (!t) return false;
-    return strcmp(t,"i8")==0 || strcmp(t,"i16")==0 ||
-           strcmp(t,"i32")==0 || strcmp(t,"i64")==0;
+    return axis_type_is_signed(axis_type_kind(t));
 }
 
 static bool is_scalar_type(const char *t)
 {
-    return is_integer_type(t) ||
-           (t && (strcmp(t,"bool")==0 || strcmp(t,"str")==0));
+    AxisTypeKind k = axis_type_kind(t);
+    return axis_type_is_integer(k) || k == TYPE_BOOL || k == TYPE_STR;
 }
 
+/* Field, enum and unknown names default to 8 bytes */
 static int get_type_size(const char *t)
 {
-    if (!t) return 8;
-    for (size_t i = 0; i < AXIS_ARRAY_LEN(type_size_tab); i++)
-        if (strcmp(type_size_tab[i].name, t) == 0)
-            return type_size_tab[i].size;
-    return 8;
+    int size = axis_type_size(axis_type_kind(t));
+    return size ? size : 8;
 }
 
 static int align_up(int offset, int alignment)
@@ -137,7 +130,7 @@ static void exit_scope(Semantic *s)
 static void scope_define(Semantic *s, Symbol *sym, SrcLoc loc)
 {
     for (Symbol *p = s->current_scope->symbols; p; p = p->next) {
-        if (strcmp(p->name, sym->name) == 0)
+        if (axis_name_eq(p->name, sym->name))
             sem_error(s, loc, "Symbol '%s' already defined in this scope",
                       sym->name);
     }
@@ -149,7 +142,7 @@ static Symbol *scope_lookup(Scope *sc, const char *name)
 {
     for (; sc; sc = sc->parent)
         for (Symbol *sym = sc->symbols; sym; sym = sym->next)
-            if (strcmp(sym->name, name) == 0) {
+            if (axis_name_eq(sym->name, name)) {
                 sym->used = true;
                 return sym;
             }
@@ -163,7 +156,7 @@ static Symbol *scope_lookup(Scope *sc, const char *name)
 static ASTFieldDef *find_field_def(Semantic *s, const char *name)
 {
     for (int i = 0; i < s->field_count; i++)
-        if (strcmp(s->field_defs[i].name, name) == 0)
+        if (axis_name_eq(s->field_defs[i].name, name))
             return &s->field_defs[i];
     return NULL;
 }
@@ -171,7 +164,7 @@ static ASTFieldDef *find_field_def(Semantic *s, const char *name)
 static ASTEnumDef *find_enum_def(Semantic *s, const char *name)
 {
     for (int i = 0; i < s->enum_count; i++)
-        if (strcmp(s->enum_defs[i].name, name) == 0)
+        if (axis_name_eq(s->enum_defs[i].name, name))
             return &s->enum_defs[i];
     return NULL;
 }
@@ -179,7 +172,7 @@ static ASTEnumDef *find_enum_def(Semantic *s, const char *name)
 static FuncSig *find_func_sig(Semantic *s, const char *name)
 {
     for (FuncSig *f = s->func_sigs; f; f = f->next)
-        if (strcmp(f->name, name) == 0) return f;
+        if (axis_name_eq(f->name, name)) return f;
     return NULL;
 }
 
@@ -396,11 +389,11 @@ static const char *analyze_identifier(Semantic *s, ASTExpr *e)
 
 /* ── Binary op ──────────────────────────────────────────── */
 
-static const char *analyze_binop(Semantic *s, ASTExpr *e)
+/* Type one binary op whose operands have already been analyzed */
+static const char *binop_result(Semantic *s, ASTExpr *e,
+                                const char *lt, const char *rt)
 {
-    const char *lt = analyze_expr(s, e->binary.left);
-    const char *rt = analyze_expr(s, e->binary.right);
-    TokenType   op = e->binary.op;
+    TokenType op = e->binary.op;
 
     /* Literal coercion when types differ */
     if (strcmp(lt, rt) != 0) {
@@ -453,6 +446,34 @@ static const char *analyze_binop(Semantic *s, ASTExpr *e)
     return NULL; /* unreachable */
 }
 
+/* A left-leaning chain such as a + b + c + d is analyzed from an
+ * explicit stack of its nodes, bottom-up, instead of recursing once
+ * per operator, so long chains do not exhaust the C stack. */
+static const char *analyze_binop(Semantic *s, ASTExpr *e)
+{
+    int depth = 1;
+    for (ASTExpr *n = e->binary.left; n->kind == EXPR_BINARY;
+         n = n->binary.left)
+        depth++;
+
+    ASTExpr *single = e;
+    ASTExpr **spine = (depth == 1)
+        ? &single
+        : arena_alloc(s->arena, (size_t)depth * sizeof(ASTExpr*));
+    ASTExpr *n = e;
+    for (int i = depth - 1; i >= 0; i--) {
+        spine[i] = n;
+        n = n->binary.left;
+    }
+
+    const char *lt = analyze_expr(s, spine[0]->binary.left);
+    for (int i = 0; i < depth; i++) {
+        const char *rt = analyze_expr(s, spine[i]->binary.right);
+        lt = binop_result(s, spine[i], lt, rt);
+    }
+    return lt;
+}
+
 /* ── Unary op ───────────────────────────────────────────── */
 
 static const char *analyze_unary(Semantic *s, ASTExpr *e)
@@ -630,7 +651,9 @@ static const char *analyze_field_access(Semantic *s, ASTExpr *e)
 {
     /* Check if this is enum-style dot access (EnumName.Variant).
        If so, convert the AST node from FIELD_ACCESS to ENUM_ACCESS
-       so that the IR generator handles it correctly. */
+       so that the IR generator handles it correctly.  The parser
+       sized the node for field_access; a _Static_assert there keeps
+       enum_access no larger. */
     if (e->field_access.object->kind == EXPR_IDENT) {
         ASTEnumDef *ed = find_enum_def(s, e->field_access.object->ident.name);
         if (ed) {
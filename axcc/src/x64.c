@@ -9,6 +9,8 @@
  *   • R8, R9 are reserved for function call arguments.
  *   • Allocatable: RBX, RSI, RDI, R10, R11, R12–R15.
  *   • Calling convention: Windows x64 (rcx, rdx, r8, r9 + shadow space).
+ *   • Label jumps are emitted as rel32 and shortened to rel8 by
+ *     branch relaxation once the function body is complete.
  *   • The linker/PE-writer patches RELOC_REL32 for function calls
  *     and RELOC_RIP_REL32 for string literal references.
  *
@@ -26,8 +28,6 @@
  * Helpers / Forward declarations
  * ═════════════════════════════════════════════════════════════ */
 
-static void resolve_label_relocs(X64Ctx *ctx);
-
 _Noreturn static void x64_error(const char *fmt, ...)
 {
     va_list ap;
@@ -49,7 +49,9 @@ static void cb_init(CodeBuf *cb)
     if (!cb->data) x64_error("out of memory for code buffer");
 }
 
-static void cb_grow(CodeBuf *cb, int need)
+/* Slow path: kept out of line so the per-byte check stays tiny. */
+__attribute__((noinline))
+static void cb_grow_slow(CodeBuf *cb, int need)
 {
     while (cb->len + need > cb->cap) {
         cb->cap *= 2;
@@ -58,28 +60,41 @@ static void cb_grow(CodeBuf *cb, int need)
     }
 }
 
-static void cb_emit8(CodeBuf *cb, uint8_t b)
+static inline void cb_grow(CodeBuf *cb, int need)
+{
+    if (cb->len + need > cb->cap) cb_grow_slow(cb, need);
+}
+
+/* Append an instruction assembled in a local byte buffer. */
+static inline void cb_emit_bytes(CodeBuf *cb, const uint8_t *b, int n)
+{
+    cb_grow(cb, n);
+    memcpy(&cb->data[cb->len], b, (size_t)n);
+    cb->len += n;
+}
+
+static inline void cb_emit8(CodeBuf *cb, uint8_t b)
 {
     cb_grow(cb, 1);
     cb->data[cb->len++] = b;
 }
 
 __attribute__((unused))
-static void cb_emit16(CodeBuf *cb, uint16_t v)
+static inline void cb_emit16(CodeBuf *cb, uint16_t v)
 {
     cb_grow(cb, 2);
     memcpy(&cb->data[cb->len], &v, 2);
     cb->len += 2;
 }
 
-static void cb_emit32(CodeBuf *cb, uint32_t v)
+static inline void cb_emit32(CodeBuf *cb, uint32_t v)
 {
     cb_grow(cb, 4);
     memcpy(&cb->data[cb->len], &v, 4);
     cb->len += 4;
 }
 
-static void cb_emit64(CodeBuf *cb, uint64_t v)
+static inline void cb_emit64(CodeBuf *cb, uint64_t v)
 {
     cb_grow(cb, 8);
     memcpy(&cb->data[cb->len], &v, 8);
@@ -111,6 +126,7 @@ static void add_reloc(X64Ctx *ctx, RelocKind kind, int offset,
     r->target_sym  = sym;
     r->target_label = label;
     r->addend      = addend;
+    r->rt          = RTSYM_NONE;
 }
 
 /* ── Label management ────────────────────────────────────── */
@@ -127,12 +143,29 @@ static void ensure_label(X64Ctx *ctx, int id)
     }
 }
 
+/* Label ids are program-wide; remember which ones this function sets
+ * so resetting and rebasing never walk the whole table. */
 static void set_label(X64Ctx *ctx, int id, int offset)
 {
     ensure_label(ctx, id);
+    if (ctx->label_offsets[id] < 0) {
+        if (ctx->fn_label_count >= ctx->fn_label_cap) {
+            ctx->fn_label_cap = ctx->fn_label_cap ? ctx->fn_label_cap * 2 : 64;
+            ctx->fn_labels = (int *)realloc(ctx->fn_labels,
+                                            ctx->fn_label_cap * sizeof(int));
+        }
+        ctx->fn_labels[ctx->fn_label_count++] = id;
+    }
     ctx->label_offsets[id] = offset;
 }
 
+static void reset_labels(X64Ctx *ctx)
+{
+    for (int i = 0; i < ctx->fn_label_count; i++)
+        ctx->label_offsets[ctx->fn_labels[i]] = -1;
+    ctx->fn_label_count = 0;
+}
+
 static int get_label(X64Ctx *ctx, int id)
 {
     ensure_label(ctx, id);
@@ -164,6 +197,14 @@ static void emit_rex32(CodeBuf *cb, int r, int x, int b)
         cb_emit8(cb, rex(0, r, x, b));
 }
 
+/* Same as emit_rex32, but into a local instruction buffer. */
+static int put_rex32(uint8_t *buf, int n, int r, int x, int b)
+{
+    if (r > 7 || x > 7 || b > 7)
+        buf[n++] = rex(0, r, x, b);
+    return n;
+}
+
 /* ModRM byte builder */
 static uint8_t modrm(int mod, int reg, int rm)
 {
@@ -195,17 +236,18 @@ static int temp_rbp_off(const X64Ctx *ctx, int temp_id)
  */
 static void emit_mov_reg_reg(CodeBuf *cb, int dst, int src)
 {
-    emit_rex32(cb, src, 0, dst);
-    cb_emit8(cb, 0x89);
-    cb_emit8(cb, modrm(3, src, dst));
+    uint8_t b[3];
+    int n = put_rex32(b, 0, src, 0, dst);
+    b[n++] = 0x89;
+    b[n++] = modrm(3, src, dst);
+    cb_emit_bytes(cb, b, n);
 }
 
 /* 64-bit variant for prologue/epilogue pointer operations */
 static void emit_mov_reg_reg64(CodeBuf *cb, int dst, int src)
 {
-    cb_emit8(cb, rex(1, src, 0, dst));
-    cb_emit8(cb, 0x89);
-    cb_emit8(cb, modrm(3, src, dst));
+    uint8_t b[3] = { rex(1, src, 0, dst), 0x89, modrm(3, src, dst) };
+    cb_emit_bytes(cb, b, 3);
 }
 
 /*
@@ -250,121 +292,123 @@ static void emit_load_imm(CodeBuf *cb, int reg, int64_t val)
 }
 
 /*
- * emit_load_rbp_off(cb, dst_reg, offset)
- *   mov dst_reg, [rbp + offset]   (64-bit load)
+ * put_mem(b, n, reg, base, disp) – ModRM [+ SIB] + displacement for
+ * a [base + disp] memory operand, appended to an instruction buffer.
+ *
+ * Every memory-operand encoder funnels through here.  disp8 (mod=01)
+ * is used whenever the displacement fits in a signed byte, which
+ * covers most locals and spill slots and saves 3 bytes per access;
+ * larger offsets fall back to disp32 (mod=10).  RSP/R12 bases need a
+ * SIB byte; RBP/R13 always carry a displacement, so mod=00 is never
+ * used.
+ */
+static int put_mem(uint8_t *b, int n, int reg, int base, int32_t disp)
+{
+    bool d8 = disp >= -128 && disp <= 127;
+    b[n++] = modrm(d8 ? 1 : 2, reg, base);
+    if ((base & 7) == RSP) b[n++] = 0x24;   /* SIB: base only */
+    if (d8) {
+        b[n++] = (uint8_t)(int8_t)disp;
+    } else {
+        memcpy(&b[n], &disp, 4);
+        n += 4;
+    }
+    return n;
+}
+
+/*
+ * emit_load_rbp(cb, dst_reg, offset)
+ *   mov dst_reg, [rbp + offset]   (32-bit load)
  *
  * offset is always negative for our usage.
- * Uses disp32 encoding with RBP base.
  */
 static void emit_load_rbp(CodeBuf *cb, int dst, int off)
 {
-    emit_rex32(cb, dst, 0, RBP);
-    cb_emit8(cb, 0x8B);                    /* mov r32, r/m32 */
-    cb_emit8(cb, modrm(2, dst, RBP));      /* mod=10 (disp32), rm=rbp */
-    cb_emit32(cb, (uint32_t)off);
+    uint8_t b[8];
+    int n = put_rex32(b, 0, dst, 0, RBP);
+    b[n++] = 0x8B;                         /* mov r32, r/m32 */
+    cb_emit_bytes(cb, b, put_mem(b, n, dst, RBP, off));
 }
 
 /* 64-bit variant for callee-save / pointer loads */
 static void emit_load_rbp64(CodeBuf *cb, int dst, int off)
 {
-    cb_emit8(cb, rex(1, dst, 0, RBP));
-    cb_emit8(cb, 0x8B);                    /* mov r64, r/m64 */
-    cb_emit8(cb, modrm(2, dst, RBP));
-    cb_emit32(cb, (uint32_t)off);
+    uint8_t b[8] = { rex(1, dst, 0, RBP), 0x8B };  /* mov r64, r/m64 */
+    cb_emit_bytes(cb, b, put_mem(b, 2, dst, RBP, off));
 }
 
 /*
- * emit_store_rbp_off(cb, offset, src_reg)
- *   mov [rbp + offset], src_reg   (64-bit store)
+ * emit_store_rbp(cb, offset, src_reg)
+ *   mov [rbp + offset], src_reg   (32-bit store)
  */
 static void emit_store_rbp(CodeBuf *cb, int off, int src)
 {
-    emit_rex32(cb, src, 0, RBP);
-    cb_emit8(cb, 0x89);                    /* mov r/m32, r32 */
-    cb_emit8(cb, modrm(2, src, RBP));
-    cb_emit32(cb, (uint32_t)off);
+    uint8_t b[8];
+    int n = put_rex32(b, 0, src, 0, RBP);
+    b[n++] = 0x89;                         /* mov r/m32, r32 */
+    cb_emit_bytes(cb, b, put_mem(b, n, src, RBP, off));
 }
 
 /* 64-bit variant for callee-save / pointer stores */
 static void emit_store_rbp64(CodeBuf *cb, int off, int src)
 {
-    cb_emit8(cb, rex(1, src, 0, RBP));
-    cb_emit8(cb, 0x89);                    /* mov r/m64, r64 */
-    cb_emit8(cb, modrm(2, src, RBP));
-    cb_emit32(cb, (uint32_t)off);
+    uint8_t b[8] = { rex(1, src, 0, RBP), 0x89 };  /* mov r/m64, r64 */
+    cb_emit_bytes(cb, b, put_mem(b, 2, src, RBP, off));
 }
 
 /*
  * Width-aware sign-extending load from [rbp + off] into a 64-bit register.
  * For i8:  movsx  rax, byte  [rbp+off]   (REX.W 0F BE)
  * For i16: movsx  rax, word  [rbp+off]   (REX.W 0F BF)
- * For i32: movsxd rax, dword [rbp+off]   (REX.W 63)
+ * For i32: mov    eax, dword [rbp+off]   (32-bit load)
  * For i64: mov    rax, qword [rbp+off]   (existing 64-bit load)
  */
 static void emit_load_rbp_sx(CodeBuf *cb, int dst, int off, int size)
 {
+    uint8_t b[10];
+    int n = 0;
     switch (size) {
     case 1:
-        cb_emit8(cb, rex(1, dst, 0, RBP));  /* REX.W */
-        cb_emit8(cb, 0x0F);
-        cb_emit8(cb, 0xBE);                  /* movsx r64, r/m8 */
-        cb_emit8(cb, modrm(2, dst, RBP));
-        cb_emit32(cb, (uint32_t)off);
-        break;
     case 2:
-        cb_emit8(cb, rex(1, dst, 0, RBP));  /* REX.W */
-        cb_emit8(cb, 0x0F);
-        cb_emit8(cb, 0xBF);                  /* movsx r64, r/m16 */
-        cb_emit8(cb, modrm(2, dst, RBP));
-        cb_emit32(cb, (uint32_t)off);
+        b[n++] = rex(1, dst, 0, RBP);        /* REX.W */
+        b[n++] = 0x0F;
+        b[n++] = size == 1 ? 0xBE : 0xBF;    /* movsx r64, r/m8 / r/m16 */
         break;
     case 4:
         /* mov r32, dword [rbp+off] — 32-bit load, implicit zero-extend */
-        emit_rex32(cb, dst, 0, RBP);
-        cb_emit8(cb, 0x8B);
-        cb_emit8(cb, modrm(2, dst, RBP));
-        cb_emit32(cb, (uint32_t)off);
+        n = put_rex32(b, n, dst, 0, RBP);
+        b[n++] = 0x8B;
         break;
     default: /* 8 or unknown */
         emit_load_rbp64(cb, dst, off);
-        break;
+        return;
     }
+    cb_emit_bytes(cb, b, put_mem(b, n, dst, RBP, off));
 }
 
 /* Zero-extending load from [rbp+off] (for unsigned types u8, u16, u32). */
 static void emit_load_rbp_zx(CodeBuf *cb, int dst, int off, int size)
 {
+    uint8_t b[10];
+    int n = 0;
     switch (size) {
     case 1:
-        /* movzx r32, byte [rbp+off]  — no REX.W so result zero-extends to r64 */
-        if (dst >= 8 || RBP >= 8)
-            cb_emit8(cb, rex(0, dst, 0, RBP));
-        cb_emit8(cb, 0x0F);
-        cb_emit8(cb, 0xB6);
-        cb_emit8(cb, modrm(2, dst, RBP));
-        cb_emit32(cb, (uint32_t)off);
-        break;
     case 2:
-        /* movzx r32, word [rbp+off] */
-        if (dst >= 8 || RBP >= 8)
-            cb_emit8(cb, rex(0, dst, 0, RBP));
-        cb_emit8(cb, 0x0F);
-        cb_emit8(cb, 0xB7);
-        cb_emit8(cb, modrm(2, dst, RBP));
-        cb_emit32(cb, (uint32_t)off);
+        /* movzx r32, byte/word [rbp+off]  — no REX.W, zero-extends to r64 */
+        n = put_rex32(b, n, dst, 0, RBP);
+        b[n++] = 0x0F;
+        b[n++] = size == 1 ? 0xB6 : 0xB7;
         break;
     case 4:
         /* mov r32, dword [rbp+off] — writing to r32 auto-zero-extends to r64 */
-        if (dst >= 8 || RBP >= 8)
-            cb_emit8(cb, rex(0, dst, 0, RBP));
-        cb_emit8(cb, 0x8B);
-        cb_emit8(cb, modrm(2, dst, RBP));
-        cb_emit32(cb, (uint32_t)off);
+        n = put_rex32(b, n, dst, 0, RBP);
+        b[n++] = 0x8B;
         break;
     default:
         emit_load_rbp64(cb, dst, off);
-        break;
+        return;
     }
+    cb_emit_bytes(cb, b, put_mem(b, n, dst, RBP, off));
 }
 
 /*
@@ -376,41 +420,29 @@ static void emit_load_rbp_zx(CodeBuf *cb, int dst, int off, int size)
  */
 static void emit_store_rbp_sz(CodeBuf *cb, int off, int src, int size)
 {
+    uint8_t b[10];
+    int n = 0;
     switch (size) {
     case 1:
-        if (src >= 4) /* need REX for spl/bpl/sil/dil or r8b-r15b */
-            cb_emit8(cb, rex(0, src, 0, RBP));
-        else {
-            /* For al/cl/dl/bl we still need REX if RBP is base (for mod=10) */
-            /* Actually RBP base doesn't need REX.B; but emit it for safety */
-            cb_emit8(cb, rex(0, src, 0, RBP));
-        }
-        cb_emit8(cb, 0x88);                  /* mov r/m8, r8 */
-        cb_emit8(cb, modrm(2, src, RBP));
-        cb_emit32(cb, (uint32_t)off);
+        /* Always REX: spl/bpl/sil/dil need it, harmless for al..bl */
+        b[n++] = rex(0, src, 0, RBP);
+        b[n++] = 0x88;                       /* mov r/m8, r8 */
         break;
     case 2:
-        cb_emit8(cb, 0x66);                  /* operand size prefix → 16-bit */
-        if (src >= 8)
-            cb_emit8(cb, rex(0, src, 0, RBP));
-        else
-            cb_emit8(cb, rex(0, src, 0, RBP));
-        cb_emit8(cb, 0x89);                  /* mov r/m16, r16 */
-        cb_emit8(cb, modrm(2, src, RBP));
-        cb_emit32(cb, (uint32_t)off);
+        b[n++] = 0x66;                       /* operand size prefix → 16-bit */
+        b[n++] = rex(0, src, 0, RBP);
+        b[n++] = 0x89;                       /* mov r/m16, r16 */
         break;
     case 4:
         /* No REX.W → 32-bit operation */
-        if (src >= 8)
-            cb_emit8(cb, rex(0, src, 0, RBP));
-        cb_emit8(cb, 0x89);                  /* mov r/m32, r32 */
-        cb_emit8(cb, modrm(2, src, RBP));
-        cb_emit32(cb, (uint32_t)off);
+        n = put_rex32(b, n, src, 0, RBP);
+        b[n++] = 0x89;                       /* mov r/m32, r32 */
         break;
     default: /* 8 or unknown */
         emit_store_rbp64(cb, off, src);
-        break;
+        return;
     }
+    cb_emit_bytes(cb, b, put_mem(b, n, src, RBP, off));
 }
 
 /* ═════════════════════════════════════════════════════════════
@@ -551,14 +583,40 @@ static int dest_reg(const X64Ctx *ctx, const IROper *dest, int fallback)
     return fallback;
 }
 
+/*
+ * load_commutative – Load the sources of a commutative binary op.
+ *
+ * Each source's physical register is looked up once.  If src2 already
+ * lives in dr, the operands are swapped together with their resolved
+ * registers, so src1 never has to be re-queried after the swap.
+ * Loads the first operand into dr and returns the register holding
+ * the second (its own register, or RCX as scratch).
+ */
+static int load_commutative(X64Ctx *ctx, const IRInstr *ins, int dr)
+{
+    const IROper *a = &ins->src1, *b = &ins->src2;
+    int ar = oper_phys(ctx, a);
+    int br = oper_phys(ctx, b);
+    if (br == dr) {
+        const IROper *t = a; a = b; b = t;
+        int tr = ar; ar = br; br = tr;
+    }
+    load_oper(ctx, dr, a);
+    int s2 = (br >= 0 && br != dr) ? br : RCX;
+    if (s2 != br) load_oper(ctx, s2, b);
+    return s2;
+}
+
 /* ── ALU helpers (reg = reg OP reg) ──────────────────────── */
 
 /* Two-operand ALU: op eax, ecx (32-bit) */
 static void emit_alu_rr(CodeBuf *cb, uint8_t opcode, int dst, int src)
 {
-    emit_rex32(cb, src, 0, dst);
-    cb_emit8(cb, opcode);
-    cb_emit8(cb, modrm(3, src, dst));
+    uint8_t b[3];
+    int n = put_rex32(b, 0, src, 0, dst);
+    b[n++] = opcode;
+    b[n++] = modrm(3, src, dst);
+    cb_emit_bytes(cb, b, n);
 }
 
 /* neg eax (32-bit) */
@@ -608,29 +666,6 @@ static void emit_movzx_rax_al(CodeBuf *cb)
     cb_emit8(cb, modrm(3, RAX, RAX));
 }
 
-/*
- * emit_jmp_rel32(cb) – jmp rel32; returns offset of the rel32 for patching
- */
-static int emit_jmp_rel32(CodeBuf *cb)
-{
-    cb_emit8(cb, 0xE9);
-    int patch = cb_pos(cb);
-    cb_emit32(cb, 0);  /* placeholder */
-    return patch;
-}
-
-/*
- * emit_jcc_rel32(cb, cc) – jCC rel32; returns offset of rel32
- */
-static int emit_jcc_rel32(CodeBuf *cb, uint8_t cc)
-{
-    cb_emit8(cb, 0x0F);
-    cb_emit8(cb, (uint8_t)(0x80 + cc));
-    int patch = cb_pos(cb);
-    cb_emit32(cb, 0);
-    return patch;
-}
-
 /* Patch a rel32 at 'patch_offset' to jump to current position. */
 __attribute__((unused))
 static void patch_jmp(CodeBuf *cb, int patch_offset)
@@ -719,14 +754,32 @@ static void emit_add_reg_imm32(CodeBuf *cb, int reg, int32_t val)
     cb_emit32(cb, (uint32_t)val);
 }
 
-/* ── LEA reg, [rbp + disp32] ────────────────────────────── */
+/* ── and reg, imm32  (32-bit) ───────────────────────────── */
+
+static void emit_and_reg_imm32(CodeBuf *cb, int reg, int32_t val)
+{
+    emit_rex32(cb, 0, 0, reg);
+    cb_emit8(cb, 0x81);
+    cb_emit8(cb, modrm(3, 4, reg));    /* /4 = and */
+    cb_emit32(cb, (uint32_t)val);
+}
+
+/* ── sar reg, imm8  (32-bit) ────────────────────────────── */
+
+static void emit_sar_reg_imm8(CodeBuf *cb, int reg, uint8_t count)
+{
+    emit_rex32(cb, 0, 0, reg);
+    cb_emit8(cb, 0xC1);
+    cb_emit8(cb, modrm(3, 7, reg));    /* /7 = sar */
+    cb_emit8(cb, count);
+}
+
+/* ── LEA reg, [rbp + disp] ──────────────────────────────── */
 
 static void emit_lea_rbp(CodeBuf *cb, int dst, int off)
 {
-    cb_emit8(cb, rex(1, dst, 0, RBP));
-    cb_emit8(cb, 0x8D);
-    cb_emit8(cb, modrm(2, dst, RBP));
-    cb_emit32(cb, (uint32_t)off);
+    uint8_t b[8] = { rex(1, dst, 0, RBP), 0x8D };
+    cb_emit_bytes(cb, b, put_mem(b, 2, dst, RBP, off));
 }
 
 /* ── Shift: sal/shr reg, cl ─────────────────────────────── */
@@ -786,26 +839,30 @@ static void emit_idiv_reg(CodeBuf *cb, int reg)
     cb_emit8(cb, modrm(3, 7, reg)); /* /7 = idiv */
 }
 
-/* ── mov [reg + disp32], src (64-bit) ───────────────────── */
+/* k if v == 2^k for a divisor that idiv would see as a positive
+ * 32-bit value (2 ≤ v ≤ 2^30), otherwise 0. */
+static int div_pow2_shift(int64_t v)
+{
+    if (v < 2 || v > (1 << 30) || (v & (v - 1)) != 0) return 0;
+    int k = 0;
+    while (v > 1) { v >>= 1; k++; }
+    return k;
+}
+
+/* ── mov [reg + disp], src (64-bit) ─────────────────────── */
 
 static void emit_store_mem(CodeBuf *cb, int base, int32_t disp, int src)
 {
-    cb_emit8(cb, rex(1, src, 0, base));
-    cb_emit8(cb, 0x89);
-    cb_emit8(cb, modrm(2, src, base));
-    if ((base & 7) == RSP) cb_emit8(cb, 0x24); /* SIB for RSP base */
-    cb_emit32(cb, (uint32_t)disp);
+    uint8_t b[9] = { rex(1, src, 0, base), 0x89 };
+    cb_emit_bytes(cb, b, put_mem(b, 2, src, base, disp));
 }
 
-/* ── mov dst, [reg + disp32] (64-bit) ───────────────────── */
+/* ── mov dst, [reg + disp] (64-bit) ─────────────────────── */
 
 static void emit_load_mem(CodeBuf *cb, int dst, int base, int32_t disp)
 {
-    cb_emit8(cb, rex(1, dst, 0, base));
-    cb_emit8(cb, 0x8B);
-    cb_emit8(cb, modrm(2, dst, base));
-    if ((base & 7) == RSP) cb_emit8(cb, 0x24); /* SIB for RSP base */
-    cb_emit32(cb, (uint32_t)disp);
+    uint8_t b[9] = { rex(1, dst, 0, base), 0x8B };
+    cb_emit_bytes(cb, b, put_mem(b, 2, dst, base, disp));
 }
 
 /* ═════════════════════════════════════════════════════════════
@@ -861,18 +918,25 @@ static const int win64_arg_regs[4] = { RCX, RDX, R8, R9 };
 
 static void gen_function(X64Ctx *ctx, const IRFunc *fn);
 
-/* Forward declare runtime helpers we'll emit calls to */
-static const char *RT_WRITE_I64   = "__axis_write_i64";
-static const char *RT_WRITE_STR   = "__axis_write_str";
-static const char *RT_WRITE_BOOL  = "__axis_write_bool";
-static const char *RT_WRITE_CHAR  = "__axis_write_char";
-static const char *RT_WRITE_NL    = "__axis_write_nl";
-static const char *RT_READ_I64    = "__axis_read_i64";
-static const char *RT_READ_LINE   = "__axis_read_line";
-static const char *RT_READ_CHAR   = "__axis_read_char";
-static const char *RT_READ_FAILED = "__axis_read_failed";
-static const char *RT_MEMCPY      = "__axis_memcpy";
-static const char *RT_DIV_ZERO    = "__axis_div_zero";
+/* Runtime helper symbol names, for relocations and --dump-x64 */
+static const char *const RT_NAMES[RTSYM_COUNT] = {
+    [RTSYM_WRITE_I64]   = "__axis_write_i64",
+    [RTSYM_WRITE_STR]   = "__axis_write_str",
+    [RTSYM_WRITE_BOOL]  = "__axis_write_bool",
+    [RTSYM_WRITE_CHAR]  = "__axis_write_char",
+    [RTSYM_WRITE_NL]    = "__axis_write_nl",
+    [RTSYM_READ_I64]    = "__axis_read_i64",
+    [RTSYM_READ_LINE]   = "__axis_read_line",
+    [RTSYM_READ_CHAR]   = "__axis_read_char",
+    [RTSYM_READ_FAILED] = "__axis_read_failed",
+    [RTSYM_MEMCPY]      = "__axis_memcpy",
+    [RTSYM_DIV_ZERO]    = "__axis_div_zero",
+};
+
+/* Indexed by the IR_WRITE type hint (0=int, 1=str, 2=bool, 3=char) */
+static const RuntimeSym RT_WRITE[4] = {
+    RTSYM_WRITE_I64, RTSYM_WRITE_STR, RTSYM_WRITE_BOOL, RTSYM_WRITE_CHAR
+};
 
 /* ── Emit a call to a named function (relocation-based) ── */
 
@@ -882,8 +946,46 @@ static void emit_call_sym(X64Ctx *ctx, const char *name)
     add_reloc(ctx, RELOC_REL32, patch, name, 0, 0);
 }
 
+/* ── Emit a call to a runtime helper stub ──────────────── */
+
+static void emit_call_rt(X64Ctx *ctx, RuntimeSym rt)
+{
+    emit_call_sym(ctx, RT_NAMES[rt]);
+    ctx->relocs[ctx->reloc_count - 1].rt = rt;
+    ctx->rt_used[rt] = true;
+}
+
 /* ── Emit a LEA for a string literal (RIP-relative) ────── */
 
+/*
+ * emit_jump_label(ctx, cc, label) – jmp (cc < 0) or jCC to a label.
+ * Always emitted in the rel32 form with a zero placeholder; the site
+ * is recorded and resolved (and possibly shortened) by relax_jumps().
+ */
+static void emit_jump_label(X64Ctx *ctx, int cc, int label)
+{
+    CodeBuf *cb = &ctx->code;
+    if (ctx->jump_count >= ctx->jump_cap) {
+        ctx->jump_cap = ctx->jump_cap ? ctx->jump_cap * 2 : 64;
+        ctx->jumps = (JumpSite *)realloc(ctx->jumps,
+                                         ctx->jump_cap * sizeof(JumpSite));
+    }
+    JumpSite *j = &ctx->jumps[ctx->jump_count++];
+    j->pos      = cb_pos(cb);
+    j->label    = label;
+    j->cc       = cc;
+    j->near_len = cc < 0 ? 5 : 6;   /* E9 rel32 / 0F 8x rel32 */
+    j->is_short = false;
+
+    if (cc < 0) {
+        cb_emit8(cb, 0xE9);
+    } else {
+        cb_emit8(cb, 0x0F);
+        cb_emit8(cb, (uint8_t)(0x80 + cc));
+    }
+    cb_emit32(cb, 0);  /* placeholder */
+}
+
 static void emit_lea_string(X64Ctx *ctx, int reg, int str_idx)
 {
     CodeBuf *cb = &ctx->code;
@@ -905,6 +1007,14 @@ static void emit_lea_string(X64Ctx *ctx, int reg, int str_idx)
 /* Forward declaration – defined after gen_instr */
 static void emit_epilogue(X64Ctx *ctx);
 
+/* Condition codes for IR_CMP_EQ..IR_CMP_GE (indexed by op - IR_CMP_EQ) */
+static const uint8_t cmp_cc_signed[6] = {
+    0x04, 0x05, 0x0C, 0x0E, 0x0F, 0x0D     /* e ne l le g ge    */
+};
+static const uint8_t cmp_cc_unsigned[6] = {
+    0x04, 0x05, 0x02, 0x06, 0x07, 0x03     /* e ne b be a ae    */
+};
+
 /*
  * gen_instr – Lower a single IR instruction to x86-64 machine code.
  *
@@ -1014,12 +1124,7 @@ static int gen_instr(X64Ctx *ctx, const IRFunc *fn, int idx)
             load_oper(ctx, dr, reg_op);
             emit_add_reg_imm32(cb, dr, (int32_t)imm_op->imm);
         } else {
-            int s2r = oper_phys(ctx, &ins->src2);
-            const IROper *a = &ins->src1, *b = &ins->src2;
-            if (s2r == dr) { const IROper *t = a; a = b; b = t; s2r = oper_phys(ctx, b); }
-            load_oper(ctx, dr, a);
-            int s2 = (s2r >= 0 && s2r != dr) ? s2r : RCX;
-            if (s2 != s2r) load_oper(ctx, s2, b);
+            int s2 = load_commutative(ctx, ins, dr);
             emit_alu_rr(cb, 0x01, dr, s2);
         }
         if (ins->dest.kind == OPER_TEMP)
@@ -1071,12 +1176,7 @@ static int gen_instr(X64Ctx *ctx, const IRFunc *fn, int idx)
         }
         /* General case: IMUL */
         int dr = dest_reg(ctx, &ins->dest, RAX);
-        int s2r = oper_phys(ctx, &ins->src2);
-        const IROper *a = &ins->src1, *b = &ins->src2;
-        if (s2r == dr) { const IROper *t = a; a = b; b = t; s2r = oper_phys(ctx, b); }
-        load_oper(ctx, dr, a);
-        int s2 = (s2r >= 0 && s2r != dr) ? s2r : RCX;
-        if (s2 != s2r) load_oper(ctx, s2, b);
+        int s2 = load_commutative(ctx, ins, dr);
         emit_imul_rr(cb, dr, s2);        /* imul dr, s2 */
         if (ins->dest.kind == OPER_TEMP)
             store_temp(ctx, ins->dest.temp_id, dr);
@@ -1084,30 +1184,38 @@ static int gen_instr(X64Ctx *ctx, const IRFunc *fn, int idx)
     }
 
     case IR_DIV:
+    case IR_MOD: {
+        bool is_mod = ins->op == IR_MOD;
         load_oper(ctx, RAX, &ins->src1);
-        load_oper(ctx, RCX, &ins->src2);
-        emit_test_rr(cb, RCX, RCX);          /* test ecx, ecx */
-        cb_emit8(cb, 0x75); cb_emit8(cb, 5); /* jnz +5 (skip call) */
-        emit_call_sym(ctx, RT_DIV_ZERO);
-        if (ins->extra) {
-            emit_alu_rr(cb, 0x31, RDX, RDX); /* xor edx, edx */
-            emit_rex32(cb, 0, 0, RCX);
-            cb_emit8(cb, 0xF7);
-            cb_emit8(cb, modrm(3, 6, RCX));   /* div ecx */
-        } else {
-            emit_cdq(cb);
-            emit_idiv_reg(cb, RCX);
+
+        /* Signed x / 2^k and x % 2^k without idiv.  Adding 2^k-1 to a
+         * negative dividend first keeps idiv's round-toward-zero. */
+        int k = (!ins->extra && ins->src2.kind == OPER_IMM)
+              ? div_pow2_shift(ins->src2.imm) : 0;
+        if (k > 0) {
+            int32_t mask = (int32_t)((1u << k) - 1);
+            emit_cdq(cb);                        /* edx = sign of eax  */
+            emit_and_reg_imm32(cb, RDX, mask);   /* edx = bias         */
+            emit_alu_rr(cb, 0x01, RAX, RDX);     /* add eax, edx       */
+            if (is_mod) {
+                emit_and_reg_imm32(cb, RAX, mask);
+                emit_alu_rr(cb, 0x29, RAX, RDX); /* sub eax, edx       */
+            } else {
+                emit_sar_reg_imm8(cb, RAX, (uint8_t)k);
+            }
+            if (ins->dest.kind == OPER_TEMP)
+                store_temp(ctx, ins->dest.temp_id, RAX);
+            break;
         }
-        if (ins->dest.kind == OPER_TEMP)
-            store_temp(ctx, ins->dest.temp_id, RAX);
-        break;
 
-    case IR_MOD:
-        load_oper(ctx, RAX, &ins->src1);
         load_oper(ctx, RCX, &ins->src2);
-        emit_test_rr(cb, RCX, RCX);          /* test ecx, ecx */
-        cb_emit8(cb, 0x75); cb_emit8(cb, 5); /* jnz +5 (skip call) */
-        emit_call_sym(ctx, RT_DIV_ZERO);
+        /* A constant divisor whose low 32 bits (what div/idiv ecx
+         * sees) are nonzero needs no runtime check */
+        if (ins->src2.kind != OPER_IMM || (int32_t)ins->src2.imm == 0) {
+            emit_test_rr(cb, RCX, RCX);          /* test ecx, ecx */
+            cb_emit8(cb, 0x75); cb_emit8(cb, 5); /* jnz +5 (skip call) */
+            emit_call_rt(ctx, RTSYM_DIV_ZERO);
+        }
         if (ins->extra) {
             emit_alu_rr(cb, 0x31, RDX, RDX); /* xor edx, edx */
             emit_rex32(cb, 0, 0, RCX);
@@ -1117,10 +1225,12 @@ static int gen_instr(X64Ctx *ctx, const IRFunc *fn, int idx)
             emit_cdq(cb);
             emit_idiv_reg(cb, RCX);
         }
-        emit_mov_reg_reg(cb, RAX, RDX);
+        if (is_mod)
+            emit_mov_reg_reg(cb, RAX, RDX);
         if (ins->dest.kind == OPER_TEMP)
             store_temp(ctx, ins->dest.temp_id, RAX);
         break;
+    }
 
     case IR_NEG: {
         int dr = dest_reg(ctx, &ins->dest, RAX);
@@ -1134,12 +1244,7 @@ static int gen_instr(X64Ctx *ctx, const IRFunc *fn, int idx)
     /* ── Bitwise ─────────────────────────────────────────── */
     case IR_BIT_AND: {
         int dr = dest_reg(ctx, &ins->dest, RAX);
-        int s2r = oper_phys(ctx, &ins->src2);
-        const IROper *a = &ins->src1, *b = &ins->src2;
-        if (s2r == dr) { const IROper *t = a; a = b; b = t; s2r = oper_phys(ctx, b); }
-        load_oper(ctx, dr, a);
-        int s2 = (s2r >= 0 && s2r != dr) ? s2r : RCX;
-        if (s2 != s2r) load_oper(ctx, s2, b);
+        int s2 = load_commutative(ctx, ins, dr);
         emit_alu_rr(cb, 0x21, dr, s2);  /* and dr, s2 */
         if (ins->dest.kind == OPER_TEMP)
             store_temp(ctx, ins->dest.temp_id, dr);
@@ -1148,12 +1253,7 @@ static int gen_instr(X64Ctx *ctx, const IRFunc *fn, int idx)
 
     case IR_BIT_OR: {
         int dr = dest_reg(ctx, &ins->dest, RAX);
-        int s2r = oper_phys(ctx, &ins->src2);
-        const IROper *a = &ins->src1, *b = &ins->src2;
-        if (s2r == dr) { const IROper *t = a; a = b; b = t; s2r = oper_phys(ctx, b); }
-        load_oper(ctx, dr, a);
-        int s2 = (s2r >= 0 && s2r != dr) ? s2r : RCX;
-        if (s2 != s2r) load_oper(ctx, s2, b);
+        int s2 = load_commutative(ctx, ins, dr);
         emit_alu_rr(cb, 0x09, dr, s2);  /* or dr, s2 */
         if (ins->dest.kind == OPER_TEMP)
             store_temp(ctx, ins->dest.temp_id, dr);
@@ -1162,12 +1262,7 @@ static int gen_instr(X64Ctx *ctx, const IRFunc *fn, int idx)
 
     case IR_BIT_XOR: {
         int dr = dest_reg(ctx, &ins->dest, RAX);
-        int s2r = oper_phys(ctx, &ins->src2);
-        const IROper *a = &ins->src1, *b = &ins->src2;
-        if (s2r == dr) { const IROper *t = a; a = b; b = t; s2r = oper_phys(ctx, b); }
-        load_oper(ctx, dr, a);
-        int s2 = (s2r >= 0 && s2r != dr) ? s2r : RCX;
-        if (s2 != s2r) load_oper(ctx, s2, b);
+        int s2 = load_commutative(ctx, ins, dr);
         emit_alu_rr(cb, 0x31, dr, s2);  /* xor dr, s2 */
         if (ins->dest.kind == OPER_TEMP)
             store_temp(ctx, ins->dest.temp_id, dr);
@@ -1219,28 +1314,8 @@ static int gen_instr(X64Ctx *ctx, const IRFunc *fn, int idx)
         }
 
         /* Map opcode to condition code */
-        uint8_t cc;
-        if (ins->extra) {
-            switch (ins->op) {
-            case IR_CMP_EQ: cc = 0x04; break;
-            case IR_CMP_NE: cc = 0x05; break;
-            case IR_CMP_LT: cc = 0x02; break;
-            case IR_CMP_LE: cc = 0x06; break;
-            case IR_CMP_GT: cc = 0x07; break;
-            case IR_CMP_GE: cc = 0x03; break;
-            default: cc = 0x04; break;
-            }
-        } else {
-            switch (ins->op) {
-            case IR_CMP_EQ: cc = 0x04; break;
-            case IR_CMP_NE: cc = 0x05; break;
-            case IR_CMP_LT: cc = 0x0C; break;
-            case IR_CMP_LE: cc = 0x0E; break;
-            case IR_CMP_GT: cc = 0x0F; break;
-            case IR_CMP_GE: cc = 0x0D; break;
-            default: cc = 0x04; break;
-            }
-        }
+        uint8_t cc = (ins->extra ? cmp_cc_unsigned : cmp_cc_signed)
+                     [ins->op - IR_CMP_EQ];
 
         /* ── CMP+Branch fusion ───────────────────────────── */
         /* If the next IR instruction is JZ/JNZ on the same temp,
@@ -1254,17 +1329,7 @@ static int gen_instr(X64Ctx *ctx, const IRFunc *fn, int idx)
                 /* JNZ = jump when cmp is true  → use cc as-is
                  * JZ  = jump when cmp is false → invert cc (XOR 1) */
                 uint8_t bcc = (next->op == IR_JNZ) ? cc : (uint8_t)(cc ^ 1);
-                int lbl = next->dest.label_id;
-                int target = get_label(ctx, lbl);
-                if (target >= 0) {
-                    cb_emit8(cb, 0x0F);
-                    cb_emit8(cb, (uint8_t)(0x80 + bcc));
-                    int from = cb_pos(cb) + 4;
-                    cb_emit32(cb, (uint32_t)(target - from));
-                } else {
-                    int patch = emit_jcc_rel32(cb, bcc);
-                    add_reloc(ctx, RELOC_REL32, patch, NULL, lbl, 0);
-                }
+                emit_jump_label(ctx, bcc, next->dest.label_id);
                 return 2;  /* consumed CMP + JZ/JNZ */
             }
         }
@@ -1294,22 +1359,9 @@ static int gen_instr(X64Ctx *ctx, const IRFunc *fn, int idx)
         break;
 
     /* ── Unconditional jump ──────────────────────────────── */
-    case IR_JMP: {
-        int lbl = ins->dest.label_id;
-        int target = get_label(ctx, lbl);
-        if (target >= 0) {
-            /* Backward jump – target known */
-            cb_emit8(cb, 0xE9);
-            int from = cb_pos(cb) + 4;
-            cb_emit32(cb, (uint32_t)(target - from));
-        } else {
-            /* Forward jump – need to patch later */
-            int patch = emit_jmp_rel32(cb);
-            /* Store patch info associated with label */
-            add_reloc(ctx, RELOC_REL32, patch, NULL, lbl, 0);
-        }
+    case IR_JMP:
+        emit_jump_label(ctx, -1, ins->dest.label_id);
         break;
-    }
 
     /* ── Conditional jumps ───────────────────────────────── */
     case IR_JZ:
@@ -1317,17 +1369,7 @@ static int gen_instr(X64Ctx *ctx, const IRFunc *fn, int idx)
         load_oper(ctx, RAX, &ins->src1);
         emit_test_rr(cb, RAX, RAX);
         uint8_t cc = (ins->op == IR_JZ) ? 0x04 : 0x05; /* je / jne */
-        int lbl = ins->dest.label_id;
-        int target = get_label(ctx, lbl);
-        if (target >= 0) {
-            cb_emit8(cb, 0x0F);
-            cb_emit8(cb, (uint8_t)(0x80 + cc));
-            int from = cb_pos(cb) + 4;
-            cb_emit32(cb, (uint32_t)(target - from));
-        } else {
-            int patch = emit_jcc_rel32(cb, cc);
-            add_reloc(ctx, RELOC_REL32, patch, NULL, lbl, 0);
-        }
+        emit_jump_label(ctx, cc, ins->dest.label_id);
         break;
     }
 
@@ -1375,19 +1417,9 @@ static int gen_instr(X64Ctx *ctx, const IRFunc *fn, int idx)
     case IR_RET:
         load_oper(ctx, RAX, &ins->src1);
         __attribute__((fallthrough));
-    case IR_RET_VOID: {
-        int lbl = ctx->epilogue_label;
-        int target = get_label(ctx, lbl);
-        if (target >= 0) {
-            cb_emit8(cb, 0xE9);
-            int from = cb_pos(cb) + 4;
-            cb_emit32(cb, (uint32_t)(target - from));
-        } else {
-            int patch = emit_jmp_rel32(cb);
-            add_reloc(ctx, RELOC_REL32, patch, NULL, lbl, 0);
-        }
+    case IR_RET_VOID:
+        emit_jump_label(ctx, -1, ctx->epilogue_label);
         break;
-    }
 
     /* ── WRITE (built-in I/O) ────────────────────────────── */
     case IR_WRITE: {
@@ -1399,16 +1431,12 @@ static int gen_instr(X64Ctx *ctx, const IRFunc *fn, int idx)
         emit_mov_reg_reg(cb, RCX, RAX);
 
         /* Shadow space is pre-allocated in the frame */
-        switch (ins->extra) {
-        case 1:  emit_call_sym(ctx, RT_WRITE_STR);  break;
-        case 2:  emit_call_sym(ctx, RT_WRITE_BOOL); break;
-        case 3:  emit_call_sym(ctx, RT_WRITE_CHAR); break;
-        default: emit_call_sym(ctx, RT_WRITE_I64);  break;
-        }
+        emit_call_rt(ctx, RT_WRITE[(ins->extra >= 1 && ins->extra <= 3)
+                                   ? ins->extra : 0]);
 
         /* Newline? */
         if (ins->dest.imm) {
-            emit_call_sym(ctx, RT_WRITE_NL);
+            emit_call_rt(ctx, RTSYM_WRITE_NL);
         }
         break;
     }
@@ -1418,10 +1446,10 @@ static int gen_instr(X64Ctx *ctx, const IRFunc *fn, int idx)
         /* dest = result temp, src1.imm = read kind */
         /* Shadow space is pre-allocated in the frame */
         switch ((int)ins->src1.imm) {
-        case 1:  emit_call_sym(ctx, RT_READ_LINE);   break; /* readln */
-        case 2:  emit_call_sym(ctx, RT_READ_CHAR);   break; /* readchar */
-        case 3:  emit_call_sym(ctx, RT_READ_FAILED); break; /* read_failed */
-        default: emit_call_sym(ctx, RT_READ_I64);    break; /* read */
+        case 1:  emit_call_rt(ctx, RTSYM_READ_LINE);   break; /* readln */
+        case 2:  emit_call_rt(ctx, RTSYM_READ_CHAR);   break; /* readchar */
+        case 3:  emit_call_rt(ctx, RTSYM_READ_FAILED); break; /* read_failed */
+        default: emit_call_rt(ctx, RTSYM_READ_I64);     break; /* read */
         }
 
         if (ins->dest.kind == OPER_TEMP)
@@ -1663,7 +1691,7 @@ static int gen_instr(X64Ctx *ctx, const IRFunc *fn, int idx)
         } else {
             /* copy.runtime — REP MOVSB via runtime stub */
             /* Shadow space is pre-allocated in the frame */
-            emit_call_sym(ctx, RT_MEMCPY);
+            emit_call_rt(ctx, RTSYM_MEMCPY);
         }
         break;
     }
@@ -1752,6 +1780,8 @@ static void emit_epilogue(X64Ctx *ctx)
     emit_ret(cb);
 }
 
+static void relax_jumps(X64Ctx *ctx, int fn_start);
+
 static void gen_function(X64Ctx *ctx, const IRFunc *fn)
 {
     CodeBuf *cb = &ctx->code;
@@ -1770,14 +1800,28 @@ static void gen_function(X64Ctx *ctx, const IRFunc *fn)
     opt_regalloc(&ctx->cur_ra, fn, ctx->arena);
 
     /* Build spill_map: maps temp_id → compact spill slot index.
-     * Only spilled temps get a slot; register-allocated temps get -1. */
+     * Only spilled temps get a slot; register-allocated temps get -1.
+     * Temp ids no instruction references (left behind by the
+     * optimizer) also read as REG_SPILLED, so skip those too: the
+     * frame below is sized from the slots actually handed out. */
+    int spill_count = 0;
     {
         int tc = ctx->cur_ra.temp_count;
         ctx->spill_map = (int *)arena_alloc(ctx->arena, tc * sizeof(int));
-        int slot = 0;
+        for (int t = 0; t < tc; t++) ctx->spill_map[t] = -1;
+        for (int i = 0; i < fn->instr_count; i++) {
+            const IRInstr *ins = &fn->instrs[i];
+            const IROper *ops[3] = { &ins->dest, &ins->src1, &ins->src2 };
+            for (int k = 0; k < 3; k++) {
+                int t = ops[k]->temp_id;
+                if (ops[k]->kind == OPER_TEMP && t >= 0 && t < tc)
+                    ctx->spill_map[t] = 0;      /* referenced */
+            }
+        }
         for (int t = 0; t < tc; t++) {
-            if (ctx->cur_ra.temp_reg[t] == REG_SPILLED)
-                ctx->spill_map[t] = slot++;
+            if (ctx->spill_map[t] == 0 &&
+                ctx->cur_ra.temp_reg[t] == REG_SPILLED)
+                ctx->spill_map[t] = spill_count++;
             else
                 ctx->spill_map[t] = -1;
         }
@@ -1799,7 +1843,6 @@ static void gen_function(X64Ctx *ctx, const IRFunc *fn)
      *
      * Only SPILLED temps need stack slots; register-allocated temps skip. */
     ctx->var_area_size = fn->stack_size;
-    int spill_count = ctx->cur_ra.spill_count;
     int temps_space = spill_count * 8;
     ctx->callee_save_base = fn->stack_size + temps_space;
     int save_area = ctx->callee_save_count * 8;
@@ -1892,7 +1935,7 @@ static void gen_function(X64Ctx *ctx, const IRFunc *fn)
             emit_lea_rbp(cb, RCX, off);             /* dst */
             emit_load_imm(cb, R8, fsz);             /* count */
             /* Shadow space is pre-allocated in the frame */
-            emit_call_sym(ctx, RT_MEMCPY);
+            emit_call_rt(ctx, RTSYM_MEMCPY);
         }
 
         /* Args 5..N: caller placed them at [old_rsp + 8 + (i-4)*8].
@@ -1908,16 +1951,16 @@ static void gen_function(X64Ctx *ctx, const IRFunc *fn)
                 emit_lea_rbp(cb, RCX, off);           /* dst */
                 emit_load_imm(cb, R8, fsz);           /* count */
                 /* Shadow space is pre-allocated in the frame */
-                emit_call_sym(ctx, RT_MEMCPY);
+                emit_call_rt(ctx, RTSYM_MEMCPY);
             } else {
                 emit_store_rbp_sz(cb, off, RAX, size);
             }
         }
     }
 
-    /* Reset label table for this function */
-    for (int i = 0; i < ctx->label_cap; i++)
-        ctx->label_offsets[i] = -1;
+    /* Reset label table and jump sites for this function */
+    reset_labels(ctx);
+    ctx->jump_count = 0;
 
     /* Reserve a label ID for the shared epilogue (max label + 1) */
     {
@@ -1938,37 +1981,188 @@ static void gen_function(X64Ctx *ctx, const IRFunc *fn)
     set_label(ctx, ctx->epilogue_label, cb_pos(cb));
     emit_epilogue(ctx);
 
-    xf->text_size = cb_pos(cb) - xf->text_offset;
+    /* Resolve label jumps while labels are still valid for THIS function */
+    relax_jumps(ctx, xf->text_offset);
 
-    /* Resolve label relocs for THIS function while labels are still valid */
-    resolve_label_relocs(ctx);
+    xf->text_size = cb_pos(cb) - xf->text_offset;
 }
 
 /* ═════════════════════════════════════════════════════════════
- * Label relocation resolution (second pass within .text)
+ * Branch relaxation (second pass within .text)
+ *
+ * Every label jump of the current function was emitted as rel32.
+ * Jumps are decided in one pass from the last site to the first;
+ * a jump whose displacement fits in rel8 becomes short (2 bytes).
+ *
+ * Shortening only ever moves code closer together, so a distance
+ * measured with some jumps still near is an upper bound on the
+ * final one, and a jump judged short stays in range.  A forward
+ * jump sees every jump up to its target in final form (exact); a
+ * backward jump sees the ones it spans still near (conservative),
+ * so a worklist of the remaining near jumps picks up the shrinks
+ * that only become possible afterwards.  The function is then
+ * compacted in one sweep and all labels,
+ * jumps and relocs are rebased.
  * ═════════════════════════════════════════════════════════════ */
 
-static void resolve_label_relocs(X64Ctx *ctx)
+#define JUMP_SHORT_LEN   2
+
+/* Bytes saved by the short jumps among sites [0, n).  jump_saved is
+ * a Fenwick tree (1-based), so both this prefix sum and the update in
+ * mark_short cost O(log n) instead of a walk over the sites. */
+static int shift_before(const X64Ctx *ctx, int n)
 {
-    for (int i = 0; i < ctx->reloc_count; i++) {
-        Reloc *r = &ctx->relocs[i];
-        if (r->target_sym != NULL) continue; /* function reloc, not label */
-        if (r->kind != RELOC_REL32) continue;
+    int shift = 0;
+    for (; n > 0; n &= n - 1)
+        shift += ctx->jump_saved[n];
+    return shift;
+}
+
+static void mark_short(X64Ctx *ctx, int i)
+{
+    JumpSite *j = &ctx->jumps[i];
+    int saved = j->near_len - JUMP_SHORT_LEN;
+    j->is_short = true;
+    for (int k = i + 1; k <= ctx->jump_count; k += k & -k)
+        ctx->jump_saved[k] += saved;
+}
 
-        int target = get_label(ctx, r->target_label);
-        if (target < 0) {
-            x64_error("unresolved label %d", r->target_label);
+/* Index of the first jump site at or after old position 'pos'. */
+static int site_index(const X64Ctx *ctx, int pos)
+{
+    int lo = 0, hi = ctx->jump_count;
+    while (lo < hi) {
+        int mid = (lo + hi) / 2;
+        if (ctx->jumps[mid].pos < pos) lo = mid + 1;
+        else hi = mid;
+    }
+    return lo;
+}
+
+/* Offset of old position 'pos' once the current short forms apply. */
+static int relaxed_pos(const X64Ctx *ctx, int pos)
+{
+    return pos - shift_before(ctx, site_index(ctx, pos));
+}
+
+/* Does jump site i reach its target with rel8 under the current forms? */
+static bool jump_fits_short(const X64Ctx *ctx, int i)
+{
+    const JumpSite *j = &ctx->jumps[i];
+    int from = j->pos - shift_before(ctx, i) + JUMP_SHORT_LEN;
+    int disp = j->target - shift_before(ctx, j->tsite) - from;
+    return disp >= -128 && disp <= 127;
+}
+
+static void relax_jumps(X64Ctx *ctx, int fn_start)
+{
+    CodeBuf *cb = &ctx->code;
+    if (ctx->jump_count == 0) return;
+
+    /* Resolve every label once; the pass below only reads jump sites */
+    for (int i = 0; i < ctx->jump_count; i++) {
+        JumpSite *j = &ctx->jumps[i];
+        j->target = get_label(ctx, j->label);
+        if (j->target < 0)
+            x64_error("unresolved label %d", j->label);
+        j->tsite = site_index(ctx, j->target);
+    }
+    ctx->jump_saved = (int *)arena_alloc(ctx->arena,
+                                         (ctx->jump_count + 1) * sizeof(int));
+
+    /* ── Choose forms (single pass, last site first) ─ */
+    /* Forms only ever go near → short, never back: code size is
+     * non-increasing, so every decision made so far stays valid. */
+    for (int i = ctx->jump_count - 1; i >= 0; i--)
+        if (jump_fits_short(ctx, i))
+            mark_short(ctx, i);
+
+    /* ── Second-order shrinks ──────────────────────── */
+    /* A backward jump was judged with the jumps it spans still near;
+     * some of those have since shrunk.  Revisit only near jumps, and
+     * when one shrinks, requeue the near jumps whose span covers it. */
+    /* The requeue scan runs over flat arrays: the sites still near, in
+     * order, and their spans [lo, hi).  A site that shrinks is dropped
+     * from 'near' by the scan its own shrink triggers. */
+    {
+        int n = ctx->jump_count, top = 0, near_count = 0;
+        int  *work    = (int *)arena_alloc(ctx->arena, n * sizeof(int));
+        int  *near    = (int *)arena_alloc(ctx->arena, n * sizeof(int));
+        int  *span_lo = (int *)arena_alloc(ctx->arena, n * sizeof(int));
+        int  *span_hi = (int *)arena_alloc(ctx->arena, n * sizeof(int));
+        bool *queued  = (bool *)arena_alloc(ctx->arena, n * sizeof(bool));
+        for (int i = 0; i < n; i++) {
+            const JumpSite *j = &ctx->jumps[i];
+            if (j->is_short) continue;
+            near[near_count++] = i;
+            span_lo[i] = i < j->tsite ? i : j->tsite;
+            span_hi[i] = i < j->tsite ? j->tsite : i;
         }
-        int from = r->offset + 4; /* rel32 is measured from end of imm */
-        int rel = target - from + r->addend;
-        cb_patch32(&ctx->code, r->offset, (uint32_t)rel);
+        for (int t = near_count - 1; t >= 0; t--) {
+            work[top++] = near[t];
+            queued[near[t]] = true;
+        }
+        while (top > 0) {
+            int i = work[--top];
+            queued[i] = false;
+            if (!jump_fits_short(ctx, i)) continue;
+            mark_short(ctx, i);
+            int m = 0;
+            for (int t = 0; t < near_count; t++) {
+                int k = near[t];
+                if (k == i) continue;
+                near[m++] = k;
+                if (!queued[k] && i >= span_lo[k] && i < span_hi[k]) {
+                    work[top++] = k;
+                    queued[k] = true;
+                }
+            }
+            near_count = m;
+        }
+    }
 
-        /* Mark as resolved by clearing target_sym / setting a sentinel */
-        r->kind = (RelocKind)-1; /* resolved */
+    /* ── Rebase labels and this function's relocs ─── */
+    for (int i = 0; i < ctx->fn_label_count; i++) {
+        int id = ctx->fn_labels[i];
+        ctx->label_offsets[id] = relaxed_pos(ctx, ctx->label_offsets[id]);
     }
+    for (int i = ctx->reloc_count - 1;
+         i >= 0 && ctx->relocs[i].offset >= fn_start; i--)
+        ctx->relocs[i].offset = relaxed_pos(ctx, ctx->relocs[i].offset);
+
+    /* ── Compact code and encode final jumps ───────── */
+    int w = ctx->jumps[0].pos, r = w;
+    for (int i = 0; i < ctx->jump_count; i++) {
+        JumpSite *j = &ctx->jumps[i];
+        int n = j->pos - r;
+        memmove(cb->data + w, cb->data + r, (size_t)n);
+        w += n;
+        r = j->pos + j->near_len;
+        j->pos = w;
+
+        int target = ctx->label_offsets[j->label];
+        if (j->is_short) {
+            int disp = target - (w + JUMP_SHORT_LEN);
+            assert(disp >= -128 && disp <= 127);  /* shrink-only invariant */
+            cb->data[w++] = (uint8_t)(j->cc < 0 ? 0xEB : 0x70 + j->cc);
+            cb->data[w++] = (uint8_t)(int8_t)disp;
+        } else {
+            int len = j->near_len;
+            if (j->cc < 0) {
+                cb->data[w] = 0xE9;
+            } else {
+                cb->data[w]     = 0x0F;
+                cb->data[w + 1] = (uint8_t)(0x80 + j->cc);
+            }
+            cb_patch32(cb, w + len - 4, (uint32_t)(target - (w + len)));
+            w += len;
+        }
+    }
+    memmove(cb->data + w, cb->data + r, (size_t)(cb->len - r));
+    cb->len = w + (cb->len - r);
 }
 
-/* Remove resolved (label) relocs, keep only function/string relocs. */
+/* Remove resolved relocs, keep only external function/string relocs. */
 static void compact_relocs(X64Ctx *ctx)
 {
     int w = 0;
@@ -1999,6 +2193,7 @@ static void resolve_func_relocs(X64Ctx *ctx)
         Reloc *r = &ctx->relocs[i];
         if (r->target_sym == NULL) continue;
         if (r->kind != RELOC_REL32) continue;
+        if (r->rt != RTSYM_NONE) continue;  /* runtime stub – for linker */
 
         int target = find_func_offset(ctx, r->target_sym);
         if (target < 0) continue;  /* external – keep for linker */
@@ -2047,9 +2242,6 @@ void x64_codegen(X64Ctx *ctx, const IRProgram *ir, Arena *arena)
     if (ir->top_level.name != NULL)
         gen_function(ctx, &ir->top_level);
 
-    /* Resolve intra-module jumps are now done per-function in gen_function */
-    compact_relocs(ctx);
-
     /* Resolve intra-module function calls */
     resolve_func_relocs(ctx);
 }
@@ -2058,6 +2250,25 @@ void x64_codegen(X64Ctx *ctx, const IRProgram *ir, Arena *arena)
  * Debug dump
  * ═════════════════════════════════════════════════════════════ */
 
+/* One 16-byte row per line, formatted in a local buffer and written
+ * with a single fwrite instead of one fprintf per byte. */
+static void dump_hex_rows(FILE *out, const uint8_t *data, int len)
+{
+    static const char hex[] = "0123456789ABCDEF";
+    char line[16 + 16 * 3 + 2];
+    for (int row = 0; row < len; row += 16) {
+        int n = snprintf(line, sizeof(line), "  %04X: ", (unsigned)row);
+        int end = AXIS_MIN(row + 16, len);
+        for (int i = row; i < end; i++) {
+            line[n++] = hex[data[i] >> 4];
+            line[n++] = hex[data[i] & 0xF];
+            line[n++] = ' ';
+        }
+        line[n++] = '\n';
+        fwrite(line, 1, (size_t)n, out);
+    }
+}
+
 void x64_dump(const X64Ctx *ctx, FILE *out)
 {
     fprintf(out, "=== x86-64 Code Generation Summary ===\n\n");
@@ -2092,16 +2303,8 @@ void x64_dump(const X64Ctx *ctx, FILE *out)
     }
 
     fprintf(out, "\n.text raw (%d bytes):\n", ctx->code.len);
-    for (int i = 0; i < ctx->code.len; i++) {
-        if (i % 16 == 0) fprintf(out, "  %04X: ", i);
-        fprintf(out, "%02X ", ctx->code.data[i]);
-        if (i % 16 == 15 || i == ctx->code.len - 1) fprintf(out, "\n");
-    }
+    dump_hex_rows(out, ctx->code.data, ctx->code.len);
 
     fprintf(out, "\n.rdata raw (%d bytes):\n", ctx->rdata_len);
-    for (int i = 0; i < ctx->rdata_len; i++) {
-        if (i % 16 == 0) fprintf(out, "  %04X: ", i);
-        fprintf(out, "%02X ", ctx->rdata[i]);
-        if (i % 16 == 15 || i == ctx->rdata_len - 1) fprintf(out, "\n");
-    }
+    dump_hex_rows(out, ctx->rdata, ctx->rdata_len);
 }